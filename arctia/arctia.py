@@ -1,8 +1,11 @@
 #!/usr/bin/env python
+import argparse
 import atexit
 import sys
 import os
 import math
+import random
+import time
 from functools import partial
 
 import pygame
@@ -12,109 +15,70 @@ from .bfont import BitmapFont
 from .config import *
 from .common import *
 from .camera import Camera
-from .stage import Stage
+from .tileset import make_tilesets
+from .compositor import Compositor, Layer, add_world_layers
 from .stockpile import Stockpile
-from .systems import UnitDispatchSystem, UnitDrawSystem, \
-                    PartitionUpdateSystem
-from .team import Team
+from .game import Game
+from .replay import Recorder
+from .savegame import save_game, load_game
+from .profiler import draw_overlay
+from .timestep import FixedTimestep
 from .resources import load_music, load_image
 from . import tools
+from . import speeds
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Play Arctia.')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='the seed of the game (default: random)')
+    parser.add_argument('--record', metavar='LOG', default=None,
+                        help='record the game to a log file, '
+                             'which can be replayed with arctia-replay')
+    parser.add_argument('--load', metavar='SAVE', default=None,
+                        help='continue a saved game')
+    parser.add_argument('--save', metavar='SAVE', default='arctia.sav',
+                        help='the file to save the game to when F5 is '
+                             'pressed (default: arctia.sav)')
+    args = parser.parse_args(argv)
+
+    if args.load and args.record:
+        parser.error('a loaded game cannot be recorded')
+
+    seed = args.seed
+    if seed is None:
+        seed = random.randrange(2 ** 32)
 
-class Bug(object):
-    def __init__(self, x=0, y=0):
-        self.x = x
-        self.y = y
-        self.movement_delay = 0
-        self.hunger = 0
-        self.hunger_threshold = 50
-        self.hunger_diet = {
-            'fish': 100
-        }
-        self.team = None
-        self.wandering_delay = 1
-        self.brooding_duration = 6
-        self.task = None
-        self.partition = None
-        self.components = ['eating', 'wandering', 'brooding']
-        self.clip = (112, 0, 16, 16)
-
-class Gnoose(object):
-    def __init__(self, x=0, y=0):
-        self.x = x
-        self.y = y
-        self.movement_delay = 2
-        self.hunger = 0
-        self.hunger_threshold = 100
-        self.hunger_diet = {
-            'rock': 300
-        }
-        self.team = None
-        self.wandering_delay = 1
-        self.brooding_duration = 12
-        self.task = None
-        self.partition = None
-        self.components = ['eating', 'wandering', 'brooding']
-        self.clip = (16, 16, 16, 16)
-
-class Penguin(object):
-    """
-    A Penguin is a unit that follows the player's orders.
-    """
-    def __init__(self, stage, team, x, y):
-        """
-        Create a new Penguin.
-
-        Arguments:
-            team: the team this Penguin is on
-            x: the x coordinate of the penguin
-            y: the y coordinate of the penguin
-
-        Returns: a new Penguin
-        """
-        assert x >= 0 and x < stage.width
-        assert y >= 0 and y < stage.height
-
-        ## Main data
-
-        # The penguin's location
-        self.x = x
-        self.y = y
-
-        # The penguin's team
-        self.team = team
-
-        # The penguin's sprite clip
-        self.clip = (0, 0, 16, 16)
-
-        # The partition of the stage that this penguin can reach
-        self.partition = None
-
-        # The penguin's current task
-        self.task = None
-
-        ## Gameplay stats
-        self.movement_delay = 0
-        self.hunger = 0
-        self.hunger_threshold = 200
-        self.hunger_diet = { 'fish': 200 }
-        self.wandering_delay = 1
-        self.brooding_duration = 12
-        self.components = ['eating', 'wandering', 'brooding',
-                           'mining', 'hauling', 'building']
-
-def main():
     pygame.init()
     atexit.register(pygame.quit)
     screen = pygame.display.set_mode(SCREEN_REAL_DIMS)
-    virtual_screen = pygame.Surface(SCREEN_LOGICAL_DIMS)
-    scaled_screen = pygame.Surface(SCREEN_REAL_DIMS)
 
+    # Everything is drawn straight onto the screen with the tileset and
+    # font scaled up front: the stage at the camera's zoom level and
+    # the menu at SCREEN_ZOOM.
     load_music('music/nescape.ogg')
-    tileset = load_image('gfx/tileset.png')
-    stage = Stage('maps/tuxville.tmx')
+    tilesets = make_tilesets(load_image('gfx/tileset.png'),
+                             ZOOM_LEVELS + (SCREEN_ZOOM,))
+    menu_tileset = tilesets[SCREEN_ZOOM]
     bfont = BitmapFont(
               'ABCDEFGHIJKLMNOPQRSTUVWXYZ abcdefghijklmnopqrstuvwxyz',
-              load_image('gfx/fawnt.png'))
+              load_image('gfx/fawnt.png')).scale(SCREEN_ZOOM)
+
+    map_path = 'maps/tuxville.tmx'
+    recorder = None
+    if args.record:
+        recorder = Recorder(args.record, map_path, seed)
+
+    if args.load:
+        game = load_game(args.load)
+    else:
+        game = Game(map_path, seed, recorder)
+    stage = game.stage
+    profiler = stage.profiler
+    player_team = game.player_team
+    unit_draw_system = game.unit_draw_system
+
+    if recorder:
+        atexit.register(lambda: recorder.close(game.turn))
 
     player_start_x, player_start_y = stage.get_player_start_pos()
     camera = Camera(player_start_x + 8
@@ -122,51 +86,113 @@ def main():
                     player_start_y + 8
                       - math.floor(SCREEN_LOGICAL_HEIGHT / 2.0))
 
-    # Set up the starting mobs.
-    penguin_offsets = [(0, 0), (1, -1), (-1, 1), (-1, -1), (1, 1)]
-    mobs = []
-
-    player_team = Team()
-
-    for dx, dy in penguin_offsets:
-        mobs.append(Penguin(stage, player_team,
-                            math.floor(player_start_x / 16) + dx,
-                            math.floor(player_start_y / 16) + dy))
+    # UI elements
+    drag_origin = None
+    zoom_step = 0
+    zoom_anchor = None
 
-    mobs += [Gnoose(50, 50),
-             Bug(51, 50),
-             Bug(52, 50),
-             Bug(53, 50),
-             Bug(54, 50)]
+    tools_list = [tools.mine, tools.stockpile, tools.delete_stockpile, tools.build_wall]
+    current_tool = tools_list[0]
 
-    # bug - there's got to be a better way to put the list of mobs
-    #     into the stage object
-    stage.mobs = mobs
+    # The speed buttons sit below the tools in the menu bar.
+    speeds_list = speeds.speeds_list
+    speeds_top = len(tools_list) * 16 + 8
+    current_speed = speeds.NORMAL
+
+    # The screen is drawn in layers, bottom first.  The layers of the
+    # world and the menu bar are only drawn anew when they change (see
+    # the compositor module), but units and the tool's cursor change
+    # all the time.
+    alpha = 1.0
+    mouse_x, mouse_y = 0, 0
+
+    def draw_units(surface):
+        unit_draw_system.update(surface, tilesets[camera.zoom], camera,
+                                alpha=alpha)
+
+    def draw_tool(surface):
+        current_tool.draw(surface, camera, tilesets[camera.zoom],
+                          (mouse_x, mouse_y))
+
+    def find_hovered_menu_item():
+        # The menu is laid out in unscaled pixels.
+        menu_x = math.floor(mouse_x / SCREEN_ZOOM)
+        menu_y = math.floor(mouse_y / SCREEN_ZOOM)
+
+        if menu_x < MENU_WIDTH:
+            if menu_y < len(tools_list) * 16:
+                return 'tool', math.floor(menu_y / 16.0)
+            elif speeds_top <= menu_y \
+                 < speeds_top + len(speeds_list) * 16:
+                return 'speed', math.floor((menu_y - speeds_top) / 16.0)
+        return None
+
+    def draw_menu(surface):
+        z = SCREEN_ZOOM
+
+        pygame.draw.rect(surface,
+                         (0, 0, 0),
+                         (0, 0, MENU_REAL_WIDTH, SCREEN_REAL_DIMS[1]))
 
-    # Set up game systems
-    unit_dispatch_system = UnitDispatchSystem(stage)
-    unit_draw_system = UnitDrawSystem()
+        for i in range(len(tools_list)):
+            if current_tool == tools_list[i]:
+                clip = tools_list[i].active_icon_clip
+            else:
+                clip = tools_list[i].inactive_icon_clip
+            menu_tileset.blit(surface, (0, i * 16 * z), clip)
 
-    for unit in mobs:
-        unit_dispatch_system.add(unit)
-        unit_draw_system.add(unit)
+        for i in range(len(speeds_list)):
+            speeds.draw_icon(surface, speeds_list[i],
+                             (0, (speeds_top + i * 16) * z),
+                             speeds_list[i] is current_speed, z)
 
-    partition_system = PartitionUpdateSystem(stage, mobs)
+        # Draw the label of the currently hovered menu item.
+        hovered = find_hovered_menu_item()
+        if hovered:
+            kind, idx = hovered
+            if kind == 'tool':
+                bfont.write(surface, tools_list[idx].tooltip,
+                            (17 * z, (idx * 16 + 2) * z))
+            else:
+                bfont.write(surface, speeds_list[idx]['tooltip'],
+                            (17 * z, (speeds_top + idx * 16 + 2) * z))
 
-    # UI elements
-    drag_origin = None
+    def get_menu_key():
+        return current_tool, speeds_list.index(current_speed), \
+               find_hovered_menu_item()
 
-    tools_list = [tools.mine, tools.stockpile, tools.delete_stockpile, tools.build_wall]
-    current_tool = tools_list[0]
+    compositor = Compositor(profiler)
+    add_world_layers(compositor, stage, player_team, tilesets, camera)
+    compositor.add('units', Layer(draw_units))
+    compositor.add('tool', Layer(draw_tool))
+    compositor.add('menu', Layer(draw_menu, get_menu_key))
 
-    subturn = 0
+    timestep = FixedTimestep(TURNS_PER_SECOND, MAX_TURNS_PER_FRAME)
     pygame.mixer.music.play(loops=-1)
     clock = pygame.time.Clock()
     while True:
         # Handle user input.
+        started = profiler.start()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 sys.exit()
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F5:
+                    save_game(game, args.save)
+                elif event.key == pygame.K_F3:
+                    # Toggle the profiler and its overlay.
+                    profiler.enabled = not profiler.enabled
+                    profiler.reset()
+                elif event.key in (pygame.K_EQUALS, pygame.K_PLUS,
+                                   pygame.K_MINUS):
+                    # Zoom about the middle of the stage's view.
+                    zoom_step = -1 if event.key == pygame.K_MINUS else 1
+                    zoom_anchor = ((SCREEN_REAL_DIMS[0] + MENU_REAL_WIDTH)
+                                   // 2, SCREEN_REAL_DIMS[1] // 2)
+            elif event.type == pygame.MOUSEWHEEL:
+                # Zoom about the mouse cursor.
+                zoom_step = 1 if event.y > 0 else -1
+                zoom_anchor = pygame.mouse.get_pos()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 mx = math.floor(event.pos[0] / SCREEN_ZOOM)
                 my = math.floor(event.pos[1] / SCREEN_ZOOM)
@@ -176,103 +202,81 @@ def main():
                         if my < len(tools_list) * 16:
                             current_tool = \
                               tools_list[math.floor(my / 16)]
+                        # Select a speed in the menu bar.
+                        elif speeds_top <= my \
+                             < speeds_top + len(speeds_list) * 16:
+                            current_speed = speeds_list[
+                              math.floor((my - speeds_top) / 16)]
+                            if current_speed is not speeds.MAXIMUM:
+                                timestep.speed = current_speed['factor']
                     else:
                         # Use the selected tool.
-                        current_tool.start_on_tile(
-                          camera.transform_screen_to_tile((mx, my)),
-                          stage,
-                          player_team)
+                        game.use_tool(
+                          'start', current_tool,
+                          camera.transform_screen_to_tile(event.pos))
                 elif event.button == 3:
                     # Begin dragging the screen.
-                    drag_origin = math.floor(event.pos[0] \
-                                             / SCREEN_ZOOM), \
-                                  math.floor(event.pos[1] \
-                                             / SCREEN_ZOOM)
+                    drag_origin = event.pos
             elif event.type == pygame.MOUSEBUTTONUP:
-                mx = math.floor(event.pos[0] / SCREEN_ZOOM)
-                my = math.floor(event.pos[1] / SCREEN_ZOOM)
                 if event.button == 1:
-                    current_tool.stop_on_tile(
-                      camera.transform_screen_to_tile((mx, my)),
-                      stage, player_team)
+                    game.use_tool(
+                      'stop', current_tool,
+                      camera.transform_screen_to_tile(event.pos))
                 elif event.button == 3:
                     # Stop dragging the screen.
                     drag_origin = None
 
+        # Handle zooming in or out by a level.
+        if zoom_step:
+            zoom_index = ZOOM_LEVELS.index(camera.zoom) + zoom_step
+            if 0 <= zoom_index < len(ZOOM_LEVELS):
+                camera.set_zoom(ZOOM_LEVELS[zoom_index], zoom_anchor)
+            zoom_step = 0
+
         # Get the mouse position for dragging and drawing cursors.
         mouse_x, mouse_y = pygame.mouse.get_pos()
-        mouse_x = math.floor(mouse_x / SCREEN_ZOOM)
-        mouse_y = math.floor(mouse_y / SCREEN_ZOOM)
 
         # Handle dragging the map.
         if drag_origin is not None:
-            camera.x += (drag_origin[0] - mouse_x) \
+            camera.x += (drag_origin[0] - mouse_x) / camera.zoom \
                         * SCROLL_FACTOR
-            camera.y += (drag_origin[1] - mouse_y) \
+            camera.y += (drag_origin[1] - mouse_y) / camera.zoom \
                         * SCROLL_FACTOR
             drag_origin = mouse_x, mouse_y
-
-        # Delete finished designations.
-        for designation in player_team.designations:
-            if designation['done']:
-                player_team.designations.remove(designation)
-
-        # Update the game state every turn.
-        if subturn == 0:
-            unit_dispatch_system.update()
-
-        # Clear the screen.
-        virtual_screen.fill((0, 0, 0))
-
-        # Draw the world.
-        stage.draw(virtual_screen, tileset, camera)
-
-        # Draw stockpiles.
-        for pile in player_team.stockpiles:
-            pile.draw(virtual_screen, tileset, camera)
-
-        # Draw all units.
-        unit_draw_system.update(virtual_screen, tileset, camera)
-
-        # Hilight designations.
-        for designation in player_team.designations:
-            if not 'hidden' in designation or not designation['hidden']:
-                loc = designation['location']
-                virtual_screen.blit(tileset,
-                                    camera.transform_game_to_screen(
-                                      loc, scalar=16),
-                                    (160, 0, 16, 16))
-
-        # Draw stuff related to the current tool.
-        current_tool.draw(virtual_screen, camera, tileset, (mouse_x, mouse_y))
-
-        # Draw the menu bar.
-        pygame.draw.rect(virtual_screen,
-                         (0, 0, 0),
-                         (0, 0, MENU_WIDTH, SCREEN_LOGICAL_HEIGHT))
-
-        for i in range(len(tools_list)):
-            if current_tool == tools_list[i]:
-                clip = tools_list[i].active_icon_clip
-            else:
-                clip = tools_list[i].inactive_icon_clip
-            virtual_screen.blit(tileset, (0, i * 16), clip)
-
-        # Draw the label of the currently hovered menu item.
-        if mouse_x < MENU_WIDTH:
-            if mouse_y < len(tools_list) * 16:
-                tool_idx = math.floor(mouse_y / 16.0)
-                bfont.write(virtual_screen,
-                            tools_list[tool_idx].tooltip,
-                            (17, tool_idx * 16 + 2))
-
-        # Scale and draw onto the real screen.
-        pygame.transform.scale(virtual_screen,
-                               SCREEN_REAL_DIMS,
-                               scaled_screen)
-        screen.blit(scaled_screen, (0, 0))
+        profiler.stop('input', started)
+
+        if current_speed is speeds.MAXIMUM:
+            # Play turns for the whole time until the next frame.
+            deadline = time.perf_counter() \
+                       + 1.0 / MAX_SPEED_FRAMES_PER_SECOND
+            while time.perf_counter() < deadline:
+                game.play_turn()
+        else:
+            # Play every turn which is due, as long as there is time.
+            deadline = time.perf_counter() \
+                       + TURN_TIME_BUDGET / FRAMES_PER_SECOND
+            while time.perf_counter() < deadline \
+                  and timestep.take_turn():
+                game.play_turn()
+
+        # Draw the layers of the screen.
+        if current_speed is speeds.MAXIMUM:
+            alpha = 1.0
+        else:
+            alpha = timestep.alpha
+        compositor.draw(screen)
+
+        # Draw the timings of the game over everything else.
+        if profiler.enabled:
+            draw_overlay(screen, profiler, bfont, (MENU_REAL_WIDTH, 0),
+                         SCREEN_REAL_DIMS[0] - MENU_REAL_WIDTH, SCREEN_ZOOM)
+
+        started = profiler.start()
         pygame.display.flip();
+        profiler.stop('flip', started)
 
         # Wait for the next frame.
-        subturn = (subturn + 1) % 10
-        clock.tick(40)
+        if current_speed is speeds.MAXIMUM:
+            clock.tick(MAX_SPEED_FRAMES_PER_SECOND)
+        else:
+            timestep.add_time(clock.tick(FRAMES_PER_SECOND) / 1000.0)
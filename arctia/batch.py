@@ -0,0 +1,280 @@
+"""
+The batch module provides running many headless games in parallel.
+
+A batch plays one game for every combination of a grid of parameters
+and a list of seeds, spread over a pool of processes.  The map is
+parsed once and handed to each process when it starts, and the
+metrics of each game are written to a results file (one JSON object
+per line) as soon as the game is over, so a long batch can be watched
+while it runs.
+
+The parameters which can be tuned are:
+
+    hunger_threshold: how hungry penguins get before they eat
+    movement_delay:   how many turns penguins wait between steps
+    mining_work:      how many turns of work it takes to mine a tile
+    building_work:    how many turns of work it takes to build a wall
+    eating_work:      how many turns it takes to eat something
+
+Games may follow the orders of a recorded game (see the replay
+module), so that every game of a batch has the same work to do.
+
+Games may also be profiled, in which case the timings of every section
+of the game (see the profiler module) are added to their metrics.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from .common import tile_is_solid
+from .game import Game, find_tool
+from .replay import Log
+from .stage import StageMap
+
+def _set_penguin_field(name):
+    def set_field(game, value):
+        for unit in game.mobs:
+            if unit.team is game.player_team:
+                setattr(unit, name, value)
+    return set_field
+
+def _set_work_amount(kind):
+    def set_work(game, value):
+        game.stage.work_amounts[kind] = value
+    return set_work
+
+# The function setting each parameter on a new game.
+PARAMETERS = {
+    'hunger_threshold': _set_penguin_field('hunger_threshold'),
+    'movement_delay': _set_penguin_field('movement_delay'),
+    'mining_work': _set_work_amount('mine'),
+    'building_work': _set_work_amount('build'),
+    'eating_work': _set_work_amount('eat')
+}
+
+class _MetricsCounter(object):
+    """
+    A _MetricsCounter counts what happens in a game as it is played.
+    """
+    def __init__(self, game):
+        self.food_eaten = 0
+        self.tiles_mined = 0
+        game.stage.register_tile_change_listener(self)
+        game.stage.events.subscribe('eaten', self._count_eaten)
+
+    def tile_changed(self, prev_tid, cur_tid, _unused_position):
+        if tile_is_solid(prev_tid) and not tile_is_solid(cur_tid):
+            self.tiles_mined += 1
+
+    def _count_eaten(self, _unused_event):
+        self.food_eaten += 1
+
+def simulate(stage_map, params, seed, turns, actions=(), profile=False):
+    """
+    Play a headless game and measure it.
+
+    Arguments:
+        stage_map: the StageMap to play on
+        params: a dict of parameter names (see PARAMETERS) and values
+        seed: the seed of the game
+        turns: how many turns to play
+        actions: the tool uses to make, as (turn, action, tool_name,
+                 (x, y)) tuples in order, e.g., from a replay Log
+        profile: whether to add the timings of the game's sections to
+                 its metrics, as 'timings' (see Profiler.summary)
+
+    Returns: a dict of the metrics of the game
+    """
+    game = Game(stage_map.path, seed, stage_map=stage_map)
+    for name, value in params.items():
+        PARAMETERS[name](game, value)
+    game.stage.profiler.enabled = profile
+
+    counter = _MetricsCounter(game)
+    workers = [unit for unit in game.mobs
+               if unit.team is game.player_team]
+    idle_turns = 0
+    next_action = 0
+
+    start = time.perf_counter()
+    for turn in range(turns):
+        while next_action < len(actions) \
+              and actions[next_action][0] <= turn:
+            _, action, tool_name, position = actions[next_action]
+            game.use_tool(action, find_tool(tool_name), position)
+            next_action += 1
+
+        game.play_turn()
+
+        for unit in workers:
+            if unit.task is None or unit.task.idle:
+                idle_turns += 1
+    elapsed = time.perf_counter() - start
+
+    metrics = {
+        'food_eaten': counter.food_eaten,
+        'tiles_mined': counter.tiles_mined,
+        'idle_ratio': idle_turns / (turns * len(workers))
+                      if turns and workers else 0.0,
+        'turns_per_second': turns / elapsed if elapsed else 0.0
+    }
+    if profile:
+        metrics['timings'] = game.stage.profiler.summary()
+
+    return metrics
+
+def make_runs(grid, seeds):
+    """
+    Return every combination of parameter values and seeds.
+
+    Arguments:
+        grid: a dict of parameter names and lists of their values
+        seeds: a list of seeds
+
+    Returns: a list of (params, seed) pairs, where params is a dict
+             of parameter names and values
+    """
+    for name in grid:
+        assert name in PARAMETERS, 'unknown parameter: %s' % (name,)
+
+    names = sorted(grid)
+    return [(dict(zip(names, values)), seed)
+            for values in itertools.product(*[grid[name]
+                                              for name in names])
+            for seed in seeds]
+
+# The batch shared by the games of a worker process, set when the
+# process starts so that it is only sent once.
+_worker_batch = None
+
+def _start_worker(stage_map, turns, actions, profile):
+    global _worker_batch
+    _worker_batch = stage_map, turns, actions, profile
+
+def _run_in_worker(run):
+    params, seed = run
+    stage_map, turns, actions, profile = _worker_batch
+    return params, seed, simulate(stage_map, params, seed, turns, actions,
+                                  profile)
+
+def run_batch(stage_map, runs, turns, results_file, actions=(),
+              processes=None, profile=False):
+    """
+    Play a batch of games over a pool of processes.
+
+    Arguments:
+        stage_map: the StageMap to play on
+        runs: a list of (params, seed) pairs, e.g., from make_runs
+        turns: how many turns to play in every game
+        results_file: a file to write a line of JSON to for every game
+                      as soon as it is over
+        actions: the tool uses to make in every game (see simulate)
+        processes: how many processes to use, or None for one per core
+        profile: whether to profile every game (see simulate)
+
+    Returns: the number of games played
+    """
+    played = 0
+
+    with multiprocessing.Pool(processes, _start_worker,
+                              (stage_map, turns, list(actions),
+                               profile)) as pool:
+        for params, seed, metrics in \
+            pool.imap_unordered(_run_in_worker, runs):
+            result = {'params': params, 'seed': seed, 'turns': turns}
+            result.update(metrics)
+            results_file.write(json.dumps(result, sort_keys=True) + '\n')
+            results_file.flush()
+            played += 1
+
+    return played
+
+def parse_param(text):
+    """
+    Parse a parameter given on the command line, e.g., 'movement_delay=0,2'.
+
+    Arguments:
+        text: the name of the parameter, an equals sign, and a
+              comma-separated list of integer values
+
+    Returns: a pair of the name and the list of values
+    """
+    name, _, values = text.partition('=')
+    assert name in PARAMETERS, 'unknown parameter: %s' % (name,)
+    return name, [int(value) for value in values.split(',')]
+
+def parse_seeds(text):
+    """
+    Parse seeds given on the command line, e.g., '1,5,10-19'.
+
+    Arguments:
+        text: a comma-separated list of seeds and inclusive ranges
+
+    Returns: the list of seeds
+    """
+    seeds = []
+    for part in text.split(','):
+        first, _, last = part.partition('-')
+        seeds.extend(range(int(first), int(last or first) + 1))
+    return seeds
+
+def main(argv=None):
+    """
+    Play a batch of headless games and write their metrics to a file.
+    """
+    parser = argparse.ArgumentParser(
+               description='Play a batch of headless games of Arctia.')
+    parser.add_argument('--param', metavar='NAME=VALUES', action='append',
+                        default=[],
+                        help='a parameter and the values to try, e.g., '
+                             'movement_delay=0,1,2 (one of: %s)'
+                             % ', '.join(sorted(PARAMETERS)))
+    parser.add_argument('--seeds', default='0',
+                        help='the seeds to play every combination with, '
+                             'e.g., 0-9 (default: 0)')
+    parser.add_argument('--turns', type=int, default=1000,
+                        help='how many turns to play (default: 1000)')
+    parser.add_argument('--map', default='maps/tuxville.tmx',
+                        help='the map to play on')
+    parser.add_argument('--log', default=None,
+                        help='a recorded game whose map and orders '
+                             'to play with')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='how many processes to use '
+                             '(default: one per core)')
+    parser.add_argument('--profile', action='store_true',
+                        help='add the timings of every section of the '
+                             'game to the results')
+    parser.add_argument('--output', default='results.jsonl',
+                        help='the results file (default: results.jsonl)')
+    args = parser.parse_args(argv)
+
+    grid = dict(parse_param(text) for text in args.param)
+    runs = make_runs(grid, parse_seeds(args.seeds))
+
+    map_path = args.map
+    actions = ()
+    if args.log:
+        log = Log(args.log)
+        map_path = log.map_path
+        actions = log.actions
+
+    stage_map = StageMap(map_path)
+
+    print('playing %d games on %d processes'
+          % (len(runs), args.processes or os.cpu_count()))
+
+    start = time.perf_counter()
+    with open(args.output, 'w') as results_file:
+        run_batch(stage_map, runs, args.turns, results_file, actions,
+                  args.processes, args.profile)
+
+    print('done in %.1fs, results in %s'
+          % (time.perf_counter() - start, args.output))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
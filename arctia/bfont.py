@@ -1,6 +1,9 @@
 """
 The bfont module provides a class for loading and using bitmap fonts.
 """
+import copy
+
+import pygame
 
 class BitmapFont(object):
     """
@@ -34,6 +37,23 @@ class BitmapFont(object):
             else:
                 cwidth += 1
 
+    def scale(self, factor):
+        """
+        Return a copy of this font scaled by a whole factor.
+
+        Arguments:
+            factor: how many times to scale the font, e.g., 2
+
+        Returns: the scaled BitmapFont
+        """
+        font = copy.copy(self)
+        font.image = pygame.transform.scale(
+                       self.image, (self.image.get_width() * factor,
+                                    self.image.get_height() * factor))
+        font.cells = [tuple(value * factor for value in cell)
+                      for cell in self.cells]
+        return font
+
     def write(self, surface, text, position):
         """
         Render text to a surface at a position using this font.
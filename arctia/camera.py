@@ -5,20 +5,77 @@ Such transformations are necessary in order to blit game objects
 correctly and determine what tile the player has selected.
 """
 import math
-from .config import MENU_WIDTH, TILE_SIZE
+from .config import MENU_REAL_WIDTH, TILE_SIZE, SCREEN_ZOOM, \
+                    SCREEN_REAL_DIMS
 
 class Camera(object):
     """
     A Camera facilitates transforming coordinates from screen
     coordinates to game world coordinates and vise versa.
 
+    Game world coordinates are in unscaled pixels, i.e., TILE_SIZE
+    to a tile, and screen coordinates are in real pixels of the
+    screen, so a camera zoomed by 2 draws each game pixel as a 2x2
+    square.  The stage is drawn to the right of the menu.
+
     Arguments:
         x: the x coordinate of the camera's view
         y: the y coordinate of the camera's view
+        zoom: how many times to scale the game world
     """
-    def __init__(self, x, y):
+    def __init__(self, x, y, zoom=SCREEN_ZOOM):
         self.x = x
         self.y = y
+        self.zoom = zoom
+
+    @property
+    def tile_size(self):
+        """
+        The width and height (in screen pixels) of a tile.
+        """
+        return round(TILE_SIZE * self.zoom)
+
+    def set_zoom(self, zoom, anchor):
+        """
+        Zoom in or out, keeping a point on the screen over the same
+        point of the game world.
+
+        Arguments:
+            zoom: how many times to scale the game world
+            anchor: the screen coordinates of the point to keep
+        """
+        anchor_x = anchor[0] - MENU_REAL_WIDTH
+        anchor_y = anchor[1]
+        self.x += anchor_x / self.zoom - anchor_x / zoom
+        self.y += anchor_y / self.zoom - anchor_y / zoom
+        self.zoom = zoom
+
+    def get_tile_grid(self):
+        """
+        Return where tiles are drawn on the screen, so that many tiles
+        can be placed without transforming each one's coordinates.
+
+        Returns: a tuple (size, offset_x, offset_y), such that the tile
+                 (x, y) is drawn at (x * size + offset_x,
+                 y * size + offset_y), as by transform_tile_to_screen
+        """
+        zoom = self.zoom
+        return (self.tile_size,
+                MENU_REAL_WIDTH - round(self.x * zoom),
+                -round(self.y * zoom))
+
+    def find_view(self):
+        """
+        Return the tiles which are at least partly in view.
+
+        Returns: the tiles as a rect, i.e., (x, y, width, height)
+        """
+        size = self.tile_size
+        left = math.floor(self.x / TILE_SIZE)
+        top = math.floor(self.y / TILE_SIZE)
+        return (left, top,
+                math.ceil((SCREEN_REAL_DIMS[0] - MENU_REAL_WIDTH) / size) + 1,
+                math.ceil(SCREEN_REAL_DIMS[1] / size) + 1)
 
     def transform_screen_to_game(self, point, divisor=1):
         """
@@ -39,8 +96,9 @@ class Camera(object):
         Returns: a pair of game coordinates
         """
         point_x, point_y = point
-        return (math.floor((self.x + point_x - MENU_WIDTH) / divisor),
-                math.floor((self.y + point_y) / divisor))
+        return (math.floor((self.x + (point_x - MENU_REAL_WIDTH) / self.zoom)
+                           / divisor),
+                math.floor((self.y + point_y / self.zoom) / divisor))
 
     def transform_screen_to_tile(self, point):
         """
@@ -63,14 +121,19 @@ class Camera(object):
         When converting from a tile coordinate to a screen coordinate,
         the scalar should be the width or height of a square tile.
 
+        The camera's position is rounded to whole screen pixels, so
+        that neighboring tiles always line up.
+
         Arguments:
             point: a pair of screen coordinates
             scalar: a number to multiply each original coordinate by
 
         Returns: a pair of screen coordinates
         """
-        return (point[0] * scalar - self.x + MENU_WIDTH,
-                point[1] * scalar - self.y)
+        zoom = self.zoom
+        return (point[0] * scalar * zoom - round(self.x * zoom)
+                + MENU_REAL_WIDTH,
+                point[1] * scalar * zoom - round(self.y * zoom))
 
     def transform_tile_to_screen(self, point):
         """
@@ -82,4 +145,3 @@ class Camera(object):
         Returns: a pair of tile coordinates
         """
         return self.transform_game_to_screen(point, scalar=TILE_SIZE)
-
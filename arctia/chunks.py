@@ -0,0 +1,149 @@
+"""
+The chunks module provides a class (ChunkIndex) for finding nearby items.
+"""
+import heapq
+
+# The width and height (in tiles) of the squares items are kept in.
+CHUNK_SIZE = 8
+
+class ChunkIndex(object):
+    """
+    A ChunkIndex holds items at locations, divided into square chunks
+    of the stage, so that the items nearest a location can be found by
+    looking at the chunks around it instead of at every item.
+
+    Distances are counted in steps, i.e., diagonal steps count as one,
+    as units walk them.
+
+    Arguments:
+        size: the width and height (in tiles) of a chunk
+    """
+    def __init__(self, size=CHUNK_SIZE):
+        self._size = size
+
+        # The items in each chunk: {(x, y): {id(item): (item, x, y)}}
+        self._chunks = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for chunk in self._chunks.values():
+            for item, _, _ in chunk.values():
+                yield item
+
+    def add(self, item, location):
+        """
+        Add an item at a location.
+
+        Arguments:
+            item: the item, which must not already be in the index
+            location: the (x, y) coordinates of the item
+        """
+        x, y = location
+        key = x // self._size, y // self._size
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            chunk = self._chunks[key] = {}
+
+        assert id(item) not in chunk, 'item is already in the index'
+        chunk[id(item)] = item, x, y
+        self._count += 1
+
+    def discard(self, item, location):
+        """
+        Remove an item at a location if it is in the index.
+
+        Arguments:
+            item: the item
+            location: the (x, y) coordinates the item was added at
+        """
+        x, y = location
+        key = x // self._size, y // self._size
+        chunk = self._chunks.get(key)
+
+        if chunk is not None and chunk.pop(id(item), None) is not None:
+            self._count -= 1
+            if not chunk:
+                del self._chunks[key]
+
+    def nearest(self, location, count, accept=None):
+        """
+        Find the items nearest a location.
+
+        Chunks are looked at in growing squares around the location
+        until no unseen chunk can hold a nearer item.  Once a square
+        would cover more chunks than hold any items, the remaining
+        items are looked at directly instead.
+
+        Arguments:
+            location: the (x, y) coordinates to search around
+            count: the largest number of items to find
+            accept: a function taking an item and returning whether it
+                    may be found, or None to accept every item
+
+        Returns: a list of up to count (distance, item) pairs, nearest
+                 first, with ties broken by location (top to bottom,
+                 then left to right) and then by the order items were
+                 added
+        """
+        if count <= 0 or not self._count:
+            return []
+
+        size = self._size
+        center_x, center_y = location
+        chunk_x, chunk_y = center_x // size, center_y // size
+        chunks = self._chunks
+
+        def candidates(keys):
+            for key in keys:
+                chunk = chunks.get(key)
+                if chunk:
+                    for item, x, y in chunk.values():
+                        if accept is None or accept(item):
+                            yield (max(abs(x - center_x),
+                                       abs(y - center_y)), y, x), item
+
+        found = []
+        radius = 0
+        while True:
+            if (2 * radius + 1) ** 2 > len(chunks):
+                # Look at every chunk outside the squares seen so far.
+                rest = [key for key in chunks
+                        if max(abs(key[0] - chunk_x),
+                               abs(key[1] - chunk_y)) >= radius]
+                found.extend(candidates(rest))
+                break
+
+            if radius == 0:
+                ring = [(chunk_x, chunk_y)]
+            else:
+                ring = _ring(chunk_x, chunk_y, radius)
+            found.extend(candidates(ring))
+
+            # Items in the next ring of chunks are at least this far away.
+            if len(found) >= count:
+                nearest = heapq.nsmallest(count, found, key=_sort_key)
+                if nearest[-1][0][0] <= radius * size:
+                    return [(order[0], item) for order, item in nearest]
+            radius += 1
+
+        return [(order[0], item)
+                for order, item in heapq.nsmallest(count, found,
+                                                   key=_sort_key)]
+
+def _sort_key(candidate):
+    return candidate[0]
+
+def _ring(center_x, center_y, radius):
+    # The keys of the chunks on the edge of a square around a chunk.
+    top, bottom = center_y - radius, center_y + radius
+    left, right = center_x - radius, center_x + radius
+
+    keys = [(x, top) for x in range(left, right + 1)]
+    keys += [(x, bottom) for x in range(left, right + 1)]
+    for y in range(top + 1, bottom):
+        keys.append((left, y))
+        keys.append((right, y))
+    return keys
@@ -45,3 +45,19 @@ def unit_can_reach(unit, location):
     """
     x, y = location
     return unit.partition[y][x]
+
+# The offsets of the eight neighbors of a tile.  Bit i of a neighbor
+# mask stands for NEIGHBOR_OFFSETS[i], and the opposite neighbor of
+# bit i is bit 7 - i.
+NEIGHBOR_OFFSETS = ((-1, -1), (0, -1), (1, -1), (-1, 0),
+                    (1, 0), (-1, 1), (0, 1), (1, 1))
+
+# The bit of each offset in a neighbor mask: {(dx, dy): bit}
+NEIGHBOR_BITS = {offset: 1 << i for i, offset in enumerate(NEIGHBOR_OFFSETS)}
+
+# The offsets standing for the set bits of each mask, so that
+# OFFSETS_BY_MASK[mask] lists the neighbors in a mask.
+OFFSETS_BY_MASK = tuple(
+  tuple(offset for i, offset in enumerate(NEIGHBOR_OFFSETS)
+        if mask & (1 << i))
+  for mask in range(256))
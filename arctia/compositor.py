@@ -0,0 +1,212 @@
+"""
+The compositor module provides classes for drawing the screen in layers.
+
+The screen is drawn as a stack of layers, e.g., terrain at the bottom
+and the menu bar at the top.  A layer which changes only now and then
+is drawn onto a surface of its own, which is kept and blitted onto the
+screen as a whole until the layer is out of date.  A layer is out of
+date when its key (a value describing everything it depends on, such
+as the camera's position) changes, or when it is marked dirty, e.g.,
+by a listener of the stage.  Layers which change all the time, such as
+moving units, are drawn straight onto the screen every frame.
+"""
+import pygame
+
+from .tileset import SpriteBatch
+
+# The color of the see-through parts of layers.  Cached layers are kept
+# on surfaces with this color as their color key rather than with an
+# alpha channel, since the tileset is either fully opaque or fully
+# clear and color-keyed surfaces are much faster to blit.
+_CLEAR_COLOR = (255, 0, 255)
+
+class Layer(object):
+    """
+    A Layer is one level of the screen drawn by a Compositor.
+
+    Arguments:
+        draw_proc: a function drawing the layer onto a surface, called
+                   with the surface
+        get_key: a function returning the key of the layer, i.e., a
+                 value which changes whenever the drawing would, or
+                 None to draw the layer anew every frame
+        opaque: whether the layer covers the whole screen, so that no
+                transparency needs to be kept on its surface
+    """
+    def __init__(self, draw_proc, get_key=None, opaque=False):
+        self.draw_proc = draw_proc
+        self.get_key = get_key
+        self.opaque = opaque
+        self.dirty = True
+        self._key = None
+        self._surface = None
+
+    def mark_dirty(self):
+        """
+        Have the layer drawn anew on the next frame.
+        """
+        self.dirty = True
+
+    def _refresh(self, size):
+        key = self.get_key()
+        if not self.dirty and key == self._key:
+            return
+
+        if self._surface is None:
+            self._surface = pygame.Surface(size)
+
+        # Drawing onto a run-length encoded surface decodes it on every
+        # blit, so it is only encoded once the layer is drawn.
+        surface = self._surface
+        surface.set_colorkey(None)
+        if self.opaque:
+            surface.fill((0, 0, 0))
+            self.draw_proc(surface)
+        else:
+            surface.fill(_CLEAR_COLOR)
+            self.draw_proc(surface)
+            surface.set_colorkey(_CLEAR_COLOR, pygame.RLEACCEL)
+        self._key = key
+        self.dirty = False
+
+    def draw(self, screen):
+        """
+        Draw the layer onto a screen, drawing it anew first if it is
+        out of date.
+
+        Arguments:
+            screen: the screen to draw on
+        """
+        if self.get_key is None:
+            self.draw_proc(screen)
+        else:
+            self._refresh(screen.get_size())
+            screen.blit(self._surface, (0, 0))
+
+class Compositor(object):
+    """
+    A Compositor draws the screen from layers, bottom first.
+
+    Arguments:
+        profiler: the Profiler to time each layer with, or None
+    """
+    def __init__(self, profiler=None):
+        # The layers by their name, from bottom to top.
+        self.layers = {}
+        self._profiler = profiler
+
+    def add(self, name, layer):
+        """
+        Put a layer on top of the others.
+
+        Arguments:
+            name: the name of the layer, e.g., 'terrain'
+            layer: the Layer
+        """
+        assert name not in self.layers, 'layer already exists: %s' % (name,)
+        self.layers[name] = layer
+
+    def mark_all_dirty(self):
+        """
+        Have every layer drawn anew on the next frame.
+        """
+        for layer in self.layers.values():
+            layer.mark_dirty()
+
+    def draw(self, screen):
+        """
+        Draw every layer onto a screen.
+
+        Arguments:
+            screen: the screen to draw on
+        """
+        profiler = self._profiler
+
+        for name, layer in self.layers.items():
+            started = profiler.start() if profiler else None
+            layer.draw(screen)
+            if started is not None:
+                profiler.stop('draw ' + name, started)
+
+class _StageChangeListener(object):
+    """
+    A _StageChangeListener marks the terrain and entity layers dirty
+    whenever a tile or entity changes in view.
+    """
+    def __init__(self, stage, camera, terrain, entities):
+        self._stage = stage
+        self._camera = camera
+        self._terrain = terrain
+        self._entities = entities
+
+    def tile_changed(self, _unused_prev_id, _unused_cur_id, position):
+        if self._stage.is_in_view(self._camera, position):
+            self._terrain.mark_dirty()
+
+    def entity_added(self, _unused_entity, loc):
+        if self._stage.is_in_view(self._camera, loc):
+            self._entities.mark_dirty()
+
+    def entity_removed(self, _unused_entity, loc):
+        if self._stage.is_in_view(self._camera, loc):
+            self._entities.mark_dirty()
+
+def add_world_layers(compositor, stage, team, tilesets, camera):
+    """
+    Add the layers of the stage and a team's plans to a compositor:
+    'terrain', 'entities', 'stockpiles' and 'designations'.
+
+    Arguments:
+        compositor: the Compositor
+        stage: the stage
+        team: the team whose stockpiles and designations to draw
+        tilesets: a dict of zoom levels and the Tilesets to draw with
+                  at each, holding at least the camera's zoom
+        camera: the Camera to draw with
+    """
+    def get_camera_key():
+        return camera.x, camera.y, camera.zoom
+
+    def draw_tiles(surface):
+        stage.draw_tiles(surface, tilesets[camera.zoom], camera)
+
+    def draw_entities(surface):
+        stage.draw_entities(surface, tilesets[camera.zoom], camera)
+
+    def draw_stockpiles(surface):
+        tileset = tilesets[camera.zoom]
+        for pile in team.stockpiles:
+            pile.draw(surface, tileset, camera)
+
+    def get_stockpiles_key():
+        return get_camera_key(), \
+               [(pile.x, pile.y, pile.width, pile.height)
+                for pile in team.stockpiles]
+
+    def draw_designations(surface):
+        size, offset_x, offset_y = camera.get_tile_grid()
+        batch = SpriteBatch(tilesets[camera.zoom])
+
+        for designation in team.designations:
+            if not designation.get('hidden'):
+                x, y = designation['location']
+                batch.add((x * size + offset_x, y * size + offset_y),
+                          (160, 0, 16, 16))
+
+        batch.draw(surface)
+
+    def get_designations_key():
+        return get_camera_key(), team.designations.revision
+
+    terrain = Layer(draw_tiles, get_camera_key, opaque=True)
+    entities = Layer(draw_entities, get_camera_key)
+
+    listener = _StageChangeListener(stage, camera, terrain, entities)
+    stage.register_tile_change_listener(listener)
+    stage.register_entity_change_listener(listener)
+
+    compositor.add('terrain', terrain)
+    compositor.add('entities', entities)
+    compositor.add('stockpiles', Layer(draw_stockpiles, get_stockpiles_key))
+    compositor.add('designations',
+                   Layer(draw_designations, get_designations_key))
@@ -23,10 +23,18 @@ TILE_SIZE = 16
 #
 # Since the sprites are small, you may want to scale up the game
 # screen with this constant.  By default, the screen is scaled by 2,
-# which means pixels are drawn at double their size.
+# which means pixels are drawn at double their size.  The menu is
+# always drawn at this zoom, and the stage is at first.
 SCREEN_ZOOM = 2
 
 
+# The zoom levels the player can pick for the stage, smallest first.
+#
+# The tileset is scaled once for every level, so each must make
+# tiles a whole number of pixels wide.
+ZOOM_LEVELS = (0.5, 1, 2, 3)
+
+
 # The width (in pixels) of the menu on the left side of the screen.
 MENU_WIDTH = 16
 
@@ -37,6 +45,68 @@ MENU_WIDTH = 16
 SCROLL_FACTOR = 2
 
 
+# How many frames to draw per second.
+FRAMES_PER_SECOND = 40
+
+
+# How many turns of the game to play per second.
+#
+# The game is played at this rate no matter how fast frames are
+# drawn, so slow frames do not slow down the colony.
+TURNS_PER_SECOND = 4
+
+
+# The most turns to play in one frame when catching up.
+#
+# If the game falls behind by more turns than this (e.g., when the
+# window is dragged), the rest are skipped instead of making the
+# game hang while it catches up.
+MAX_TURNS_PER_FRAME = 4
+
+
+# How many frames to draw per second at maximum game speed.
+#
+# At maximum speed, turns are played for the whole time between
+# frames, so drawing fewer frames leaves more time for turns.
+MAX_SPEED_FRAMES_PER_SECOND = 4
+
+
+# The share of each frame's time which may be spent playing turns.
+#
+# If turns take longer than this, the rest are played on later
+# frames, so that the game keeps responding to the player.
+TURN_TIME_BUDGET = 0.75
+
+
+# How many turns of work it takes to mine a tile.
+MINING_WORK = 10
+
+
+# How many turns of work it takes to build a wall.
+BUILDING_WORK = 10
+
+
+# How many turns it takes to eat something.
+EATING_WORK = 10
+
+
+# How far (in tiles) from the player's units wildlife is simulated in
+# full detail.
+#
+# Idle wildlife farther away than this wanders by teleporting to its
+# goals after the time it would take to walk there, which costs far
+# less than finding and walking a path.
+LOD_INTEREST_RADIUS = 24
+
+
+# How many of the most recent timings of each section of the game
+# the profiler keeps.
+#
+# The overlay's histograms and percentiles are worked out from these,
+# so more samples make them steadier but slower to follow changes.
+PROFILER_SAMPLES = 1000
+
+
 # How much time (in turns) until a full penguin becomes hungry.
 HUNGER_THRESHOLD = 40
 
@@ -55,3 +125,6 @@ SCREEN_LOGICAL_DIMS = SCREEN_LOGICAL_WIDTH, SCREEN_LOGICAL_HEIGHT
 
 # The real (in actual pixels) screen dimensions.
 SCREEN_REAL_DIMS = tuple([x * SCREEN_ZOOM for x in SCREEN_LOGICAL_DIMS])
+
+# The real (in actual pixels) width of the menu.
+MENU_REAL_WIDTH = MENU_WIDTH * SCREEN_ZOOM
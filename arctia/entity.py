@@ -1,10 +1,17 @@
+from .kinds import KIND_NAMES
+
 class Entity(object):
     """
     An Entity is a immobile item in the game, e.g., a stone.
+
+    Worlds may hold hundreds of thousands of entities, so an Entity
+    keeps only its location and its kind code (see the kinds module).
     """
+    __slots__ = ('location', 'kind')
+
     def __init__(self, kind, location):
-        assert kind in ('bug', 'rock', 'fish'), \
-               'unknown entity kind: %s' % (kind,)
+        assert kind in range(len(KIND_NAMES)), \
+               'unknown entity kind: %r' % (kind,)
 
         self.location = location
         self.kind = kind
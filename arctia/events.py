@@ -0,0 +1,42 @@
+"""
+The events module provides a class (EventBus) for signalling changes.
+"""
+
+class EventBus(object):
+    """
+    An EventBus calls back subscribers whenever an event is published.
+
+    Events are named by strings.  The following events are published
+    during the game:
+
+        'designation':  a designation became available to work on
+        'entity':       an entity became available, e.g., it appeared
+                        on the stage or its reservation was deleted
+        'stockpile':    a stockpile was created or got a free slot
+        'reachability': the partitions of some units were refreshed
+        'eaten':        a unit finished eating an entity
+    """
+    def __init__(self):
+        self._subscribers = {}
+
+    def subscribe(self, event, callback):
+        """
+        Call a function whenever an event is published.
+
+        Arguments:
+            event: the name of the event, e.g., 'entity'
+            callback: a function taking the name of the event
+        """
+        if event not in self._subscribers:
+            self._subscribers[event] = []
+        self._subscribers[event].append(callback)
+
+    def publish(self, event):
+        """
+        Call every subscriber of an event.
+
+        Arguments:
+            event: the name of the event, e.g., 'entity'
+        """
+        for callback in self._subscribers.get(event, ()):
+            callback(event)
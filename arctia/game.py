@@ -0,0 +1,143 @@
+"""
+The game module provides a class (Game) holding the state of a game.
+"""
+import math
+from .stage import Stage
+from .systems import UnitDispatchSystem, UnitDrawSystem, \
+                    PartitionUpdateSystem
+from .team import Team
+from .mobs import Bug, Gnoose, Penguin
+from . import tools
+
+class Game(object):
+    """
+    A Game sets up a stage with its starting mobs and plays turns on it.
+
+    A game played from the same map and seed, with the same tools used
+    on the same turns, always turns out the same.  So that it can be
+    replayed, every use of a tool may be passed on to a recorder, an
+    object with a method called record accepting the turn number, the
+    action ('start' or 'stop'), the name of the tool and the position:
+
+        def record(self, turn, action, tool_name, position)
+
+    Arguments:
+        map_path: a path to a .tmx file containing the stage data
+        seed: the seed of the random number generator, or None
+        recorder: the object to pass tool uses on to, or None
+        stage_map: the StageMap of map_path if it is already loaded,
+                   or None to load it
+    """
+    def __init__(self, map_path='maps/tuxville.tmx', seed=None,
+                 recorder=None, stage_map=None):
+        self.map_path = map_path
+        self.seed = seed
+        self.recorder = recorder
+
+        self.stage = stage = Stage(map_path, seed, stage_map)
+        self.player_team = Team(stage)
+
+        # Set up the starting mobs.
+        player_start_x, player_start_y = stage.get_player_start_pos()
+        penguin_offsets = [(0, 0), (1, -1), (-1, 1), (-1, -1), (1, 1)]
+        mobs = []
+
+        for dx, dy in penguin_offsets:
+            mobs.append(Penguin(stage, self.player_team,
+                                math.floor(player_start_x / 16) + dx,
+                                math.floor(player_start_y / 16) + dy))
+
+        mobs += [Gnoose(stage, 50, 50),
+                 Bug(stage, 51, 50),
+                 Bug(stage, 52, 50),
+                 Bug(stage, 53, 50),
+                 Bug(stage, 54, 50)]
+
+        self._setup_systems(mobs)
+
+    def _setup_systems(self, mobs):
+        stage = self.stage
+
+        # bug - there's got to be a better way to put the list of mobs
+        #     into the stage object
+        stage.mobs = mobs
+        self.mobs = mobs
+
+        # Set up game systems
+        self.unit_dispatch_system = UnitDispatchSystem(stage)
+        self.unit_draw_system = UnitDrawSystem(stage)
+
+        for unit in mobs:
+            self.unit_dispatch_system.add(unit)
+            self.unit_draw_system.add(unit)
+
+        self.partition_system = PartitionUpdateSystem(stage, mobs)
+
+    @property
+    def turn(self):
+        """
+        The number of the current turn.
+        """
+        return self.unit_dispatch_system.turn
+
+    def play_turn(self):
+        """
+        Play one turn of the game.
+        """
+        profiler = self.stage.profiler
+
+        started = profiler.start()
+        self.partition_system.update()
+        profiler.stop('partitions', started)
+
+        started = profiler.start()
+        self.unit_dispatch_system.update()
+        profiler.stop('dispatch', started)
+
+        # Delete finished designations.
+        self.player_team.designations.compact()
+
+    def use_tool(self, action, tool, position):
+        """
+        Start or stop using a tool on a tile.
+
+        Arguments:
+            action: 'start' or 'stop'
+            tool: the tool module, e.g., tools.mine
+            position: the (x, y) coordinates of the tile
+        """
+        assert action in ('start', 'stop'), \
+               'unknown tool action: %s' % (action,)
+
+        if self.recorder:
+            self.recorder.record(self.turn, action,
+                                 tool_name(tool), position)
+
+        if action == 'start':
+            tool.start_on_tile(position, self.stage, self.player_team)
+        else:
+            tool.stop_on_tile(position, self.stage, self.player_team)
+
+def tool_name(tool):
+    """
+    Return the name of a tool module, e.g., 'mine' for tools.mine.
+
+    Arguments:
+        tool: the tool module
+
+    Returns: the name of the tool
+    """
+    return tool.__name__.rsplit('.', 1)[-1]
+
+def find_tool(name):
+    """
+    Return the tool module with a name.
+
+    Arguments:
+        name: the name of the tool, e.g., 'mine'
+
+    Returns: the tool module
+    """
+    tool = getattr(tools, name, None)
+    assert tool is not None, 'unknown tool: %s' % (name,)
+    return tool
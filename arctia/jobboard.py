@@ -0,0 +1,398 @@
+"""
+The jobboard module provides a class (JobBoard) for tracking designations.
+"""
+from .chunks import ChunkIndex
+
+# The statuses a job can have.
+WAITING = 'waiting'
+OPEN = 'open'
+RESERVED = 'reserved'
+DONE = 'done'
+
+class JobBoard(object):
+    """
+    A JobBoard holds the designations (jobs) of a team.
+
+    A job is a dict with at least the keys 'kind', 'location' and
+    'done'.  Every job on the board has a status: it is OPEN until a
+    unit claims it, RESERVED while a unit is working on it, and DONE
+    once it is completed.  Jobs are indexed by kind and status, by
+    owner and by location, so claiming, releasing and completing a job
+    are O(1), and listing the open jobs of a kind never looks at jobs
+    which are reserved or done.
+
+    Jobs may depend on other jobs: a job with the key 'parent' is a
+    dependency of the parent job, and a job with the key
+    'pending_dependencies' has that many dependencies which are not yet
+    done.  Such a job is WAITING until the count drops to zero when its
+    last dependency is completed, after which it is OPEN as usual.
+
+    The open jobs are also indexed by the partitions units are in (see
+    open_jobs_within), so finding the open jobs a unit can reach looks
+    at neither the jobs it cannot reach nor the far-away ones it can.
+
+    Finished jobs stay on the board (so that, e.g., they are still
+    found at their location) until compact is called.  The revision of
+    the board goes up whenever jobs are added or removed, so that,
+    e.g., a drawing of the jobs can tell when it is out of date.
+
+    Whenever a job becomes available, i.e., when it is added, released
+    or completed (which may free up jobs depending on it), the board
+    publishes a 'designation' event.  The partition indexes are dropped
+    whenever a 'reachability' event is published.
+
+    Arguments:
+        events: the EventBus to publish events on, or None
+    """
+    def __init__(self, events=None):
+        self._events = events
+        self.revision = 0
+
+        # All jobs on the board by their id, in the order posted.
+        self._jobs = {}
+
+        # The status of each job by its id.
+        self._status = {}
+
+        # The order each job was posted in by its id.
+        self._serials = {}
+        self._next_serial = 0
+
+        # The jobs of each (kind, status) pair: {(kind, status): {id: job}}
+        self._index = {}
+
+        # The (kind, status) pairs whose jobs are out of posting order,
+        # since a job was put back among jobs posted after it.  They
+        # are sorted again the next time they are listed.
+        self._unordered = set()
+
+        # The owner of each reserved job by its id.
+        self._owners = {}
+
+        # The jobs reserved by each owner: {id(owner): {id: job}}
+        self._by_owner = {}
+
+        # The jobs at each location: {(x, y): {id: job}}
+        self._by_location = {}
+
+        # The ids of jobs which are done but not yet compacted.
+        self._finished = []
+
+        # The open jobs within each partition asked about, by kind,
+        # which are made when first asked for and dropped whenever
+        # partitions change:
+        # {id(partition): (partition, {kind: ChunkIndex})}
+        self._open_within = {}
+
+        if events:
+            events.subscribe('reachability', self._forget_open_within)
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __iter__(self):
+        return iter(self._jobs.values())
+
+    def _bucket(self, kind, status):
+        key = kind, status
+        if key not in self._index:
+            self._index[key] = {}
+        return self._index[key]
+
+    def _set_status(self, job, status):
+        key = id(job)
+        old_status = self._status[key]
+        self._bucket(job['kind'], old_status).pop(key)
+
+        bucket = self._bucket(job['kind'], status)
+        if bucket:
+            last_key = next(reversed(bucket))
+            if self._serials[key] < self._serials[last_key]:
+                self._unordered.add((job['kind'], status))
+        bucket[key] = job
+        self._status[key] = status
+
+        if old_status == OPEN:
+            self._unindex_open(job)
+        elif status == OPEN:
+            self._index_open(job)
+
+    def _index_open(self, job):
+        """
+        Add a job which has just become open to the partition indexes.
+
+        Jobs at the same location are found in posting order, so if an
+        open job of the same kind posted after this one is at its
+        location, the indexes of the kind are made again instead.
+        """
+        kind = job['kind']
+        x, y = location = job['location']
+        serial = self._serials[id(job)]
+
+        if any(other['kind'] == kind and self._status[key] == OPEN
+               and self._serials[key] > serial
+               for key, other in self._by_location[location].items()):
+            for _, indexes in self._open_within.values():
+                indexes.pop(kind, None)
+            return
+
+        for partition, indexes in self._open_within.values():
+            if kind in indexes and partition[y][x]:
+                indexes[kind].add(job, location)
+
+    def _unindex_open(self, job):
+        kind = job['kind']
+        for _, indexes in self._open_within.values():
+            if kind in indexes:
+                indexes[kind].discard(job, job['location'])
+
+    def _forget_open_within(self, _unused_event):
+        self._open_within = {}
+
+    def _assert_is_posted(self, job):
+        assert id(job) in self._jobs, 'job is not on the board'
+
+    def _publish(self):
+        if self._events:
+            self._events.publish('designation')
+
+    def add(self, job):
+        """
+        Post a new job on the board.
+
+        Arguments:
+            job: the job, which must not already be on the board
+        """
+        key = id(job)
+        assert key not in self._jobs, 'job is already on the board'
+
+        self._jobs[key] = job
+        self._serials[key] = self._next_serial
+        self._next_serial += 1
+        if job['done']:
+            self._status[key] = DONE
+        elif job.get('pending_dependencies', 0) > 0:
+            self._status[key] = WAITING
+        else:
+            self._status[key] = OPEN
+        self._bucket(job['kind'], self._status[key])[key] = job
+
+        location = job['location']
+        if location not in self._by_location:
+            self._by_location[location] = {}
+        self._by_location[location][key] = job
+
+        if self._status[key] == OPEN:
+            self._index_open(job)
+
+        if job['done']:
+            self._finished.append(key)
+
+        self.revision += 1
+        self._publish()
+
+    def extend(self, jobs):
+        """
+        Post several new jobs on the board.
+
+        Arguments:
+            jobs: an iterable of jobs
+        """
+        for job in jobs:
+            self.add(job)
+
+    def claim(self, job, owner=None):
+        """
+        Reserve an open job for an owner.
+
+        Arguments:
+            job: the job
+            owner: the unit which will do the job, or None
+        """
+        self._assert_is_posted(job)
+        assert self._status[id(job)] == OPEN, \
+               'tried to claim a job which is not open'
+
+        self._set_status(job, RESERVED)
+        self._owners[id(job)] = owner
+
+        owner_key = id(owner)
+        if owner_key not in self._by_owner:
+            self._by_owner[owner_key] = {}
+        self._by_owner[owner_key][id(job)] = job
+
+    def _forget_owner(self, job):
+        owner = self._owners.pop(id(job), None)
+        owned = self._by_owner.get(id(owner))
+
+        if owned is not None:
+            owned.pop(id(job), None)
+            if not owned:
+                del self._by_owner[id(owner)]
+
+    def release(self, job):
+        """
+        Put a reserved job back on the board so another unit can take it.
+
+        Arguments:
+            job: the job
+        """
+        self._assert_is_posted(job)
+        assert self._status[id(job)] == RESERVED, \
+               'tried to release a job which is not reserved'
+
+        self._forget_owner(job)
+        self._set_status(job, OPEN)
+        self._publish()
+
+    def complete(self, job):
+        """
+        Mark a job as done.
+
+        Arguments:
+            job: the job
+        """
+        self._assert_is_posted(job)
+
+        if self._status[id(job)] == DONE:
+            return
+
+        self._forget_owner(job)
+        self._set_status(job, DONE)
+        self._finished.append(id(job))
+        job['done'] = True
+
+        # Let the parent job go ahead once all its dependencies are done.
+        parent = job.get('parent')
+        if parent is not None:
+            self._assert_is_posted(parent)
+            parent['pending_dependencies'] -= 1
+            if parent['pending_dependencies'] == 0 \
+               and self._status[id(parent)] == WAITING:
+                self._set_status(parent, OPEN)
+
+        self._publish()
+
+    def compact(self):
+        """
+        Remove all finished jobs from the board.
+        """
+        if self._finished:
+            self.revision += 1
+
+        for key in self._finished:
+            job = self._jobs.pop(key)
+            self._bucket(job['kind'], DONE).pop(key)
+            del self._status[key]
+            del self._serials[key]
+
+            at_location = self._by_location[job['location']]
+            del at_location[key]
+            if not at_location:
+                del self._by_location[job['location']]
+
+        self._finished = []
+
+    def status(self, job):
+        """
+        Return the status of a job on the board.
+
+        Arguments:
+            job: the job
+
+        Returns: WAITING, OPEN, RESERVED or DONE
+        """
+        self._assert_is_posted(job)
+        return self._status[id(job)]
+
+    def owner(self, job):
+        """
+        Return the owner of a reserved job.
+
+        Arguments:
+            job: the job
+
+        Returns: the unit which reserved the job, or None
+        """
+        return self._owners.get(id(job))
+
+    def jobs(self, kind, status=OPEN):
+        """
+        Iterate over the jobs of a kind having a given status.
+
+        The board must not be changed while the iteration is going on,
+        so callers which claim a job should stop iterating right after.
+
+        Arguments:
+            kind: the kind of job, e.g., 'mine'
+            status: WAITING, OPEN, RESERVED or DONE
+
+        Returns: an iterator over the matching jobs, in posting order
+        """
+        key = kind, status
+        if key in self._unordered:
+            self._unordered.discard(key)
+            serials = self._serials
+            self._index[key] = dict(sorted(self._index[key].items(),
+                                           key=lambda item: serials[item[0]]))
+        return iter(self._index.get(key, {}).values())
+
+    def open_jobs_within(self, kind, partition):
+        """
+        Return the open jobs of a kind whose locations are within a
+        partition.
+
+        Arguments:
+            kind: the kind of job, e.g., 'mine'
+            partition: the partition of a unit (see the partition
+                       module)
+
+        Returns: a ChunkIndex of the jobs, which must not be changed
+        """
+        view = self._open_within.get(id(partition))
+        if view is None:
+            # Keeping the partition keeps its id from being reused.
+            view = self._open_within[id(partition)] = partition, {}
+
+        indexes = view[1]
+        if kind not in indexes:
+            index = indexes[kind] = ChunkIndex()
+            for job in self.jobs(kind, OPEN):
+                x, y = location = job['location']
+                if partition[y][x]:
+                    index.add(job, location)
+        return indexes[kind]
+
+    def count(self, kind, status=OPEN):
+        """
+        Return how many jobs of a kind have a given status.
+
+        Arguments:
+            kind: the kind of job, e.g., 'mine'
+            status: WAITING, OPEN, RESERVED or DONE
+
+        Returns: the number of matching jobs
+        """
+        return len(self._index.get((kind, status), ()))
+
+    def jobs_owned_by(self, owner):
+        """
+        Return the jobs reserved by an owner.
+
+        Arguments:
+            owner: the unit
+
+        Returns: a list of the jobs reserved by the owner
+        """
+        return list(self._by_owner.get(id(owner), {}).values())
+
+    def jobs_at(self, location):
+        """
+        Return the jobs at a location, including finished ones.
+
+        Arguments:
+            location: a pair of (x, y) coordinates
+
+        Returns: a list of the jobs at the location
+        """
+        return list(self._by_location.get(location, {}).values())
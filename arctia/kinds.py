@@ -0,0 +1,40 @@
+"""
+The kinds module provides the kinds of entity as integer codes.
+
+Entities keep their kind as a small integer, so data about kinds (their
+names, their sprites, how filling they are) is kept in tuples indexed
+by the code instead of in dicts keyed by strings.
+"""
+
+BUG = 0
+ROCK = 1
+FISH = 2
+
+# The name of each kind, by code.
+KIND_NAMES = ('bug', 'rock', 'fish')
+
+# The code of each kind, by name.
+KIND_CODES = {name: code for code, name in enumerate(KIND_NAMES)}
+
+# The column of the tileset holding the sprite of each kind, by code.
+KIND_SPRITE_COLUMNS = (7, 6, 4)
+
+# The diets made so far, so that equal diets are the same tuple.
+_diets = {}
+
+def make_diet(nutrition):
+    """
+    Make a diet, i.e., a tuple of how much hunger eating an entity of
+    each kind takes away, by code.  Kinds which cannot be eaten take
+    away nothing.
+
+    Equal diets are interned, so every unit of a species shares one.
+
+    Arguments:
+        nutrition: a dict of kind codes and how much hunger eating an
+                   entity of the kind takes away
+
+    Returns: the diet
+    """
+    diet = tuple(nutrition.get(code, 0) for code in range(len(KIND_NAMES)))
+    return _diets.setdefault(diet, diet)
@@ -0,0 +1,142 @@
+"""
+The matching module provides functions for assigning workers to jobs.
+
+The functions take a cost matrix, i.e., a list of rows (workers)
+where each row is a list of the costs of the columns (jobs) for that
+worker.  A cost of math.inf means the worker cannot do the job.
+greedy_sparse_assignment takes only the finite costs instead.
+"""
+import math
+
+def min_cost_assignment(costs):
+    """
+    Find an assignment of rows to columns with the least total cost.
+
+    This is the Hungarian algorithm, which runs in O(n^2 * m) time
+    for n rows and m columns, so only use it for small matrices.
+
+    This code is adapted from the description at:
+
+        <https://en.wikipedia.org/wiki/Hungarian_algorithm>
+
+    Arguments:
+        costs: a cost matrix
+
+    Returns: a list of (row, column) pairs, with every row and every
+             column used at most once and no pair having infinite cost
+    """
+    if not costs or not costs[0]:
+        return []
+
+    num_rows = len(costs)
+    num_cols = len(costs[0])
+
+    # The algorithm needs at least as many columns as rows.
+    if num_rows > num_cols:
+        transposed = [[costs[r][c] for r in range(num_rows)]
+                      for c in range(num_cols)]
+        return [(r, c) for c, r in min_cost_assignment(transposed)]
+
+    # Forbidden pairs get a cost larger than any real assignment.
+    finite = [cost for row in costs for cost in row if cost != math.inf]
+    forbidden = (max(finite) + 1) * (num_rows + 1) if finite else 1
+
+    # Potentials of rows (u) and columns (v), and the row matched to
+    # each column (col_match), all using 1-based indices so that
+    # index 0 can stand for "no row".
+    u = [0] * (num_rows + 1)
+    v = [0] * (num_cols + 1)
+    col_match = [0] * (num_cols + 1)
+    way = [0] * (num_cols + 1)
+
+    for row in range(1, num_rows + 1):
+        col_match[0] = row
+        col = 0
+        min_slack = [math.inf] * (num_cols + 1)
+        used = [False] * (num_cols + 1)
+
+        while col_match[col] != 0:
+            used[col] = True
+            cur_row = col_match[col]
+            delta = math.inf
+            next_col = 0
+            row_costs = costs[cur_row - 1]
+
+            for j in range(1, num_cols + 1):
+                if used[j]:
+                    continue
+                cost = row_costs[j - 1]
+                if cost == math.inf:
+                    cost = forbidden
+                slack = cost - u[cur_row] - v[j]
+                if slack < min_slack[j]:
+                    min_slack[j] = slack
+                    way[j] = col
+                if min_slack[j] < delta:
+                    delta = min_slack[j]
+                    next_col = j
+
+            for j in range(num_cols + 1):
+                if used[j]:
+                    u[col_match[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_slack[j] -= delta
+
+            col = next_col
+
+        # Flip the augmenting path.
+        while col != 0:
+            prev_col = way[col]
+            col_match[col] = col_match[prev_col]
+            col = prev_col
+
+    return [(col_match[j] - 1, j - 1)
+            for j in range(1, num_cols + 1)
+            if col_match[j] != 0
+               and costs[col_match[j] - 1][j - 1] != math.inf]
+
+def greedy_assignment(costs):
+    """
+    Quickly find a cheap (but not always cheapest) assignment.
+
+    Pairs are taken in order of increasing cost, skipping rows and
+    columns which are already used.
+
+    Arguments:
+        costs: a cost matrix
+
+    Returns: a list of (row, column) pairs, with every row and every
+             column used at most once and no pair having infinite cost
+    """
+    return greedy_sparse_assignment(
+             (cost, r, c)
+             for r, row in enumerate(costs)
+             for c, cost in enumerate(row)
+             if cost != math.inf)
+
+def greedy_sparse_assignment(triples):
+    """
+    Same as greedy_assignment, but take only the pairs a row may be
+    assigned to instead of a whole cost matrix, which is much smaller
+    when each row only considers a few columns.
+
+    Arguments:
+        triples: an iterable of (cost, row, column) triples, where
+                 rows and columns are any sortable keys
+
+    Returns: a list of (row, column) pairs, with every row and every
+             column used at most once
+    """
+    used_rows = set()
+    used_cols = set()
+    result = []
+
+    for _, r, c in sorted(triples):
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        result.append((r, c))
+
+    return result
@@ -0,0 +1,77 @@
+"""
+The mobs module provides the kinds of unit found in the game.
+"""
+from .kinds import ROCK, FISH, make_diet
+from .units import Unit, EATING, WANDERING, BROODING, MINING, \
+                   HAULING, BUILDING
+
+_BUG_DIET = make_diet({FISH: 100})
+_GNOOSE_DIET = make_diet({ROCK: 300})
+_PENGUIN_DIET = make_diet({FISH: 200})
+
+class Bug(Unit):
+    __slots__ = ()
+
+    def __init__(self, stage, x=0, y=0):
+        super().__init__(stage.units, x, y)
+        self.movement_delay = 0
+        self.hunger_threshold = 50
+        self.hunger_diet = _BUG_DIET
+        self.wandering_delay = 1
+        self.brooding_duration = 6
+        self.components = EATING | WANDERING | BROODING
+        self.clip = (112, 0, 16, 16)
+
+class Gnoose(Unit):
+    __slots__ = ()
+
+    def __init__(self, stage, x=0, y=0):
+        super().__init__(stage.units, x, y)
+        self.movement_delay = 2
+        self.hunger_threshold = 100
+        self.hunger_diet = _GNOOSE_DIET
+        self.wandering_delay = 1
+        self.brooding_duration = 12
+        self.components = EATING | WANDERING | BROODING
+        self.clip = (16, 16, 16, 16)
+
+class Penguin(Unit):
+    """
+    A Penguin is a unit that follows the player's orders.
+    """
+    __slots__ = ()
+
+    def __init__(self, stage, team, x, y):
+        """
+        Create a new Penguin.
+
+        Arguments:
+            stage: the Stage the penguin is on
+            team: the team this Penguin is on
+            x: the x coordinate of the penguin
+            y: the y coordinate of the penguin
+
+        Returns: a new Penguin
+        """
+        assert x >= 0 and x < stage.width
+        assert y >= 0 and y < stage.height
+
+        ## Main data
+
+        # The penguin's location, partition and task are kept by Unit.
+        super().__init__(stage.units, x, y)
+
+        # The penguin's team
+        self.team = team
+
+        # The penguin's sprite clip
+        self.clip = (0, 0, 16, 16)
+
+        ## Gameplay stats
+        self.movement_delay = 0
+        self.hunger_threshold = 200
+        self.hunger_diet = _PENGUIN_DIET
+        self.wandering_delay = 1
+        self.brooding_duration = 12
+        self.components = EATING | WANDERING | BROODING \
+                          | MINING | HAULING | BUILDING
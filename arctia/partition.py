@@ -1,7 +1,7 @@
 """
 The partition module provides a way of finding tiles a unit can reach.
 """
-from .common import tile_is_solid
+from .common import OFFSETS_BY_MASK
 
 def partition(stage, location):
     """
@@ -26,31 +26,32 @@ def partition(stage, location):
                  for y in range(stage.height)]
     reachable[loc_y][loc_x] = True
 
-    directions = [
-        (0, -1), (0, 1), (-1, 0), (1, 0),
-        (-1, -1), (1, -1), (-1, 1), (1, 1)
-    ]
+    walkable_masks = stage.walkable_masks
+    solid_masks = stage.solid_masks
 
-    fringe = [(loc_x, loc_y)]
-
-    while True:
-        if not fringe:
-            break
+    # The location is left even if it is solid.  After that, solid
+    # tiles are reached from their neighbors but never left.
+    fringe = []
+    for dx, dy in OFFSETS_BY_MASK[solid_masks[loc_y][loc_x]]:
+        reachable[loc_y + dy][loc_x + dx] = True
+    for dx, dy in OFFSETS_BY_MASK[walkable_masks[loc_y][loc_x]]:
+        reachable[loc_y + dy][loc_x + dx] = True
+        fringe.append((loc_x + dx, loc_y + dy))
 
+    while fringe:
         new_fringe = []
 
         for x, y in fringe:
-            if not tile_is_solid(stage.get_tile_at(x, y)) \
-               or (x, y) == location:
-                for dx, dy in directions:
-                    neighbor_x = dx + x
-                    neighbor_y = dy + y
-
-                    if 0 <= neighbor_x < stage.width \
-                       and 0 <= neighbor_y < stage.height \
-                       and not reachable[neighbor_y][neighbor_x]:
-                        new_fringe.append((neighbor_x, neighbor_y))
-                        reachable[neighbor_y][neighbor_x] = True
+            for dx, dy in OFFSETS_BY_MASK[solid_masks[y][x]]:
+                reachable[y + dy][x + dx] = True
+
+            for dx, dy in OFFSETS_BY_MASK[walkable_masks[y][x]]:
+                neighbor_x = dx + x
+                neighbor_y = dy + y
+
+                if not reachable[neighbor_y][neighbor_x]:
+                    new_fringe.append((neighbor_x, neighbor_y))
+                    reachable[neighbor_y][neighbor_x] = True
 
         fringe = new_fringe
 
@@ -0,0 +1,264 @@
+"""
+The profiler module provides a class (Profiler) for timing the game.
+
+Timings are recorded in named sections, e.g., 'draw terrain' or
+'enact Go', and the most recent ones of every section are kept for
+working out percentiles and histograms.  A profiler costs next to
+nothing while it is disabled: the hot loops of the game check whether
+it is enabled once per turn or frame, and only then time anything.
+
+The timings can be drawn as an overlay (see draw_overlay), or taken
+as plain data from headless games (see Profiler.summary).
+"""
+import collections
+import math
+import time
+
+import pygame
+
+from .config import FRAMES_PER_SECOND, PROFILER_SAMPLES
+
+class Profiler(object):
+    """
+    A Profiler records how long each section of the game takes.
+
+    Arguments:
+        samples: how many of the most recent timings of each section
+                 to keep for percentiles and histograms
+    """
+    def __init__(self, samples=PROFILER_SAMPLES):
+        self.enabled = False
+        self._samples = samples
+
+        # The recent timings of each section, in the order the
+        # sections were first recorded: {name: deque of seconds}
+        self._recent = {}
+
+        # The number of timings and the total and longest time of
+        # each section since the profiler was reset: {name: [...]}
+        self._totals = {}
+
+    def reset(self):
+        """
+        Forget every recorded timing.
+        """
+        self._recent = {}
+        self._totals = {}
+
+    def record(self, name, seconds):
+        """
+        Record a timing of a section.
+
+        Arguments:
+            name: the name of the section
+            seconds: how long the section took
+        """
+        recent = self._recent.get(name)
+        if recent is None:
+            recent = self._recent[name] = \
+              collections.deque(maxlen=self._samples)
+            self._totals[name] = [0, 0.0, 0.0]
+
+        recent.append(seconds)
+        totals = self._totals[name]
+        totals[0] += 1
+        totals[1] += seconds
+        if seconds > totals[2]:
+            totals[2] = seconds
+
+    def start(self):
+        """
+        Start timing a section.
+
+        Returns: the start time to pass to stop, or None if the
+                 profiler is disabled
+        """
+        if self.enabled:
+            return time.perf_counter()
+        return None
+
+    def stop(self, name, started):
+        """
+        Stop timing a section and record its timing.
+
+        Arguments:
+            name: the name of the section
+            started: what start returned
+        """
+        if started is not None:
+            self.record(name, time.perf_counter() - started)
+
+    def timed(self, name, function):
+        """
+        Return a function which records a timing of every call.
+
+        Arguments:
+            name: the name of the section
+            function: the function to time
+
+        Returns: a function taking the same arguments as function
+        """
+        def call(*args):
+            started = time.perf_counter()
+            result = function(*args)
+            self.record(name, time.perf_counter() - started)
+            return result
+        return call
+
+    @property
+    def names(self):
+        """
+        The names of the recorded sections, in the order they were
+        first recorded.
+        """
+        return list(self._recent)
+
+    def percentile(self, name, fraction):
+        """
+        Return a percentile of the recent timings of a section.
+
+        Arguments:
+            name: the name of the section
+            fraction: the percentile as a fraction, e.g., 0.9
+
+        Returns: the timing (in seconds)
+        """
+        ordered = sorted(self._recent[name])
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def histogram(self, name, bounds):
+        """
+        Count the recent timings of a section in buckets.
+
+        Arguments:
+            name: the name of the section
+            bounds: the ascending upper bounds (in seconds) of the
+                    buckets; longer timings count in the last bucket
+
+        Returns: a list of counts, one per bucket
+        """
+        counts = [0] * len(bounds)
+        last = len(bounds) - 1
+
+        for seconds in self._recent[name]:
+            bucket = 0
+            while bucket < last and seconds > bounds[bucket]:
+                bucket += 1
+            counts[bucket] += 1
+
+        return counts
+
+    def summary(self):
+        """
+        Return the timings of every section as plain data.
+
+        Returns: a dict of section names and dicts of their 'count',
+                 'total', 'mean' and 'max' since the profiler was
+                 reset, and the 'p50', 'p90' and 'p99' percentiles of
+                 the recent timings, all in seconds
+        """
+        summary = {}
+
+        for name in self._recent:
+            count, total, longest = self._totals[name]
+            summary[name] = {
+                'count': count,
+                'total': total,
+                'mean': total / count,
+                'max': longest,
+                'p50': self.percentile(name, 0.5),
+                'p90': self.percentile(name, 0.9),
+                'p99': self.percentile(name, 0.99)
+            }
+
+        return summary
+
+# The overlay's timing axis is logarithmic, from a microsecond up to
+# a tenth of a second, with this many pixels and buckets per decade.
+_DECADE_WIDTH = 16
+_BUCKETS_PER_DECADE = 4
+_DECADES = 5
+_SHORTEST = 1e-6
+
+_BUCKET_WIDTH = _DECADE_WIDTH // _BUCKETS_PER_DECADE
+_BUCKET_BOUNDS = [_SHORTEST * 10 ** ((i + 1) / _BUCKETS_PER_DECADE)
+                  for i in range(_DECADES * _BUCKETS_PER_DECADE)]
+
+_PANEL_COLOR = (0, 0, 0, 192)
+_DECADE_COLOR = (48, 48, 48)
+_BUDGET_COLOR = (64, 64, 160)
+_HISTOGRAM_COLOR = (128, 128, 128)
+_PERCENTILE_COLORS = ((0.5, (96, 224, 96)),
+                      (0.9, (224, 224, 96)),
+                      (0.99, (224, 96, 96)))
+
+def _timing_to_x(seconds, zoom):
+    if seconds <= _SHORTEST:
+        return 0
+    x = math.log10(seconds / _SHORTEST) * _DECADE_WIDTH * zoom
+    return min(int(x), _DECADES * _DECADE_WIDTH * zoom - 1)
+
+def draw_overlay(screen, profiler, bfont, position, width, zoom=1):
+    """
+    Draw the timings of a profiler, one row per section.
+
+    Each row shows the name of a section and a histogram of its
+    recent timings on a logarithmic axis, with a faint line at every
+    power of ten seconds and a blue one at the time a frame may take.
+    The median, 90th and 99th percentiles are marked in green, yellow
+    and red.
+
+    Arguments:
+        screen: the screen to draw on
+        profiler: the Profiler
+        bfont: the BitmapFont to write the names of sections with
+        position: the (x, y) screen coordinates of the overlay
+        width: the width (in pixels) of the overlay
+        zoom: how many times to scale the histograms, which should
+              match the scale of bfont
+    """
+    names = profiler.names
+    if not names:
+        return
+
+    row_height = bfont.cells[0][3]
+    decade_width = _DECADE_WIDTH * zoom
+    bucket_width = _BUCKET_WIDTH * zoom
+    graph_width = _DECADES * decade_width
+    left, top = position
+    graph_left = left + width - graph_width
+
+    panel = pygame.Surface((width, row_height * len(names)),
+                           pygame.SRCALPHA)
+    panel.fill(_PANEL_COLOR)
+    screen.blit(panel, position)
+
+    for row, name in enumerate(names):
+        y = top + row * row_height
+        bottom = y + row_height - 1
+
+        for decade in range(1, _DECADES):
+            x = graph_left + decade * decade_width
+            pygame.draw.line(screen, _DECADE_COLOR, (x, y), (x, bottom),
+                             zoom)
+
+        x = graph_left + _timing_to_x(1.0 / FRAMES_PER_SECOND, zoom)
+        pygame.draw.line(screen, _BUDGET_COLOR, (x, y), (x, bottom), zoom)
+
+        counts = profiler.histogram(name, _BUCKET_BOUNDS)
+        most = max(counts)
+        for bucket, count in enumerate(counts):
+            if count:
+                height = max(zoom, count * (row_height - 2 * zoom) // most)
+                pygame.draw.rect(screen, _HISTOGRAM_COLOR,
+                                 (graph_left + bucket * bucket_width,
+                                  bottom - height,
+                                  bucket_width - zoom, height))
+
+        for fraction, color in _PERCENTILE_COLORS:
+            x = graph_left \
+                + _timing_to_x(profiler.percentile(name, fraction), zoom)
+            pygame.draw.line(screen, color, (x, y + zoom), (x, bottom),
+                             zoom)
+
+        bfont.write(screen, name, (left + zoom, y))
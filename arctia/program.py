@@ -0,0 +1,337 @@
+"""
+The program module provides a class (TaskProgram) for chaining tasks.
+"""
+from .tasks import Build, Contribute, Drop, Eat, Go, GoBeside, \
+                   GoToAnyMatchingSpot, Mine, Take, Teleport, Wait
+
+# What a step does if its task is blocked: either give up the program,
+# or give it up and then drop the carried entity on a free spot.
+ABORT = 'abort'
+DUMP = 'dump'
+
+_GO_TO_FREE_SPOT = ('go_to_free_spot',)
+
+def _die_cannot_dump():
+    assert False, 'error: no accessible dump location'
+
+class TaskProgram(object):
+    """
+    A TaskProgram is a sequence of steps for a unit to carry out.
+
+    Each step is a tuple of plain data naming a task and its arguments:
+
+        ('go', target, delay, on_block)
+        ('go_beside', target, delay)
+        ('go_to_free_spot',)
+        ('take', entity)
+        ('drop', entity, on_block)
+        ('eat', entity)
+        ('mine', target)
+        ('build', target)
+        ('wait', duration)
+        ('teleport', target)
+        ('contribute', entity, job)
+
+    where on_block is ABORT or DUMP.  The program makes the task of
+    one step at a time, moving on to the next step when the task is
+    finished.  When the last step is finished, the designation of the
+    program (if any) is completed.  If a task is blocked, the program
+    is aborted.  Either way, the unit's reservations are deleted.
+
+    A unit may carry an entity which it needs to get rid of if its
+    program fails, e.g., a hauler whose stockpile is walled off.  Such
+    a unit dumps the entity on a free spot (outside a given stockpile,
+    if any) by way of a new program.
+
+    Since a program is plain data plus the state of its current task,
+    it can be saved and resumed later.
+
+    Units are re-tasked all the time, so each unit keeps one program
+    (see assign_program) which is reset for every new job rather than
+    making a new one, and the procedures handed to tasks are made once
+    per program rather than once per task.
+
+    Arguments:
+        stage: the Stage containing the unit
+        unit: the unit which shall carry out the program
+        designation: the designation of the job, or None
+        steps: the list of steps
+        carried: the entity to dump if a step is blocked with DUMP,
+                 or None
+        avoided_stockpile: the stockpile not to dump the carried
+                           entity in, or None
+        dump_after: whether to dump the carried entity once the
+                    program is finished
+        idle: whether the unit is only passing the time, e.g., by
+              wandering around
+    """
+    def __init__(self, stage, unit, designation=None, steps=(),
+                 carried=None, avoided_stockpile=None, dump_after=False,
+                 idle=False):
+        self.stage = stage
+        self.unit = unit
+
+        # How many times the program has been reset, so that a step
+        # can tell whether the program was reset while it was made.
+        self._generation = 0
+
+        # Bound methods are made anew whenever they are looked up, so
+        # look up the ones given to tasks only once.
+        self._advance_proc = self._advance
+        self._abort_proc = self._abort
+        self._abort_and_dump_proc = self._abort_and_dump
+        self._is_free_spot_func = self._is_free_spot
+
+        self.reset(designation, steps, carried, avoided_stockpile,
+                   dump_after, idle)
+
+    def reset(self, designation, steps, carried=None,
+              avoided_stockpile=None, dump_after=False, idle=False):
+        """
+        Make the program carry out a new list of steps.
+
+        The program must not be running, i.e., it must not be the
+        task of its unit.  The arguments are the same as for making
+        a new TaskProgram.
+        """
+        assert self.unit.task is not self, \
+               'tried to reset a running program'
+
+        self.designation = designation
+        self.steps = steps
+        self.carried = carried
+        self.avoided_stockpile = avoided_stockpile
+        self.dump_after = dump_after
+        self.idle = idle
+
+        # The index of the current step.
+        self.pc = 0
+
+        # The task of the current step.
+        self.task = None
+
+        self._done = False
+        self._generation += 1
+
+    def start(self, deps=()):
+        """
+        Make the reservations of the program and start its first step.
+
+        Arguments:
+            deps: the list of things which should be reserved for the
+                unit to carry out the program.  This must be a list of
+                tuples of the following form: [(kind, obj), ...].  For
+                example, [('location', (2, 2))] means the unit should
+                reserve the location at coordinates (2, 2).
+        """
+        unit = self.unit
+        unit.task = self
+
+        if unit.team:
+            for kind, obj in deps:
+                unit.team.reserve(kind, obj, unit)
+
+        self._begin_step()
+
+    def resume(self, pc, state):
+        """
+        Resume a saved program at a step, without starting anything.
+
+        Arguments:
+            pc: the index of the current step
+            state: the state of the current step's task
+        """
+        self.pc = pc
+        self.unit.task = self
+        self.task = self._make_task(self.steps[pc], state)
+
+    def enact(self):
+        """
+        Enact the current task.
+
+        Returns: the number of turns until the program needs to be
+                 enacted again, or None if it should be enacted
+                 again next turn
+        """
+        return self.task.enact()
+
+    def get_state(self):
+        """
+        Return the state of the current task as plain data.
+
+        Returns: the state, for resume
+        """
+        return self.task.get_state()
+
+    def _begin_step(self):
+        if self.pc == len(self.steps):
+            self._finish()
+            return
+
+        pc = self.pc
+        generation = self._generation
+        task = self._make_task(self.steps[pc])
+
+        # A task may finish or fail while it is being made, in which
+        # case the program has already moved on, or even been reset.
+        if self.pc == pc and self._generation == generation \
+           and not self._done:
+            self.task = task
+
+    def _advance(self):
+        self.pc += 1
+        self._begin_step()
+
+    def _stop(self):
+        self._done = True
+        unit = self.unit
+        if unit.team:
+            unit.team.relinquish_all(unit)
+        if unit.task is self:
+            unit.task = None
+
+    def _abort(self):
+        self._stop()
+
+    def _abort_and_dump(self):
+        self._stop()
+        self._dump()
+
+    def _finish(self):
+        self._stop()
+        if self.designation:
+            self.unit.team.designations.complete(self.designation)
+        if self.dump_after:
+            self._dump()
+
+    def _dump(self):
+        dump(self.stage, self.unit, self.carried, self.avoided_stockpile)
+
+    def _blocked_proc(self, on_block):
+        if on_block == DUMP:
+            return self._abort_and_dump_proc
+        return self._abort_proc
+
+    def _is_free_spot(self, loc):
+        stock = self.avoided_stockpile
+        return not self.stage.entity_at(loc) \
+               and not self.unit.team.is_reserved('location', loc) \
+               and not (stock and stock.containsloc(loc))
+
+    def _make_task(self, step, state=None):
+        stage = self.stage
+        unit = self.unit
+        kind = step[0]
+
+        if kind == 'go':
+            _, target, delay, on_block = step
+            return Go(stage, unit, target, delay=delay,
+                      blocked_proc=self._blocked_proc(on_block),
+                      finished_proc=self._advance_proc,
+                      state=state)
+        elif kind == 'go_beside':
+            _, target, delay = step
+            return GoBeside(stage, unit, target, delay=delay,
+                            blocked_proc=self._abort_proc,
+                            finished_proc=self._advance_proc,
+                            state=state)
+        elif kind == 'go_to_free_spot':
+            return GoToAnyMatchingSpot(stage, unit,
+                                       condition_func=self._is_free_spot_func,
+                                       impossible_proc=_die_cannot_dump,
+                                       finished_proc=self._advance_proc,
+                                       state=state)
+        elif kind == 'take':
+            _, entity = step
+            return Take(stage, unit, entity,
+                        not_found_proc=self._abort_proc,
+                        finished_proc=self._advance_proc,
+                        state=state)
+        elif kind == 'drop':
+            _, entity, on_block = step
+            return Drop(stage, entity, unit,
+                        blocked_proc=self._blocked_proc(on_block),
+                        finished_proc=self._advance_proc,
+                        state=state)
+        elif kind == 'eat':
+            _, entity = step
+            return Eat(stage, unit, entity,
+                       interrupted_proc=self._abort_proc,
+                       finished_proc=self._advance_proc,
+                       state=state)
+        elif kind == 'mine':
+            _, target = step
+            return Mine(stage, unit, target,
+                        finished_proc=self._advance_proc,
+                        state=state)
+        elif kind == 'build':
+            _, target = step
+            return Build(stage, unit, target,
+                         finished_proc=self._advance_proc,
+                         state=state)
+        elif kind == 'wait':
+            _, duration = step
+            return Wait(duration=duration,
+                        finished_proc=self._advance_proc,
+                        state=state)
+        elif kind == 'teleport':
+            _, target = step
+            return Teleport(stage, unit, target,
+                            finished_proc=self._advance_proc,
+                            state=state)
+        elif kind == 'contribute':
+            _, entity, job = step
+            return Contribute(entity, job,
+                              finished_proc=self._advance_proc,
+                              state=state)
+
+        assert False, 'unknown step kind: %s' % (kind,)
+
+def assign_program(stage, unit, designation, deps, steps, carried=None,
+                   avoided_stockpile=None, dump_after=False, idle=False):
+    """
+    Assign a unit to carry out a list of steps.
+
+    The unit's TaskProgram is reused if it has one, so that assigning
+    a job does not make a new program every time.
+
+    Arguments:
+        stage: the Stage containing the unit
+        unit: the unit which shall carry out the program
+        designation: the designation of the job, or None
+        deps: the list of (kind, obj) things to reserve for the unit
+        steps: the list of steps
+        carried, avoided_stockpile, dump_after, idle: as for
+            TaskProgram
+
+    Returns: the program
+    """
+    program = unit.program
+    if program is None:
+        program = TaskProgram(stage, unit, designation, steps, carried,
+                              avoided_stockpile, dump_after, idle)
+        unit.program = program
+    else:
+        program.reset(designation, steps, carried, avoided_stockpile,
+                      dump_after, idle)
+
+    program.start(deps)
+    return program
+
+def dump(stage, unit, entity, avoided_stockpile=None):
+    """
+    Make a unit drop an entity it is carrying on the nearest free spot.
+
+    Arguments:
+        stage: the Stage containing the unit
+        unit: the unit carrying the entity
+        entity: the entity
+        avoided_stockpile: a stockpile not to drop the entity in,
+                           or None
+    """
+    assign_program(stage, unit, None,
+                   [('entity', entity)],
+                   [_GO_TO_FREE_SPOT,
+                    ('drop', entity, DUMP)],
+                   carried=entity,
+                   avoided_stockpile=avoided_stockpile)
@@ -0,0 +1,246 @@
+"""
+The replay module provides recording and replaying of games.
+
+A game is recorded as a small text log.  The log starts with a header
+naming the map and the seed, then lists every use of a tool with the
+turn on which it happened, and ends with the number of turns played:
+
+    arctia-log 1
+    map maps/tuxville.tmx
+    seed 1234
+    12 start mine 40 70
+    15 stop mine 44 72
+    end 3000
+
+Since games are deterministic, replaying the log reproduces the game
+exactly, which makes recorded games useful as benchmarks.
+"""
+import argparse
+import sys
+import time
+
+from .game import Game, find_tool
+
+_MAGIC = 'arctia-log 1'
+
+class Recorder(object):
+    """
+    A Recorder writes the tool uses of a game to a log file.
+
+    Every tool use is written out right away, so the log survives even
+    if the game crashes; only the closing 'end' line would be missing.
+
+    Arguments:
+        path: the path of the log file to write
+        map_path: the path of the map of the game
+        seed: the seed of the game
+    """
+    def __init__(self, path, map_path, seed):
+        self._file = open(path, 'w')
+        self._file.write('%s\nmap %s\nseed %d\n' % (_MAGIC, map_path, seed))
+        self._file.flush()
+
+    def record(self, turn, action, tool_name, position):
+        """
+        Write a tool use to the log.
+
+        Arguments:
+            turn: the number of the turn the tool was used before
+            action: 'start' or 'stop'
+            tool_name: the name of the tool, e.g., 'mine'
+            position: the (x, y) coordinates of the tile
+        """
+        self._file.write('%d %s %s %d %d\n'
+                         % ((turn, action, tool_name) + tuple(position)))
+        self._file.flush()
+
+    def close(self, turn):
+        """
+        Finish the log.
+
+        Arguments:
+            turn: the number of turns played
+        """
+        if not self._file.closed:
+            self._file.write('end %d\n' % (turn,))
+            self._file.close()
+
+class Log(object):
+    """
+    A Log is a recorded game read back from a log file.
+
+    Arguments:
+        path: the path of the log file
+    """
+    def __init__(self, path):
+        with open(path) as f:
+            lines = f.read().splitlines()
+
+        assert lines and lines[0] == _MAGIC, \
+               'not an arctia log: %s' % (path,)
+
+        self.map_path = lines[1].split(' ', 1)[1]
+        self.seed = int(lines[2].split(' ', 1)[1])
+
+        # The tool uses as (turn, action, tool_name, (x, y)) tuples.
+        self.actions = []
+
+        # The number of turns played, if the log is complete.
+        self.end_turn = None
+
+        for line in lines[3:]:
+            fields = line.split()
+            if fields[0] == 'end':
+                self.end_turn = int(fields[1])
+            else:
+                turn, action, tool_name, x, y = fields
+                self.actions.append(
+                  (int(turn), action, tool_name, (int(x), int(y))))
+
+        if self.end_turn is None:
+            self.end_turn = self.actions[-1][0] if self.actions else 0
+
+def replay(log, turns=None, turn_proc=None, profile=False):
+    """
+    Replay a recorded game.
+
+    Arguments:
+        log: the Log
+        turns: how many turns to play, or None to play as many as
+               were recorded
+        turn_proc: a function to call with the game after every turn,
+                   e.g., to draw it, or None
+        profile: whether to enable the profiler of the game, whose
+                 timings can then be taken from game.stage.profiler
+
+    Returns: a pair of the Game and a list of how long (in seconds)
+             each turn took to play
+    """
+    if turns is None:
+        turns = log.end_turn
+
+    game = Game(log.map_path, log.seed)
+    game.stage.profiler.enabled = profile
+    actions = log.actions
+    next_action = 0
+    timings = []
+
+    for turn in range(turns):
+        while next_action < len(actions) \
+              and actions[next_action][0] <= turn:
+            _, action, tool_name, position = actions[next_action]
+            game.use_tool(action, find_tool(tool_name), position)
+            next_action += 1
+
+        start = time.perf_counter()
+        game.play_turn()
+        timings.append(time.perf_counter() - start)
+
+        if turn_proc:
+            turn_proc(game)
+
+    return game, timings
+
+def describe_timings(timings):
+    """
+    Summarize per-turn timings for a report.
+
+    Arguments:
+        timings: a list of how long (in seconds) each turn took
+
+    Returns: a string describing the timings in milliseconds
+    """
+    if not timings:
+        return 'no turns played'
+
+    ordered = sorted(timings)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    return ('turns %d  total %.3fs  mean %.3fms  median %.3fms  '
+            'p95 %.3fms  p99 %.3fms  max %.3fms'
+            % (len(timings), sum(timings),
+               sum(timings) / len(timings) * 1000,
+               percentile(0.5) * 1000, percentile(0.95) * 1000,
+               percentile(0.99) * 1000, ordered[-1] * 1000))
+
+def describe_sections(summary):
+    """
+    Summarize the timings of the sections of a game for a report.
+
+    Arguments:
+        summary: the timings, as returned by Profiler.summary
+
+    Returns: a string describing the timings in milliseconds, one
+             line per section, slowest in total first
+    """
+    names = sorted(summary, key=lambda name: -summary[name]['total'])
+    width = max([len(name) for name in names] + [0])
+
+    return '\n'.join('%-*s  calls %7d  total %9.3fms  mean %.3fms  '
+                     'p90 %.3fms  p99 %.3fms'
+                     % (width, name, summary[name]['count'],
+                        summary[name]['total'] * 1000,
+                        summary[name]['mean'] * 1000,
+                        summary[name]['p90'] * 1000,
+                        summary[name]['p99'] * 1000)
+                     for name in names)
+
+def _make_drawer():
+    import pygame
+    from .camera import Camera
+    from .config import SCREEN_REAL_DIMS, SCREEN_ZOOM, \
+                        SCREEN_LOGICAL_WIDTH, SCREEN_LOGICAL_HEIGHT
+    from .resources import load_image
+    from .tileset import Tileset
+
+    pygame.init()
+    screen = pygame.display.set_mode(SCREEN_REAL_DIMS)
+    tileset = Tileset(load_image('gfx/tileset.png'), SCREEN_ZOOM)
+    camera = None
+
+    def draw(game):
+        nonlocal camera
+        if camera is None:
+            start_x, start_y = game.stage.get_player_start_pos()
+            camera = Camera(start_x + 8 - SCREEN_LOGICAL_WIDTH // 2,
+                            start_y + 8 - SCREEN_LOGICAL_HEIGHT // 2)
+
+        pygame.event.pump()
+        screen.fill((0, 0, 0))
+        game.stage.draw(screen, tileset, camera)
+        for pile in game.player_team.stockpiles:
+            pile.draw(screen, tileset, camera)
+        game.unit_draw_system.update(screen, tileset, camera)
+        pygame.display.flip()
+
+    return draw
+
+def main(argv=None):
+    """
+    Replay a recorded game and report how long its turns took.
+    """
+    parser = argparse.ArgumentParser(
+               description='Replay a recorded game of Arctia.')
+    parser.add_argument('log', help='the log file to replay')
+    parser.add_argument('--turns', type=int, default=None,
+                        help='how many turns to play '
+                             '(default: as many as were recorded)')
+    parser.add_argument('--render', action='store_true',
+                        help='draw the game while replaying it')
+    parser.add_argument('--profile', action='store_true',
+                        help='also report the timings of every section '
+                             'of the game')
+    args = parser.parse_args(argv)
+
+    log = Log(args.log)
+    turn_proc = _make_drawer() if args.render else None
+    game, timings = replay(log, args.turns, turn_proc, args.profile)
+
+    print(describe_timings(timings))
+    if args.profile:
+        print(describe_sections(game.stage.profiler.summary()))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,424 @@
+"""
+The savegame module provides saving and loading games as binary files.
+
+A save file starts with a short magic line, followed by a pickle of a
+snapshot of the game made of plain data only: numbers, strings, bytes,
+tuples, lists, dicts and None.  Loading uses an unpickler which refuses
+to look up any class or function, so a save file can never run code.
+
+Large arrays (the tiles, the neighbor masks, the columns of the unit
+store and the partitions of units) are written as raw buffers of
+fixed-size numbers, and loading restores them as they are instead of
+recomputing them.
+
+Objects referred to from several places (entities, jobs, stockpiles,
+units and the team) are written once in a table and referred to by
+('@', table, index) tuples everywhere else.
+"""
+import pickle
+import sys
+from array import array
+
+from .entity import Entity
+from .game import Game
+from .kinds import KIND_NAMES, make_diet
+from .mobs import Bug, Gnoose, Penguin
+from .program import TaskProgram
+from .stage import make_blank_stage
+from .stockpile import Stockpile
+from .team import Team
+from .units import Unit
+
+_MAGIC = b'arctia-save 2\n'
+_PROTOCOL = 4
+
+# The columns of the unit store holding numbers.
+_UNIT_COLUMNS = ('x', 'y', 'prev_x', 'prev_y', 'hunger_zero_turn',
+                 'hunger_threshold', 'movement_delay', 'wandering_delay',
+                 'brooding_duration', 'components')
+
+_UNIT_CLASSES = {cls.__name__: cls for cls in (Bug, Gnoose, Penguin)}
+
+class _PlainUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(
+                'save files may not refer to %s.%s' % (module, name))
+
+def _pack(values, typecode):
+    return array(typecode, values).tobytes()
+
+def _unpack(data, typecode, byteorder):
+    values = array(typecode)
+    values.frombytes(data)
+    if byteorder != sys.byteorder:
+        values.byteswap()
+    return values
+
+def _pack_grid(grid, typecode):
+    return _pack((value for row in grid for value in row), typecode)
+
+def _unpack_grid(data, typecode, byteorder, width, height):
+    values = _unpack(data, typecode, byteorder)
+    return [values[y * width:(y + 1) * width].tolist()
+            for y in range(height)]
+
+def _pack_partition(part):
+    return b''.join(bytes(row) for row in part)
+
+def _unpack_partition(data, width, height):
+    return [[bool(value) for value in data[y * width:(y + 1) * width]]
+            for y in range(height)]
+
+class _Encoder(object):
+    """
+    An _Encoder turns game objects into plain data, filling in the
+    tables of entities and jobs as it comes across them.
+    """
+    def __init__(self, game):
+        self._team = game.player_team
+        self._stockpile_indexes = \
+          {id(stock): i for i, stock in enumerate(self._team.stockpiles)}
+
+        self.entities = []
+        self._entity_indexes = {}
+        for entity in game.stage.get_entities():
+            self._entity_index(entity)
+
+        self.jobs = []
+        self._job_indexes = {}
+        for job in self._team.designations:
+            self._job_index(job)
+
+    def _entity_index(self, entity):
+        key = id(entity)
+        if key not in self._entity_indexes:
+            self._entity_indexes[key] = len(self.entities)
+            self.entities.append(entity)
+        return self._entity_indexes[key]
+
+    def _job_index(self, job):
+        key = id(job)
+        if key not in self._job_indexes:
+            self._job_indexes[key] = len(self.jobs)
+            self.jobs.append(job)
+        return self._job_indexes[key]
+
+    def encode(self, value):
+        """
+        Return a value as plain data.  Dicts are taken to be jobs.
+        """
+        if isinstance(value, tuple):
+            assert not value or value[0] != '@', \
+                   'tuple looks like a reference: %r' % (value,)
+            return tuple(self.encode(item) for item in value)
+        elif isinstance(value, list):
+            return [self.encode(item) for item in value]
+        elif isinstance(value, dict):
+            return '@', 'job', self._job_index(value)
+        elif isinstance(value, Entity):
+            return '@', 'entity', self._entity_index(value)
+        elif isinstance(value, Unit):
+            return '@', 'unit', value.index
+        elif isinstance(value, Stockpile):
+            return '@', 'stockpile', self._stockpile_indexes[id(value)]
+        elif value is self._team:
+            return '@', 'team', 0
+        elif value is None or isinstance(value, (bool, int, str)):
+            return value
+
+        assert False, 'cannot save value: %r' % (value,)
+
+    def encode_jobs(self):
+        """
+        Return the table of jobs, each as a pair of whether it is on
+        the board and its dict with plain values.
+        """
+        board = self._team.designations
+        result = []
+
+        # Encoding a job may come across more jobs.
+        i = 0
+        while i < len(self.jobs):
+            job = self.jobs[i]
+            posted = i < len(board)
+            result.append((posted, {key: self.encode(value)
+                                    for key, value in job.items()}))
+            i += 1
+
+        return result
+
+    def encode_entities(self):
+        """
+        Return the table of entities as raw buffers.
+        """
+        xs = []
+        ys = []
+
+        for entity in self.entities:
+            if entity.location is None:
+                xs.append(-1)
+                ys.append(-1)
+            else:
+                xs.append(entity.location[0])
+                ys.append(entity.location[1])
+
+        return {
+            'codes': bytes(entity.kind for entity in self.entities),
+            'x': _pack(xs, 'q'),
+            'y': _pack(ys, 'q')
+        }
+
+class _Decoder(object):
+    """
+    A _Decoder turns plain data from a snapshot back into game objects.
+    """
+    def __init__(self, tables):
+        self._tables = tables
+
+    def decode(self, value):
+        if isinstance(value, tuple):
+            if value and value[0] == '@':
+                _, table, index = value
+                return self._tables[table][index]
+            return tuple(self.decode(item) for item in value)
+        elif isinstance(value, list):
+            return [self.decode(item) for item in value]
+        return value
+
+def snapshot_game(game):
+    """
+    Return a snapshot of a game as plain data.
+
+    Arguments:
+        game: the Game
+
+    Returns: a dict which only holds plain data
+    """
+    stage = game.stage
+    team = game.player_team
+    store = stage.units
+    encoder = _Encoder(game)
+    encode = encoder.encode
+
+    assert [unit.index for unit in game.mobs] == list(range(len(store))), \
+           'mobs are not in the order of the unit store'
+
+    # Units sharing a partition are saved sharing it.
+    partitions = []
+    partition_indexes = []
+    seen = {}
+    for unit in store.units:
+        if unit.partition is None:
+            partition_indexes.append(-1)
+            continue
+        key = id(unit.partition)
+        if key not in seen:
+            seen[key] = len(partitions)
+            partitions.append(_pack_partition(unit.partition))
+        partition_indexes.append(seen[key])
+
+    programs = []
+    for unit in store.units:
+        program = unit.task
+        if program is not None:
+            programs.append(
+              (unit.index, encode(program.designation),
+               encode(program.steps), program.pc,
+               encode(program.carried),
+               encode(program.avoided_stockpile),
+               program.dump_after, program.idle,
+               encode(program.get_state())))
+
+    dispatch_state = game.unit_dispatch_system.get_state()
+
+    snapshot = {
+        'byteorder': sys.byteorder,
+        'map_path': game.map_path,
+        'seed': game.seed,
+        'kinds': KIND_NAMES,
+        'random': stage.random.getstate(),
+        'work_amounts': sorted(stage.work_amounts.items()),
+        'stage': {
+            'width': stage.width,
+            'height': stage.height,
+            'player_start_loc': stage.player_start_loc,
+            'tiles': _pack_grid(stage.data, 'H'),
+            'walkable_masks': _pack_grid(stage.walkable_masks, 'B'),
+            'solid_masks': _pack_grid(stage.solid_masks, 'B')
+        },
+        'stockpiles': [((stock.x, stock.y, stock.width, stock.height),
+                        list(stock.accepted_kinds))
+                       for stock in team.stockpiles],
+        'units': {
+            'turn': store.turn,
+            'classes': [type(unit).__name__ for unit in store.units],
+            'columns': {name: _pack(getattr(store, name), 'q')
+                        for name in _UNIT_COLUMNS},
+            'teams': bytes(team_ is not None for team_ in store.team),
+            'clips': [unit.clip for unit in store.units],
+            'diets': [unit.hunger_diet for unit in store.units],
+            'partitions': partitions,
+            'partition_indexes': partition_indexes
+        },
+        'programs': programs,
+        'reservations': [encode(reservation)
+                         for reservation in team.describe_reservations()],
+        'hauling_order': encode(team.get_hauling_order()),
+        'dispatch': {key: encode(value)
+                     for key, value in dispatch_state.items()},
+        'partition': game.partition_system.get_state()
+    }
+
+    # The tables go last, since encoding fills them in.
+    snapshot['jobs'] = encoder.encode_jobs()
+    snapshot['entities'] = encoder.encode_entities()
+
+    return snapshot
+
+def save_game(game, path):
+    """
+    Save a game to a file.
+
+    Arguments:
+        game: the Game
+        path: the path of the file to write
+    """
+    with open(path, 'wb') as f:
+        f.write(_MAGIC)
+        pickle.dump(snapshot_game(game), f, protocol=_PROTOCOL)
+
+def load_game(path):
+    """
+    Load a game saved by save_game.
+
+    Arguments:
+        path: the path of the save file
+
+    Returns: the Game, which does not record its tool uses
+    """
+    with open(path, 'rb') as f:
+        assert f.read(len(_MAGIC)) == _MAGIC, \
+               'not an arctia save: %s' % (path,)
+        snapshot = _PlainUnpickler(f).load()
+
+    return restore_game(snapshot)
+
+def restore_game(snapshot):
+    """
+    Make a game from a snapshot made by snapshot_game.
+
+    Arguments:
+        snapshot: the snapshot
+
+    Returns: the Game
+    """
+    byteorder = snapshot['byteorder']
+    assert snapshot['kinds'] == KIND_NAMES, \
+           'the save was made with other kinds of entity'
+
+    # Restore the stage.
+    info = snapshot['stage']
+    width, height = info['width'], info['height']
+    stage = make_blank_stage(
+              width, height,
+              _unpack_grid(info['tiles'], 'H', byteorder, width, height),
+              _unpack_grid(info['walkable_masks'], 'B', byteorder,
+                           width, height),
+              _unpack_grid(info['solid_masks'], 'B', byteorder,
+                           width, height))
+    stage.player_start_loc = info['player_start_loc']
+    stage.random.setstate(snapshot['random'])
+    stage.work_amounts = dict(snapshot['work_amounts'])
+
+    game = Game.__new__(Game)
+    game.map_path = snapshot['map_path']
+    game.seed = snapshot['seed']
+    game.recorder = None
+    game.stage = stage
+
+    # Restore the entities, putting them on the stage in saved order.
+    info = snapshot['entities']
+    xs = _unpack(info['x'], 'q', byteorder)
+    ys = _unpack(info['y'], 'q', byteorder)
+    entities = []
+    for code, x, y in zip(info['codes'], xs, ys):
+        location = (x, y) if x >= 0 else None
+        entity = Entity(code, location)
+        if location is not None:
+            stage.add_entity(entity, location)
+        entities.append(entity)
+
+    game.player_team = team = Team(stage)
+
+    # Make every job before filling them in, since jobs refer to each
+    # other.
+    jobs = [{} for _ in snapshot['jobs']]
+    stockpiles = []
+    tables = {
+        'entity': entities,
+        'job': jobs,
+        'stockpile': stockpiles,
+        'unit': stage.units.units,
+        'team': [team]
+    }
+    decode = _Decoder(tables).decode
+
+    for job, (_, body) in zip(jobs, snapshot['jobs']):
+        for key, value in body.items():
+            job[key] = decode(value)
+    team.designations.extend(
+      job for job, (posted, _) in zip(jobs, snapshot['jobs']) if posted)
+
+    for rect, kinds in snapshot['stockpiles']:
+        stock = Stockpile(stage, rect, kinds)
+        team.add_stockpile(stock)
+        stockpiles.append(stock)
+
+    # Restore the units, then overwrite the columns of the store.
+    info = snapshot['units']
+    store = stage.units
+    store.turn = info['turn']
+    mobs = []
+    for name in info['classes']:
+        cls = _UNIT_CLASSES[name]
+        unit = cls.__new__(cls)
+        Unit.__init__(unit, store, 0, 0)
+        mobs.append(unit)
+
+    for name in _UNIT_COLUMNS:
+        setattr(store, name,
+                array('l', _unpack(info['columns'][name], 'q', byteorder)))
+    store.reindex()
+
+    partitions = [_unpack_partition(data, width, height)
+                  for data in info['partitions']]
+
+    for unit, has_team, clip, diet, partition_index in \
+        zip(mobs, info['teams'], info['clips'], info['diets'],
+            info['partition_indexes']):
+        unit.team = team if has_team else None
+        unit.clip = clip
+        unit.hunger_diet = make_diet(dict(enumerate(diet)))
+        if partition_index >= 0:
+            unit.partition = partitions[partition_index]
+
+    # Resume the programs of units where they left off.
+    for index, designation, steps, pc, carried, avoided, dump_after, \
+        idle, state in snapshot['programs']:
+        program = TaskProgram(stage, mobs[index], decode(designation),
+                              decode(steps), carried=decode(carried),
+                              avoided_stockpile=decode(avoided),
+                              dump_after=dump_after, idle=idle)
+        mobs[index].program = program
+        program.resume(pc, decode(state))
+
+    for owner, kind, obj in snapshot['reservations']:
+        team.reserve(kind, decode(obj), decode(owner))
+    team.set_hauling_order(decode(snapshot['hauling_order']))
+
+    game._setup_systems(mobs)
+    game.unit_dispatch_system.set_state(
+      {key: decode(value) for key, value in snapshot['dispatch'].items()})
+    game.partition_system.set_state(snapshot['partition'])
+
+    return game
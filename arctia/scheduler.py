@@ -0,0 +1,57 @@
+"""
+The scheduler module provides a class (Scheduler) for timing events.
+"""
+import heapq
+
+class Scheduler(object):
+    """
+    A Scheduler holds items until the turn at which they are due.
+
+    Items are kept in a heap, so scheduling an item and taking out a
+    due item are O(log n), and nothing is spent on items which are not
+    yet due.  Items due on the same turn come out in the order they
+    were scheduled.
+    """
+    def __init__(self):
+        self._heap = []
+        self._count = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, turn, item):
+        """
+        Schedule an item to become due at a turn.
+
+        Arguments:
+            turn: the number of the turn
+            item: the item
+        """
+        heapq.heappush(self._heap, (turn, self._count, item))
+        self._count += 1
+
+    def items(self):
+        """
+        Return every scheduled item along with its turn.
+
+        Returns: a list of (turn, item) pairs in the order the items
+                 will become due
+        """
+        return [(turn, item) for turn, _, item in sorted(self._heap)]
+
+    def pop_due(self, turn):
+        """
+        Take out every item which is due at or before a turn.
+
+        Arguments:
+            turn: the number of the current turn
+
+        Returns: a list of the due items, earliest first
+        """
+        due = []
+        heap = self._heap
+
+        while heap and heap[0][0] <= turn:
+            due.append(heapq.heappop(heap)[2])
+
+        return due
@@ -3,7 +3,8 @@ The astar module provides a function (astar) which does A* path finding.
 """
 import math
 import heapq
-from ..common import tile_is_solid, make_2d_constant_array
+from ..common import tile_is_solid, make_2d_constant_array, \
+                    NEIGHBOR_BITS, OFFSETS_BY_MASK
 from ..path import reconstruct_path
 from ..transform import translate
 
@@ -39,8 +40,15 @@ def astar(stage, start, end):
     scost = make_2d_constant_array(stage.width, stage.height, math.inf)
     scost[start[1]][start[0]] = 0
 
-    offsets = [(-1, -1), (0, -1), (1, -1), (-1, 0),
-               (1, 0), (-1, 1), (0, 1), (1, 1)]
+    # Whether each location has been put in the open set.  Locations
+    # leave the open set only to enter the closed set, so this stands
+    # in for scanning the open set.
+    opened = make_2d_constant_array(stage.width, stage.height, False)
+    opened[start[1]][start[0]] = True
+
+    walkable_masks = stage.walkable_masks
+    solid_masks = stage.solid_masks
+    end_x, end_y = end
 
     while openset:
         current = heapq.heappop(openset)[1]
@@ -50,20 +58,25 @@ def astar(stage, start, end):
 
         closedset.add(current)
 
-        if tile_is_solid(stage.get_tile_at(*current)):
+        x, y = current
+        if tile_is_solid(stage.data[y][x]):
             continue
 
-        for offset in offsets:
-            neighbor = translate(current, offset)
+        # Solid tiles are dead ends, so the only one worth visiting
+        # is the end itself.
+        mask = walkable_masks[y][x]
+        if abs(end_x - x) <= 1 and abs(end_y - y) <= 1 \
+           and (end_x - x, end_y - y) != (0, 0):
+            mask |= solid_masks[y][x] & NEIGHBOR_BITS[end_x - x, end_y - y]
 
-            if neighbor[0] < 0 or neighbor[0] >= stage.width \
-               or neighbor[1] < 0 or neighbor[1] >= stage.height:
-                continue
+        for offset in OFFSETS_BY_MASK[mask]:
+            neighbor = translate(current, offset)
 
             if neighbor in closedset:
                 continue
 
-            if neighbor not in map(lambda p: p[1], openset):
+            if not _index(opened, neighbor):
+                opened[neighbor[1]][neighbor[0]] = True
                 heapq.heappush(openset, (_index(scost, current) \
                                          + _calc_distance(neighbor,
                                                           end),
@@ -1,8 +1,9 @@
 """
 The breadth module provides a function for breadth-first searching.
 """
-from itertools import product
-from ..common import make_2d_constant_array, tile_is_solid
+from collections import deque
+from ..common import make_2d_constant_array, tile_is_solid, \
+                    OFFSETS_BY_MASK
 from ..path import reconstruct_path
 
 def find_path_to_matching(stage, start, cond):
@@ -14,26 +15,29 @@ def find_path_to_matching(stage, start, cond):
         start: the starting point of the search
         cond: a lambda taking coordinates and returning True/False
     """
-    fringe = [start]
+    fringe = deque([start])
     visited = make_2d_constant_array(stage.width, stage.height, False)
     visited[start[1]][start[0]] = True
     previous = make_2d_constant_array(stage.width, stage.height, None)
 
+    walkable_masks = stage.walkable_masks
+    solid_masks = stage.solid_masks
+
     while fringe:
-        node = fringe[0]
-        fringe = fringe[1:]
+        node = fringe.popleft()
 
         if cond(node):
             return list(reversed(reconstruct_path(previous, node)))
 
-        if tile_is_solid(stage.get_tile_at(node[0], node[1])):
+        x, y = node
+        if tile_is_solid(stage.data[y][x]):
             continue
 
-        for offset in product((1, 0, -1), (1, 0, -1)):
-            if offset == (0, 0):
-                continue
+        # Solid neighbors may still match, so they are visited too.
+        mask = walkable_masks[y][x] | solid_masks[y][x]
 
-            neighbor = (node[0] + offset[0], node[1] + offset[1])
+        for dx, dy in OFFSETS_BY_MASK[mask]:
+            neighbor = (x + dx, y + dy)
 
             if not visited[neighbor[1]][neighbor[0]]:
                 visited[neighbor[1]][neighbor[0]] = True
@@ -0,0 +1,64 @@
+"""
+The speeds module provides the game speeds the player can choose from.
+
+Each speed is a dict with a 'tooltip' and a 'factor', which is how many
+times faster than normal the game is played.  The factor of the paused
+speed is 0, and the factor of the maximum speed is MAX_FACTOR, which
+means the game is played as fast as the computer allows.
+"""
+import pygame
+
+MAX_FACTOR = None
+
+PAUSED = {'tooltip': 'Pause', 'factor': 0}
+NORMAL = {'tooltip': 'Normal speed', 'factor': 1}
+DOUBLE = {'tooltip': 'Double speed', 'factor': 2}
+FAST = {'tooltip': 'Fast speed', 'factor': 5}
+MAXIMUM = {'tooltip': 'Maximum speed', 'factor': MAX_FACTOR}
+
+speeds_list = [PAUSED, NORMAL, DOUBLE, FAST, MAXIMUM]
+
+_ACTIVE_COLOR = (255, 255, 255)
+_INACTIVE_COLOR = (96, 96, 96)
+
+def draw_icon(screen, speed, position, active, zoom=1):
+    """
+    Draw the 16x16 menu icon of a speed.
+
+    Arguments:
+        screen: the screen to draw on
+        speed: the speed, e.g., NORMAL
+        position: the (x, y) screen coordinates of the icon
+        active: whether the speed is the current speed
+        zoom: how many times to scale the icon
+    """
+    x, y = position
+    color = _ACTIVE_COLOR if active else _INACTIVE_COLOR
+
+    def rect(left, top, width, height):
+        return (x + left * zoom, y + top * zoom,
+                width * zoom, height * zoom)
+
+    def point(dx, dy):
+        return x + dx * zoom, y + dy * zoom
+
+    if speed is PAUSED:
+        pygame.draw.rect(screen, color, rect(4, 4, 3, 8))
+        pygame.draw.rect(screen, color, rect(9, 4, 3, 8))
+        return
+
+    # One arrow per step up in speed, and a bar for the maximum.
+    arrows = speeds_list.index(speed)
+    if speed is MAXIMUM:
+        arrows -= 1
+    width = 12 // arrows
+
+    for i in range(arrows):
+        left = 2 + i * width
+        pygame.draw.polygon(screen, color,
+                            [point(left, 4),
+                             point(left + width - 1, 8),
+                             point(left, 12)])
+
+    if speed is MAXIMUM:
+        pygame.draw.rect(screen, color, rect(13, 4, 2, 9))
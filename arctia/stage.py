@@ -4,14 +4,26 @@ The stage module provides a class representing the game world.
 import math
 import random
 import pytmx
+from .chunks import ChunkIndex
 from .entity import Entity
-from .config import SCREEN_LOGICAL_WIDTH, SCREEN_LOGICAL_HEIGHT
-from .common import make_2d_constant_array
+from .kinds import ROCK, FISH, KIND_NAMES, KIND_SPRITE_COLUMNS
+from .events import EventBus
+from .profiler import Profiler
+from .tileset import SpriteBatch
+from .units import UnitStore
+from .config import MINING_WORK, BUILDING_WORK, EATING_WORK
+from .common import make_2d_constant_array, tile_is_solid, \
+                    NEIGHBOR_OFFSETS
 from .resources import get_resource_filename
 
-class Stage(object):
+class StageMap(object):
     """
-    A Stage represents the game world, including tiles, objects, etc.
+    A StageMap holds the contents of a map file as plain data.
+
+    Parsing a map file is slow, so a StageMap can be loaded once and
+    then used to make any number of stages, e.g., in every run of a
+    batch of simulations.  A StageMap is never changed by the stages
+    made from it, and it can be pickled to send it to other processes.
 
     Arguments:
         path: a path to a .tmx file containing the stage data
@@ -22,24 +34,20 @@ class Stage(object):
 
         assert tiled_map is not None
 
-        self.mobs = []
+        self.path = path
         self.width = tiled_map.width
         self.height = tiled_map.height
-        self.data = make_2d_constant_array(self.width, self.height, 0)
-        self._entity_matrix = \
-          make_2d_constant_array(self.width, self.height, None)
-
-        # The list of on-stage entities and their coordinates.
-        # Contains tuples of the following format: (entity, x, y)
-        self._entity_list = []
 
         player_start_obj = \
             tiled_map.get_object_by_name('Player Start')
-        player_start_x = player_start_obj.x
-        player_start_y = player_start_obj.y
-        self.player_start_loc = player_start_x, player_start_y
+        self.player_start_loc = player_start_obj.x, player_start_obj.y
 
-        self._tile_change_listeners = []
+        # The tile IDs as a height-by-width array.
+        self.tiles = make_2d_constant_array(self.width, self.height, 0)
+
+        # The entities on the map, in the order they were found, as
+        # (kind code, (x, y)) pairs.
+        self.entities = []
 
         for layer_ref in tiled_map.visible_tile_layers:
             layer = tiled_map.layers[layer_ref]
@@ -50,13 +58,123 @@ class Stage(object):
 
                 # Some tiles add an entity instead of a tile.
                 if tid == 4:
-                    self.create_entity('fish', (x, y))
+                    self.entities.append((FISH, (x, y)))
                     tid = 1
                 elif tid == 6:
-                    self.create_entity('rock', (x, y))
+                    self.entities.append((ROCK, (x, y)))
                     tid = 1
 
-                self.data[y][x] = tid
+                self.tiles[y][x] = tid
+
+class Stage(object):
+    """
+    A Stage represents the game world, including tiles, objects, etc.
+
+    For every tile, a Stage keeps two 8-bit neighbor masks (see
+    NEIGHBOR_OFFSETS in the common module): walkable_masks[y][x] has a
+    bit set for each neighbor of (x, y) which is on the stage and not
+    solid, and solid_masks[y][x] has a bit set for each neighbor which
+    is on the stage and solid.  The masks are kept up to date by
+    set_tile_at, so grid searches can iterate the set bits instead of
+    checking bounds and looking up tiles.
+
+    A Stage also owns the random number generator of the game, so that
+    a game played from the same seed and with the same input always
+    turns out the same, and the rules of the game which may be tuned,
+    e.g., how many turns of work it takes to mine a tile.
+
+    Arguments:
+        path: a path to a .tmx file containing the stage data
+              (see examples in "maps/")
+        seed: the seed of the random number generator, or None to
+              seed it from the system
+        stage_map: the StageMap of path if it is already loaded, or
+                   None to load it
+    """
+    def __init__(self, path, seed=None, stage_map=None):
+        if stage_map is None:
+            stage_map = StageMap(path)
+
+        self._setup(stage_map.width, stage_map.height, seed)
+        self.player_start_loc = stage_map.player_start_loc
+
+        self.data = [list(row) for row in stage_map.tiles]
+        for kind, location in stage_map.entities:
+            self.create_entity(kind, location)
+
+        self._compute_neighbor_masks()
+
+    def _setup(self, width, height, seed):
+        self.random = random.Random(seed)
+
+        # How many turns of work each kind of task takes.
+        self.work_amounts = {
+            'mine': MINING_WORK,
+            'build': BUILDING_WORK,
+            'eat': EATING_WORK
+        }
+
+        self.mobs = []
+        self.units = UnitStore()
+        self.events = EventBus()
+        self.profiler = Profiler()
+        self.width = width
+        self.height = height
+        self.data = make_2d_constant_array(self.width, self.height, 0)
+        self._entity_matrix = \
+          make_2d_constant_array(self.width, self.height, None)
+
+        # The on-stage entities, and the index of each in the list, so
+        # that an entity can be deleted by moving the last one into its
+        # place instead of searching the list: {id(entity): index}
+        self._entity_list = []
+        self._entity_slots = {}
+
+        # The on-stage entities of each kind, by kind code.
+        self._entities_by_kind = [ChunkIndex() for _ in KIND_NAMES]
+
+        self.player_start_loc = 0, 0
+
+        self._tile_change_listeners = []
+        self._entity_change_listeners = []
+
+    def _compute_neighbor_masks(self):
+        self.walkable_masks = \
+          make_2d_constant_array(self.width, self.height, 0)
+        self.solid_masks = \
+          make_2d_constant_array(self.width, self.height, 0)
+
+        for y in range(self.height):
+            for x in range(self.width):
+                walkable = 0
+                solid = 0
+
+                for i, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+                    nx, ny = x + dx, y + dy
+                    if 0 <= nx < self.width and 0 <= ny < self.height:
+                        if tile_is_solid(self.data[ny][nx]):
+                            solid |= 1 << i
+                        else:
+                            walkable |= 1 << i
+
+                self.walkable_masks[y][x] = walkable
+                self.solid_masks[y][x] = solid
+
+    def _update_neighbor_masks(self, x, y):
+        # Only the masks of the neighbors of (x, y) mention it.
+        solid = tile_is_solid(self.data[y][x])
+
+        for i, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self.width and 0 <= ny < self.height:
+                # Seen from the neighbor, (x, y) is the opposite bit.
+                bit = 1 << (7 - i)
+                if solid:
+                    self.walkable_masks[ny][nx] &= ~bit
+                    self.solid_masks[ny][nx] |= bit
+                else:
+                    self.walkable_masks[ny][nx] |= bit
+                    self.solid_masks[ny][nx] &= ~bit
 
     def register_tile_change_listener(self, listener):
         """
@@ -76,56 +194,114 @@ class Stage(object):
         """
         self._tile_change_listeners.append(listener)
 
-    def _draw_tile_at(self, screen, tileset, camera, loc):
-        x, y = loc
-        tid = self.data[y][x]
-        target_x = tid % 16
-        target_y = math.floor(tid / 16)
-        screen.blit(tileset,
-                    camera.transform_game_to_screen(
-                        (x, y), scalar=16),
-                    (target_x * 16, target_y * 16, 16, 16))
-
-    def _draw_entity_at(self, screen, tileset, camera, loc):
-        x, y = loc
-        if self._entity_matrix[y][x]:
-            kind = self._entity_matrix[y][x].kind
-
-            if kind == 'rock':
-                target_x = 6
-            elif kind == 'bug':
-                target_x = 7
-            elif kind == 'fish':
-                target_x = 4
-
-            screen.blit(tileset,
-                        camera.transform_game_to_screen(
-                            (x, y), scalar=16),
-                        (target_x * 16, 0, 16, 16))
+    def register_entity_change_listener(self, listener):
+        """
+        Register an object to be signalled whenever an entity is added
+        to or removed from this Stage.
+
+        The listening object must have two methods, entity_added and
+        entity_removed, each accepting the entity and its position
+        as a pair of (x, y) coordinates.  For example:
 
-    def draw(self, screen, tileset, camera):
+            def entity_added(self, entity, position)
+            def entity_removed(self, entity, position)
+
+        Argument:
+            listener: the object to signal when an entity changes
         """
-        Draw the visible map area onto a screen.
+        self._entity_change_listeners.append(listener)
+
+    def unregister_entity_change_listener(self, listener):
+        """
+        Stop signalling an object about entity changes.
+
+        Argument:
+            listener: a previously registered listener
+        """
+        self._entity_change_listeners.remove(listener)
+
+    def _find_view(self, camera):
+        # The tiles in view, clipped to the stage.
+        left, top, width, height = camera.find_view()
+        return (max(0, left), max(0, top),
+                min(self.width, left + width),
+                min(self.height, top + height))
+
+    def is_in_view(self, camera, loc):
+        """
+        Return whether a location is drawn by draw.
+
+        Arguments:
+            camera: the Camera to draw with
+            loc: the (x, y) coordinates of the location
+
+        Returns: True if the location is in view, otherwise False
+        """
+        left, top, right, bottom = self._find_view(camera)
+        return left <= loc[0] < right and top <= loc[1] < bottom
+
+    def draw_tiles(self, screen, tileset, camera):
+        """
+        Draw the tiles of the visible map area onto a screen.
 
         Arguments:
             screen: the screen to draw on
-            tileset: the tileset to use for tiles and objects
+            tileset: the Tileset to use for tiles
             camera: the Camera to draw with
         """
-        clip_left = math.floor(camera.x / 16)
-        clip_top = math.floor(camera.y / 16)
-        clip_width = math.floor(SCREEN_LOGICAL_WIDTH / 16)
-        clip_height = math.floor(SCREEN_LOGICAL_HEIGHT / 16 + 1)
+        left, top, right, bottom = self._find_view(camera)
+        size, offset_x, offset_y = camera.get_tile_grid()
+        columns = [(x, x * size + offset_x) for x in range(left, right)]
 
-        for y in range(clip_top, clip_top + clip_height):
-            for x in range(clip_left, clip_left + clip_width):
-                if x < 0 or x >= self.width \
-                   or y < 0 or y >= self.height:
-                    continue
+        batch = SpriteBatch(tileset)
+        add_tile = batch.add_tile
 
-                args = screen, tileset, camera, (x, y)
-                self._draw_tile_at(*args)
-                self._draw_entity_at(*args)
+        for y in range(top, bottom):
+            row = self.data[y]
+            screen_y = y * size + offset_y
+            for x, screen_x in columns:
+                add_tile((screen_x, screen_y), row[x])
+
+        batch.draw(screen)
+
+    def draw_entities(self, screen, tileset, camera):
+        """
+        Draw the entities of the visible map area onto a screen.
+
+        Arguments:
+            screen: the screen to draw on
+            tileset: the Tileset to use for objects
+            camera: the Camera to draw with
+        """
+        left, top, right, bottom = self._find_view(camera)
+        size, offset_x, offset_y = camera.get_tile_grid()
+
+        batch = SpriteBatch(tileset)
+        add_tile = batch.add_tile
+
+        for y in range(top, bottom):
+            row = self._entity_matrix[y]
+            screen_y = y * size + offset_y
+            for x in range(left, right):
+                entity = row[x]
+                if entity:
+                    # Entity sprites are in the top row of the tileset.
+                    add_tile((x * size + offset_x, screen_y),
+                             KIND_SPRITE_COLUMNS[entity.kind])
+
+        batch.draw(screen)
+
+    def draw(self, screen, tileset, camera):
+        """
+        Draw the visible map area onto a screen.
+
+        Arguments:
+            screen: the screen to draw on
+            tileset: the Tileset to use for tiles and objects
+            camera: the Camera to draw with
+        """
+        self.draw_tiles(screen, tileset, camera)
+        self.draw_entities(screen, tileset, camera)
 
     def get_player_start_pos(self):
         """
@@ -172,6 +348,9 @@ class Stage(object):
 
         self.data[y][x] = tid
 
+        if tile_is_solid(prev_tid) != tile_is_solid(cur_tid):
+            self._update_neighbor_masks(x, y)
+
         for listener in self._tile_change_listeners:
             listener.tile_changed(prev_tid, cur_tid, (x, y))
 
@@ -192,14 +371,21 @@ class Stage(object):
 
         entity.location = location
         self._entity_matrix[y][x] = entity
-        self._entity_list.append((entity, x, y))
+        self._entity_slots[id(entity)] = len(self._entity_list)
+        self._entity_list.append(entity)
+        self._entities_by_kind[entity.kind].add(entity, location)
+
+        for listener in self._entity_change_listeners:
+            listener.entity_added(entity, location)
+
+        self.events.publish('entity')
 
     def create_entity(self, kind, location):
         """
         Create an entity of the given kind at a location in this Stage.
 
         Arguments:
-            kind: the kind of entity (bug | stone | fish)
+            kind: the kind code of the entity, e.g., kinds.ROCK
             location: a tuple (x, y) specifying a location
         """
         entity = Entity(kind=kind, location=location)
@@ -210,34 +396,91 @@ class Stage(object):
         Delete an entity from this Stage.
 
         Arguments:
-            entity: the entity to delete
+            entity: the entity to delete, which must be on this Stage
         """
-        for y in range(self.height):
-            for x in range(self.width):
-                if self._entity_matrix[y][x] == entity:
-                    self._entity_matrix[y][x] = None
-                    self._entity_list.remove((entity, x, y))
-                    entity.location = None
+        assert entity.location is not None, 'entity is not on the stage'
+
+        x, y = entity.location
+        assert self._entity_matrix[y][x] is entity, \
+               'entity is not at its location: x=%d, y=%d' % (x, y)
+
+        self._entity_matrix[y][x] = None
+        slot = self._entity_slots.pop(id(entity))
+        last = self._entity_list.pop()
+        if last is not entity:
+            self._entity_list[slot] = last
+            self._entity_slots[id(last)] = slot
+        self._entities_by_kind[entity.kind].discard(entity, (x, y))
+        entity.location = None
+
+        for listener in self._entity_change_listeners:
+            listener.entity_removed(entity, (x, y))
+
+    def get_entities_of_kind(self, kind):
+        """
+        Return the entities of a kind on the stage, e.g., to find the
+        ones nearest a unit.
+
+        Arguments:
+            kind: the kind code of the entities
+
+        Returns: a ChunkIndex of the entities, which must not be
+                 changed
+        """
+        return self._entities_by_kind[kind]
 
-    def find_entity(self, condition):
+    def get_entities(self):
         """
-        Find an entity on the stage satisfying a condition.
+        Return all entities on the stage.
+
+        Returns: a list of the entities on the stage
+        """
+        return list(self._entity_list)
+
+    def move_mob(self, mob, location):
+        """
+        Move a mob to a location, keeping track of where mobs are.
+
+        Arguments:
+            mob: the unit
+            location: the pair of coordinates (x, y) to move it to
+        """
+        self.units.move(mob, location[0], location[1])
+
+    def mobs_at(self, location):
+        """
+        Return the mobs at a location.
+
+        Arguments:
+            location: the pair of coordinates (x, y)
+
+        Returns: a list of the mobs at the location, which is empty if
+                 there are none
+        """
+        return self.units.units_at(location[0], location[1])
+
+    def find_mobs_in_rect(self, rect):
+        """
+        Return the mobs within a rectangle.
 
         Arguments:
-            condition: a lambda taking an entity, the entity's
-                x coordinate, and the entity's y coordinate,
-                and returning True if the entity is accepted
-                or False if the entity is not accepted
-        Returns:
-            a tuple (entity, (x, y)) if an entity was accepted,
-            or None if no entity was accepted
+            rect: a rectangle given as (x, y, width, height)
+
+        Returns: a list of the mobs in the rectangle
+        """
+        return self.units.find_units_in_rect(rect)
+
+    def find_mobs_in_radius(self, location, radius):
         """
-        random.shuffle(self._entity_list)
-        for ent, x, y in self._entity_list:
-            if condition(ent, x, y):
-                return ent, (x, y)
+        Return the mobs within a distance of a location.
+
+        Arguments:
+            location: the pair of coordinates (x, y)
+            radius: the distance, in tiles
 
-        return None
+        Returns: a list of the mobs at most the radius away
+        """
+        return self.units.find_units_in_radius(location, radius)
 
     def entity_at(self, location):
         """
@@ -250,3 +493,35 @@ class Stage(object):
         """
         x, y = location
         return self._entity_matrix[y][x]
+
+def make_blank_stage(width, height, data=None, walkable_masks=None,
+                     solid_masks=None):
+    """
+    Create a Stage without loading a map, e.g., to restore a saved game.
+
+    The neighbor masks are computed from the tiles unless they are
+    given, in which case they must match the tiles.
+
+    Arguments:
+        width: the width of the stage
+        height: the height of the stage
+        data: the tile IDs as a height-by-width array, or None for
+              a stage of tile 0
+        walkable_masks: the walkable neighbor masks, or None
+        solid_masks: the solid neighbor masks, or None
+
+    Returns: the new Stage, which has no entities
+    """
+    stage = Stage.__new__(Stage)
+    stage._setup(width, height, None)
+
+    if data is not None:
+        stage.data = data
+
+    if walkable_masks is not None and solid_masks is not None:
+        stage.walkable_masks = walkable_masks
+        stage.solid_masks = solid_masks
+    else:
+        stage._compute_neighbor_masks()
+
+    return stage
@@ -1,18 +1,66 @@
 from .common import make_2d_constant_array
+from .tileset import SpriteBatch
 
 class Stockpile(object):
+    """
+    A Stockpile is a rectangular area where units store entities.
+
+    A Stockpile keeps track of its free slots, i.e., the locations
+    holding no entity and having no reservation, so finding a place
+    to store something never needs to look at every location.  To
+    stay up to date, the Stockpile relies on its team to tell it about
+    entity changes and location reservations within its area.
+
+    Arguments:
+        stage: the Stage the stockpile is on
+        rect: the area of the stockpile as (x, y, width, height)
+        accepted_kinds: the kinds of entity the stockpile accepts
+    """
     def __init__(self, stage, rect, accepted_kinds):
         self.x, self.y, self.width, self.height = rect
         self.accepted_kinds = accepted_kinds
         self._stage = stage
 
-    def draw(self, screen, tileset, camera):
+        # The number of entities in the stockpile.
+        self.occupancy = 0
+
+        # The free locations in the stockpile.
+        self._free_slots = set()
+
+        # The reserved locations in the stockpile.
+        self._reserved_slots = set()
+
         for y in range(self.y, self.y + self.height):
             for x in range(self.x, self.x + self.width):
-                screen.blit(tileset,
-                            camera.transform_game_to_screen(
-                                (x, y), scalar=16),
-                            (176, 0, 16, 16))
+                if stage.entity_at((x, y)):
+                    self.occupancy += 1
+                else:
+                    self._free_slots.add((x, y))
+
+    def draw(self, screen, tileset, camera):
+        """
+        Draw the cells of the stockpile which are in view.
+
+        Arguments:
+            screen: the screen to draw on
+            tileset: the Tileset to use
+            camera: the Camera to draw with
+        """
+        view_x, view_y, view_width, view_height = camera.find_view()
+        left = max(self.x, view_x)
+        top = max(self.y, view_y)
+        right = min(self.x + self.width, view_x + view_width)
+        bottom = min(self.y + self.height, view_y + view_height)
+
+        size, offset_x, offset_y = camera.get_tile_grid()
+        batch = SpriteBatch(tileset)
+
+        for y in range(top, bottom):
+            for x in range(left, right):
+                batch.add((x * size + offset_x, y * size + offset_y),
+                          (176, 0, 16, 16))
+
+        batch.draw(screen)
 
     def containsloc(self, loc):
         """
@@ -27,3 +75,114 @@ class Stockpile(object):
         x, y = loc
         return (x >= self.x and x < self.x + self.width
                 and y >= self.y and y < self.y + self.height)
+
+    def entity_added(self, entity, loc):
+        """
+        Notify the Stockpile that an entity was added within it.
+
+        Arguments:
+            entity: the entity
+            loc: the (x, y) coordinates of the entity
+        """
+        self.occupancy += 1
+        self._free_slots.discard(loc)
+
+    def entity_removed(self, entity, loc):
+        """
+        Notify the Stockpile that an entity was removed from within it.
+
+        Arguments:
+            entity: the entity
+            loc: the (x, y) coordinates the entity was at
+        """
+        self.occupancy -= 1
+        if loc not in self._reserved_slots:
+            self._free_slots.add(loc)
+
+    def location_reserved(self, loc):
+        """
+        Notify the Stockpile that one of its locations was reserved.
+
+        Arguments:
+            loc: the (x, y) coordinates of the location
+        """
+        self._reserved_slots.add(loc)
+        self._free_slots.discard(loc)
+
+    def location_relinquished(self, loc):
+        """
+        Notify the Stockpile that one of its locations is no longer
+        reserved.
+
+        Arguments:
+            loc: the (x, y) coordinates of the location
+        """
+        self._reserved_slots.discard(loc)
+        if not self._stage.entity_at(loc):
+            self._free_slots.add(loc)
+
+    def is_full(self):
+        """
+        Return whether the stockpile has no free slots.
+
+        Returns: True if every location is occupied or reserved
+        """
+        return not self._free_slots
+
+    def find_free_slot(self, near=None):
+        """
+        Return a free slot in the stockpile, preferably a near one.
+
+        Slots are searched in growing squares around the given point,
+        which is quick while the stockpile has plenty of free slots.
+        Once that would take longer than looking at every free slot,
+        the free slots are looked at directly instead.
+
+        Arguments:
+            near: a pair of (x, y) coordinates, or None for the
+                  top-left corner of the stockpile
+
+        Returns: the (x, y) coordinates of the free slot nearest the
+                 given point, or None if the stockpile is full
+        """
+        free_slots = self._free_slots
+
+        if not free_slots:
+            return None
+
+        if near is None:
+            near = self.x, self.y
+
+        # Clamp the point into the stockpile.
+        center_x = min(max(near[0], self.x), self.x + self.width - 1)
+        center_y = min(max(near[1], self.y), self.y + self.height - 1)
+
+        left, right = self.x, self.x + self.width - 1
+        top, bottom = self.y, self.y + self.height - 1
+
+        checked = 0
+        radius = 0
+        while checked < len(free_slots):
+            for y in range(max(top, center_y - radius),
+                           min(bottom, center_y + radius) + 1):
+                # Only the edges of the square are new.
+                if y in (center_y - radius, center_y + radius):
+                    xs = range(max(left, center_x - radius),
+                               min(right, center_x + radius) + 1)
+                else:
+                    xs = [x for x in (center_x - radius,
+                                      center_x + radius)
+                          if left <= x <= right]
+
+                for x in xs:
+                    if (x, y) in free_slots:
+                        return x, y
+                    checked += 1
+            radius += 1
+
+        # Break ties the way the squares are scanned, so the slot does
+        # not depend on the order the set happens to hold them in.
+        return min(free_slots,
+                   key=lambda loc: (max(abs(loc[0] - center_x),
+                                        abs(loc[1] - center_y)),
+                                    loc[1], loc[0]))
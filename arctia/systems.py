@@ -2,79 +2,165 @@
 The systems module provides classes which update the game's state.
 """
 from functools import partial
-import random
+import heapq
+import math
+import time
 
-from .common import tile_is_solid, unit_can_reach
+from .common import unit_can_reach, NEIGHBOR_BITS
+from .config import LOD_INTEREST_RADIUS
+from .matching import min_cost_assignment, greedy_sparse_assignment
 from .partition import partition
+from .scheduler import Scheduler
+from .tileset import SpriteBatch
 from .transform import translate
-from .tasks import Eat, Go, Wait, Mine, Take, GoToAnyMatchingSpot, Drop
-from arctia.tasks import Contribute, Build, GoBeside
-
-def assign_tasks(unit, designation, deps, tasklist):
+from .units import EATING, WANDERING, BROODING, MINING, HAULING, \
+                   BUILDING
+from .program import TaskProgram, assign_program, ABORT, DUMP
+
+# The largest group of units whose jobs are matched exactly.
+# Larger groups are matched greedily, since exact matching takes
+# time proportional to the fourth power of the group size.
+_MAX_UNITS_FOR_EXACT_MATCHING = 12
+
+# The most items each unit considers when its group is too large to be
+# matched exactly.
+_MAX_CANDIDATES = 8
+
+# The events which may give a unit work, by the unit's components.
+_WAKE_EVENTS = {
+    BUILDING: ('designation', 'reachability'),
+    MINING: ('designation', 'reachability'),
+    HAULING: ('designation', 'entity', 'stockpile', 'reachability')
+}
+
+# The directions a wandering unit picks from at each step.
+_WANDERING_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1),
+                      (0, 1), (1, -1), (1, 0), (1, 1)]
+
+# The events which may give a hungry unit some food.
+_HUNGRY_WAKE_EVENTS = ('entity', 'reachability')
+
+# The size (in tiles) of the squares the stage is divided into when
+# working out which areas are near the player's units.
+_INTEREST_CHUNK_SIZE = 8
+
+def _enact_timed(profiler, program):
+    # Time the current task of a program by the kind of task it is.
+    name = 'enact ' + type(program.task).__name__
+    started = time.perf_counter()
+    turns = program.enact()
+    profiler.record(name, time.perf_counter() - started)
+    return turns
+
+def _is_takeable(part, team, entity):
+    # Whether an entity is within a partition and, for units on a team,
+    # not reserved by the team.
+    x, y = entity.location
+    return part[y][x] \
+           and not (team and team.is_reserved('entity', entity))
+
+def _team_group_key(unit, team):
+    assert team, 'unit considered a team job but has no team'
+    return id(unit.partition), id(team)
+
+def _eating_group_key(unit, team):
+    return id(unit.partition), unit.hunger_diet, id(team)
+
+def _group_units(store, units, key):
+    # Group units by a key taking a unit and its team, in the order
+    # each key first comes up.
+    teams = store.team
+    groups = {}
+    for unit in units:
+        groups.setdefault(key(unit, teams[unit.index]), []).append(unit)
+    return list(groups.values())
+
+def _distance_of(candidate):
+    return candidate[0]
+
+def _match_nearest(store, units, indexes, accept, taken):
     """
-    Assign a unit to perform a sequence of tasks.
-
-    Args:
-        unit: The unit which shall do the tasks
-        designation: The designation of the job or None
-        deps: The list of things which should be reserved for the unit
-            to perform the task.  This must be a list of tuples of the
-            following form: [(kind, obj), ...].  For example,
-            [('location', (2, 2))] means the unit should reserve the
-            location at coordinates (2, 2).
-        tasklist: A list of functions which all return a task.  Each
-            function should take two arguments, `abort` and `finish`,
-            which are callbacks which may be hooked into the tasks in
-            order to carry out the task sequence.
+    Match units to items of some ChunkIndexes, each unit to at most
+    one item, keeping the total distance from units to their items
+    small.
+
+    Each unit only considers its nearest items, so matching never
+    looks at every item.  A small group of units considers as many
+    items each as there are units, which never rules out the best
+    matching, and is matched exactly.  A large group considers up to
+    _MAX_CANDIDATES items each and is matched greedily, after which
+    the units whose items were all taken look again.
+
+    Arguments:
+        store: the UnitStore of the units
+        units: the units
+        indexes: a list of ChunkIndexes holding the items
+        accept: a function taking an item and returning whether it
+                may be matched, or None to accept every item
+        taken: a set of the ids of items which may not be matched,
+               to which the ids of matched items are added
+
+    Returns: a list of (unit, item) pairs
     """
-    def abort():
-        if unit.team:
-            for kind, obj in deps:
-                unit.team.relinquish(kind, obj)
-        unit.task = None
-    def finish():
-        abort()
-        if designation:
-            designation['done'] = True
-    next_proc = finish
-    for task in reversed(tasklist):
-        def proc(task, next_proc):
-            unit.task = task(abort, next_proc)
-        next_proc = partial(proc, task, next_proc)
-    if unit.team:
-        for kind, obj in deps:
-            unit.team.reserve(kind, obj)
-    next_proc()
-
-def _die_cannot_dump():
-    assert False, 'error: no accessible dump location'
-
-def assign_dump_job_func(stage, unit, entity, condition_func):
-    def func():
-        assign_tasks(unit, None,
-                     [('entity', entity)],
-                     [lambda _unused_abort, finish:
-                        GoToAnyMatchingSpot(
-                          stage, unit,
-                          condition_func=condition_func,
-                          impossible_proc=_die_cannot_dump,
-                          finished_proc=finish),
-                      lambda abort, finish:
-                        Drop(stage, entity, unit,
-                                 blocked_proc=
-                                   do_both(
-                                     abort,
-                                     assign_dump_job_func(
-                                       stage, unit, entity,
-                                       condition_func)),
-                                 finished_proc=finish)])
-    return func
-
-def do_both(proc_a, proc_b):
-    def wrapper():
-        proc_a()
-        proc_b()
-    return wrapper
+    if not any(indexes):
+        return []
+
+    def is_free(item):
+        return id(item) not in taken and (accept is None or accept(item))
+
+    xs, ys = store.x, store.y
+    pairs = []
+    unmatched = units
+
+    while unmatched:
+        exact = len(unmatched) <= _MAX_UNITS_FOR_EXACT_MATCHING
+        count = len(unmatched) if exact else _MAX_CANDIDATES
+
+        # Find the candidate items of every unit.
+        candidates = []
+        columns = {}
+        items = []
+        for unit in unmatched:
+            location = xs[unit.index], ys[unit.index]
+            found = []
+            for index in indexes:
+                found.extend(index.nearest(location, count, is_free))
+            if len(indexes) > 1:
+                found = heapq.nsmallest(count, found, key=_distance_of)
+            candidates.append(found)
+
+            for _, item in found:
+                if id(item) not in columns:
+                    columns[id(item)] = len(items)
+                    items.append(item)
+
+        if not items:
+            break
+
+        if exact:
+            costs = [[math.inf] * len(items) for _ in unmatched]
+            for row, found in enumerate(candidates):
+                for distance, item in found:
+                    costs[row][columns[id(item)]] = distance
+            assignment = min_cost_assignment(costs)
+        else:
+            assignment = greedy_sparse_assignment(
+                           (distance, row, columns[id(item)])
+                           for row, found in enumerate(candidates)
+                           for distance, item in found)
+
+        matched_rows = set()
+        for row, column in assignment:
+            pairs.append((unmatched[row], items[column]))
+            taken.add(id(items[column]))
+            matched_rows.add(row)
+
+        # Units which saw only some of their items may find others.
+        unmatched = [unit for row, unit in enumerate(unmatched)
+                     if row not in matched_rows
+                        and len(candidates[row]) == count]
+
+    return pairs
 
 def _refresh_partitions_of_mobs(stage, mobs):
     # This currently assumes that all mobs have
@@ -102,6 +188,13 @@ class PartitionUpdateSystem(object):
     an O(1) operation so long as the partition matrices of all units
     is up-to-date.
 
+    Tile changes do not refresh partitions immediately.  Instead, the
+    changed tiles are marked dirty, and the next call to update
+    refreshes every partition touched by any of them in one pass.
+    Until then, partitions may be stale: tiles opened by mining are
+    conservatively reported as unreachable, and tasks whose paths were
+    closed off by building find out when their path search fails.
+
     Arguments:
         stage: the stage
         mobs: the list of units
@@ -110,9 +203,15 @@ class PartitionUpdateSystem(object):
         self._mobs = mobs
         self._stage = stage
 
+        # The set of (x, y) coordinates of tiles changed since the
+        # last refresh.
+        self._dirty = set()
+
         stage.register_tile_change_listener(self)
 
-        self._refresh()
+        # Mobs may come with partitions, e.g., from a saved game.
+        _refresh_partitions_of_mobs(
+          stage, [mob for mob in mobs if mob.partition is None])
 
     def tile_changed(self, _unused_prev_id, _unused_cur_id, coords):
         """
@@ -123,52 +222,155 @@ class PartitionUpdateSystem(object):
             _unused_cur_id: this argument is not used
             coords: the (x, y) coordinates of the changed tile
         """
-        # Determine which mobs need partition refreshs.
-        mobs_to_refresh = []
+        self._dirty.add(coords)
 
-        for mob in self._mobs:
-            need_refresh = False
+    def get_state(self):
+        """
+        Return the state of this system as plain data.
 
-            for dy in (-1, 0, 1):
-                for dx in (-1, 0, 1):
-                    if unit_can_reach(mob, translate(coords, (dx, dy))):
-                        need_refresh = True
-                        break
-                if need_refresh:
-                    break
-            if need_refresh:
-                mobs_to_refresh.append(mob)
+        Returns: a value which can be passed to set_state
+        """
+        return sorted(self._dirty)
 
-        # Update partitions on mobs which need it.
-        _refresh_partitions_of_mobs(self._stage, mobs_to_refresh)
+    def set_state(self, state):
+        """
+        Restore the state of this system from get_state.
 
+        Arguments:
+            state: the state
+        """
+        self._dirty = set(state)
 
-    def _refresh(self):
+    def is_dirty(self):
         """
-        Update the partition matrices of all known mobs.
+        Return whether any tile has changed since the last refresh.
+
+        Returns: whether the partitions of some units may be stale
         """
-        _refresh_partitions_of_mobs(self._stage, self._mobs)
+        return bool(self._dirty)
+
+    def _partition_is_touched(self, part):
+        # A partition is affected by a changed tile if the tile or
+        # any of its neighbors is reachable within the partition.
+        width, height = self._stage.width, self._stage.height
+
+        for x, y in self._dirty:
+            for ny in range(max(0, y - 1), min(height, y + 2)):
+                row = part[ny]
+                for nx in range(max(0, x - 1), min(width, x + 2)):
+                    if row[nx]:
+                        return True
+        return False
 
     def update(self):
         """
-        Do nothing.
+        Refresh the partitions touched by tiles changed this turn.
 
-        This method exists so that this class matches the interface of
-        other systems.
+        Many mobs share a partition, so each distinct partition is
+        tested against the dirty tiles only once, and all mobs of the
+        touched partitions are then refreshed together.
+
+        Only run this once every turn, before units are dispatched.
         """
-        pass
+        if not self._dirty:
+            return
+
+        touched = {}
+        mobs_to_refresh = []
+
+        for mob in self._mobs:
+            key = id(mob.partition)
+            if key not in touched:
+                touched[key] = mob.partition is None \
+                               or self._partition_is_touched(mob.partition)
+            if touched[key]:
+                mobs_to_refresh.append(mob)
+
+        self._dirty.clear()
+
+        # Update partitions on mobs which need it.
+        _refresh_partitions_of_mobs(self._stage, mobs_to_refresh)
+
+        if mobs_to_refresh:
+            self._stage.events.publish('reachability')
 
 
 class UnitDispatchSystem(object):
     """
     A UnitDispatchSystem chooses jobs for units to do.
 
+    A unit which looks for work and finds none goes to sleep until an
+    event happens which could give it work, e.g., a new designation
+    or its hunger reaching its threshold.  Sleeping units go straight
+    to idling instead of looking for work again, so the cost of
+    looking for work depends on how much changes, not on how many
+    units there are.
+
+    Jobs are given out in batches: every turn, the units looking for
+    jobs of a kind are matched to the jobs all at once, each unit only
+    considering the nearest jobs it can reach (see _match_nearest).
+
+    Units are only touched on turns when something is due for them.
+    A task may ask not to be enacted again for a number of turns
+    (e.g., while waiting or between slow steps), in which case its unit
+    is set aside until then.  Hunger is not counted every turn either:
+    it is brought up to date whenever a unit is touched, and sleeping
+    units are woken by a timer when their hunger reaches its threshold.
+    (Hunger itself is kept up to date by the stage's UnitStore, whose
+    clock this system advances once per turn.)
+
+    Wildlife far from the player's units (see LOD_INTEREST_RADIUS in
+    the config module) is simulated in less detail: when it wanders or
+    goes to eat, it waits as long as the walk would take and then
+    appears at its goal, without finding or walking a path.  Whether
+    a unit is far away is only decided when it is given the job, so a
+    unit which is already waiting still appears at its goal when the
+    wait is over, even if one of the player's units has come near in
+    the meantime.
+
     Arguments:
         stage: the stage
+        rng: the random.Random to make choices with, or None to use
+             the stage's
     """
-    def __init__(self, stage):
+    def __init__(self, stage, rng=None):
         self._units = []
         self._stage = stage
+        self._random = rng if rng is not None else stage.random
+        self._store = stage.units
+
+        # The units which are touched every turn: {id(unit): unit}
+        self._active = {}
+
+        # The units which are set aside until their task is due:
+        # {id(unit): turn}
+        self._parked = {}
+
+        # The timers of units, as (unit, reason) items, where the reason
+        # is 'task' or 'hunger'.
+        self._timers = Scheduler()
+
+        # The turn of the pending hunger timer of each unit, so that a
+        # unit going to sleep again does not add another timer:
+        # {id(unit): turn}
+        self._hunger_timers = {}
+
+        # The sleeping units and the events each is waiting for:
+        # {id(unit): (unit, events)}
+        self._asleep = {}
+
+        # The units waiting for each event: {event: {id(unit): unit}}
+        self._sleepers = {}
+
+        # The chunks of the stage near the player's units, as a set of
+        # (x, y) chunk coordinates, and the turn they were found on.
+        self._interest_chunks = set()
+        self._interest_turn = None
+
+        for event in ('designation', 'entity', 'stockpile',
+                      'reachability'):
+            self._sleepers[event] = {}
+            stage.events.subscribe(event, self._wake_sleepers)
 
     def add(self, unit):
         """
@@ -178,206 +380,342 @@ class UnitDispatchSystem(object):
             unit: the unit
         """
         self._units.append(unit)
+        self._active[id(unit)] = unit
+
+    def get_state(self):
+        """
+        Return the state of this system, referring to units directly.
+
+        Returns: a dict which can be passed to set_state
+        """
+        units_by_id = {id(unit): unit for unit in self._units}
+
+        return {
+            'active': list(self._active.values()),
+            'parked': [(units_by_id[key], turn)
+                       for key, turn in self._parked.items()],
+            'timers': self._timers.items(),
+            'asleep': [(unit, sorted(events))
+                       for unit, events in self._asleep.values()]
+        }
+
+    def set_state(self, state):
+        """
+        Restore the state of this system from get_state.
+
+        All units must already have been added.
+
+        Arguments:
+            state: the state
+        """
+        self._active = {id(unit): unit for unit in state['active']}
+        self._parked = {id(unit): turn for unit, turn in state['parked']}
+
+        self._timers = Scheduler()
+        self._hunger_timers = {}
+        for turn, (unit, reason) in state['timers']:
+            self._timers.schedule(turn, (unit, reason))
+            if reason == 'hunger':
+                # The latest timer of a unit is the pending one.
+                self._hunger_timers[id(unit)] = turn
+
+        self._asleep = {}
+        for sleepers in self._sleepers.values():
+            sleepers.clear()
+        for unit, events in state['asleep']:
+            self._asleep[id(unit)] = unit, set(events)
+            for event in events:
+                self._sleepers[event][id(unit)] = unit
+
+    @property
+    def turn(self):
+        """
+        The number of the current turn.
+        """
+        return self._store.turn
+
+    def _park(self, unit, turns):
+        wake_turn = self.turn + turns
+        del self._active[id(unit)]
+        self._parked[id(unit)] = wake_turn
+        self._timers.schedule(wake_turn, (unit, 'task'))
+
+    def _handle_timers(self):
+        store = self._store
+        turn = store.turn
+        hunger_zero_turns = store.hunger_zero_turn
+        hunger_thresholds = store.hunger_threshold
+
+        for unit, reason in self._timers.pop_due(turn):
+            if reason == 'task':
+                del self._parked[id(unit)]
+                self._active[id(unit)] = unit
+            elif reason == 'hunger':
+                # Timers from before the unit last ate are out of date.
+                pending = self._hunger_timers.get(id(unit))
+                if pending is not None and pending <= turn:
+                    del self._hunger_timers[id(unit)]
+
+                index = unit.index
+                if id(unit) in self._asleep \
+                   and turn - hunger_zero_turns[index] \
+                       >= hunger_thresholds[index]:
+                    self._wake(unit)
+
+    def is_asleep(self, unit):
+        """
+        Return whether a unit is waiting for an event to look for work.
+
+        Arguments:
+            unit: the unit
+
+        Returns: whether the unit is asleep
+        """
+        return id(unit) in self._asleep
+
+    def _sleep(self, unit):
+        store = self._store
+        index = unit.index
+        components = store.components[index]
+
+        # The turn on which the unit's hunger reaches its threshold.
+        hungry_turn = store.hunger_zero_turn[index] \
+                      + store.hunger_threshold[index]
+
+        events = set()
+        for component, wake_events in _WAKE_EVENTS.items():
+            if components & component:
+                events.update(wake_events)
+        if components & EATING and store.turn >= hungry_turn:
+            events.update(_HUNGRY_WAKE_EVENTS)
+
+        self._asleep[id(unit)] = unit, events
+        for event in events:
+            self._sleepers[event][id(unit)] = unit
+
+        # Wake up when the unit becomes hungry, unless a timer for
+        # that is already pending.
+        if components & EATING and store.turn < hungry_turn:
+            if self._hunger_timers.get(id(unit)) != hungry_turn:
+                self._hunger_timers[id(unit)] = hungry_turn
+                self._timers.schedule(hungry_turn, (unit, 'hunger'))
+
+    def _wake(self, unit):
+        _, events = self._asleep.pop(id(unit))
+        for event in events:
+            del self._sleepers[event][id(unit)]
+
+    def _wake_sleepers(self, event):
+        for unit in list(self._sleepers[event].values()):
+            self._wake(unit)
+
+    def _find_interest_chunks(self):
+        size = _INTEREST_CHUNK_SIZE
+        reach = -(-LOD_INTEREST_RADIUS // size)
+        store = self._store
+
+        # Team units tend to bunch up, so expand each of their chunks
+        # only once.
+        team_chunks = {(x // size, y // size)
+                       for team, x, y in zip(store.team, store.x, store.y)
+                       if team is not None}
+
+        chunks = set()
+        for chunk_x, chunk_y in team_chunks:
+            for y in range(chunk_y - reach, chunk_y + reach + 1):
+                for x in range(chunk_x - reach, chunk_x + reach + 1):
+                    chunks.add((x, y))
+
+        self._interest_chunks = chunks
+        self._interest_turn = self.turn
+
+    def _is_of_interest(self, unit):
+        """
+        Return whether a unit should be simulated in full detail, i.e.,
+        whether it is on a team or near a unit which is.
+        """
+        if unit.team:
+            return True
+
+        if self._interest_turn != self.turn:
+            self._find_interest_chunks()
+
+        size = _INTEREST_CHUNK_SIZE
+        return (unit.x // size, unit.y // size) in self._interest_chunks
+
+    def _skip_walking(self, unit, goal, delay):
+        """
+        Return the steps of a unit which nobody is near enough to
+        watch, so that it appears at its goal once the walk there
+        would have been over instead of walking.
+        """
+        distance = max(abs(goal[0] - unit.x), abs(goal[1] - unit.y))
+        return [('wait', max(1, distance * (delay + 1))),
+                ('teleport', goal)]
 
     def _try_assigning_idling_job(self, unit):
+        store = self._store
+        index = unit.index
+
         # Choose whether to brood or to wander.
-        choices = ['wandering', 'brooding']
-        choices = \
-            list(
-                filter(
-                    lambda obj: obj in unit.components,
-                    choices))
-        selected = random.choice(choices)
-
-        if selected == 'wandering':
+        components = store.components[index]
+        choices = [component for component in (WANDERING, BROODING)
+                   if components & component]
+        selected = self._random.choice(choices)
+
+        if selected == WANDERING:
             # Step wildly to find a goal for our wandering.
-            goal = unit.x, unit.y
+            goal = store.x[index], store.y[index]
 
             for _ in range(40):
-                offset = random.choice([(-1, -1), (-1, 0),
-                                        (-1, 1), (0, -1),
-                                        (0, 1), (1, -1),
-                                        (1, 0), (1, 1)])
-                shifted = translate(goal, offset)
-                tile = self._stage.get_tile_at(*shifted)
-
-                if 0 <= shifted[0] < self._stage.width \
-                   and 0 <= shifted[1] < self._stage.height \
-                   and not tile_is_solid(tile):
-                    goal = shifted
-
-            # Go to our goal position.
-            assign_tasks(unit, None, [],
-                         [lambda abort, finish:
-                            Go(self._stage, unit, goal,
-                                   delay=unit.movement_delay
-                                         + unit.wandering_delay,
-                                   blocked_proc=abort,
-                                   finished_proc=finish)])
-        elif selected == 'brooding':
+                offset = self._random.choice(_WANDERING_OFFSETS)
+                mask = self._stage.walkable_masks[goal[1]][goal[0]]
+
+                if mask & NEIGHBOR_BITS[offset]:
+                    goal = translate(goal, offset)
+
+            delay = store.movement_delay[index] \
+                    + store.wandering_delay[index]
+
+            if self._is_of_interest(unit):
+                # Go to our goal position.
+                assign_program(self._stage, unit, None, [],
+                               [('go', goal, delay, ABORT)],
+                               idle=True)
+            else:
+                assign_program(self._stage, unit, None, [],
+                               self._skip_walking(unit, goal, delay),
+                               idle=True)
+        elif selected == BROODING:
             # Do nothing for the unit's brooding duration.
-            assign_tasks(unit, None, [],
-                         [lambda _unused_abort, finish:
-                            Wait(duration=unit.brooding_duration,
-                                     finished_proc=finish)])
-
-    def _try_assigning_eating_job(self, unit):
-        if not unit.task and unit.hunger >= unit.hunger_threshold:
-            # Find a piece of food the unit can reach.
-            def _is_valid_food(unit, entity, _unused_x, _unused_y):
-                kind = entity.kind
-                reserved = False
-                if unit.team:
-                    reserved = unit.team.is_reserved('entity', entity)
-                return unit_can_reach(unit, entity.location) \
-                       and kind in unit.hunger_diet \
-                       and not reserved
-
-            result = \
-              self._stage.find_entity(partial(_is_valid_food, unit))
-
-            if result:
-                entity, _ = result
-
-                assign_tasks(unit, None,
-                             [('entity', entity)],
-                             [lambda abort, finish:
-                                Go(self._stage, unit, entity.location,
-                                       delay=unit.movement_delay,
-                                       blocked_proc=abort,
-                                       finished_proc=finish),
-                              lambda abort, finish:
-                                Eat(self._stage, unit, entity,
-                                        interrupted_proc=abort,
-                                        finished_proc=finish)])
-
-    def _try_assigning_mining_job(self, unit):
-        assert unit.team, 'unit considered mining but has no team'
-
-        # Find a mining job first.
-        for designation in filter(lambda d: d['kind'] == 'mine',
-                                  unit.team.designations):
-            loc = designation['location']
-
-            # If we can't reach the mining job, skip it.
-            if not unit_can_reach(unit, loc):
-                continue
+            assign_program(self._stage, unit, None, [],
+                           [('wait', store.brooding_duration[index])],
+                           idle=True)
 
-            # If the mining job is reserved or already done, skip it.
-            if unit.team.is_reserved('mine', designation) \
-               or designation['done']:
-                continue
+    def _assign_eating_job(self, unit, entity):
+        location = entity.location
 
-            # Take the job.
-            assign_tasks(unit, designation,
-                         [('mine', designation)],
-                         [lambda abort, finish:
-                            Go(self._stage, unit, loc,
-                                   blocked_proc=abort,
-                                   finished_proc=finish),
-                          lambda abort, finish:
-                            Mine(self._stage, unit, loc,
-                                     finished_proc=finish)])
-            break
+        if self._is_of_interest(unit):
+            going = [('go', location, unit.movement_delay, ABORT)]
+        else:
+            going = self._skip_walking(unit, location, unit.movement_delay)
 
+        assign_program(self._stage, unit, None,
+                       [('entity', entity)],
+                       going + [('eat', entity)])
 
-    def _try_assigning_hauling_job(self, unit):
-        assert unit.team, 'unit considered hauling but has no team'
+    def _try_assigning_eating_jobs(self, units):
+        """
+        Give food to a group of hungry units all at once.
 
-        for stock in unit.team.stockpiles:
-            # If we cannot reach the stockpile, skip it.
-            if not unit_can_reach(unit, (stock.x, stock.y)):
-                continue
+        Units are grouped by what decides which food they may eat,
+        i.e., their partition, diet and team, and each group is
+        matched to the nearest food it may eat (see _match_nearest).
 
-            # Determine whether the stockpile is full or not.
-            pile_is_full = True
-            chosen_slot = None
-            accepted_kinds = stock.accepted_kinds
+        Arguments:
+            units: the hungry units without a task
+        """
+        store = self._store
+        taken = set()
 
-            for y in range(stock.y, stock.y + stock.height):
-                for x in range(stock.x, stock.x + stock.width):
-                    loc = x, y
-                    ent = self._stage.entity_at(loc)
+        for group in _group_units(store, units, _eating_group_key):
+            first = group[0]
+            indexes = [self._stage.get_entities_of_kind(kind)
+                       for kind, nutrition in enumerate(first.hunger_diet)
+                       if nutrition]
+            accept = partial(_is_takeable, first.partition, first.team)
 
-                    if ent:
-                        continue
+            for unit, entity in _match_nearest(store, group, indexes, accept,
+                                               taken):
+                self._assign_eating_job(unit, entity)
 
-                    if unit.team.is_reserved('location', loc):
-                        continue
+    def _assign_mining_job(self, unit, designation):
+        loc = designation['location']
 
-                    chosen_slot = loc
-                    pile_is_full = False
-                    break
-                if not pile_is_full:
-                    break
+        assign_program(self._stage, unit, designation,
+                       [('designation', designation)],
+                       [('go', loc, 0, ABORT),
+                        ('mine', loc)])
 
-            # If the stockpile is full, skip it.
-            if pile_is_full:
-                continue
+    def _try_assigning_mining_jobs(self, units):
+        """
+        Assign mining jobs to a group of units all at once.
 
-            # Find an entity that needs to be stored in the stockpile.
-            def _entity_is_stockpiled(entity, x, y):
-                for stock in unit.team.stockpiles:
-                    if entity.kind in stock.accepted_kinds \
-                       and x >= stock.x \
-                       and x < stock.x + stock.width \
-                       and y >= stock.y \
-                       and y < stock.y + stock.height:
-                        return True
-                return False
-
-            result = \
-              self._stage.find_entity(
-                lambda e, x, y: \
-                  unit_can_reach(unit, (x, y)) \
-                  and e.kind in accepted_kinds \
-                  and not unit.team.is_reserved('entity', e) \
-                  and not _entity_is_stockpiled(e, x, y))
-
-            # If there is no such entity, skip this stockpile.
-            if not result:
-                break
+        The units of each team are grouped by partition, and each group
+        is matched to the open mining jobs it can reach (see
+        _match_nearest).
 
-            # Otherwise, take the hauling job.
-            entity, _ = result
-
-            assign_dump_job = \
-              assign_dump_job_func(
-                self._stage, unit, entity,
-                lambda loc:
-                  not self._stage.entity_at(loc)
-                  and not unit.team.is_reserved('location', loc))
-            assign_tasks(unit, None,
-                         [('location', chosen_slot),
-                          ('entity', entity)],
-                         [lambda abort, finish:
-                            Go(self._stage, unit,
-                                   target=entity.location,
-                                   delay=0,
-                                   blocked_proc=abort,
-                                   finished_proc=finish),
-                          lambda abort, finish:
-                            Take(self._stage, unit, entity,
-                                     not_found_proc=abort,
-                                     finished_proc=finish),
-                          lambda abort, finish:
-                            Go(self._stage, unit,
-                                   target=chosen_slot,
-                                   delay=0,
-                                   blocked_proc=
-                                     do_both(abort, assign_dump_job),
-                                   finished_proc=finish),
-                          lambda abort, finish:
-                            Drop(self._stage, entity, unit,
-                                     blocked_proc=
-                                       do_both(abort, assign_dump_job),
-                                     finished_proc=finish)])
-            break
+        Arguments:
+            units: the idle units which can mine
+        """
+        store = self._store
+        taken = set()
+
+        for group in _group_units(store, units, _team_group_key):
+            first = group[0]
+            jobs = first.team.designations.open_jobs_within(
+                     'mine', first.partition)
+
+            for unit, job in _match_nearest(store, group, [jobs], None, taken):
+                self._assign_mining_job(unit, job)
+
+    def _assign_hauling_job(self, unit, entity, stock):
+        # Store the entity in the free slot nearest to it.
+        chosen_slot = stock.find_free_slot(near=entity.location)
+
+        assign_program(self._stage, unit, None,
+                       [('location', chosen_slot),
+                        ('entity', entity)],
+                       [('go', entity.location, 0, ABORT),
+                        ('take', entity),
+                        ('go', chosen_slot, 0, DUMP),
+                        ('drop', entity, DUMP)],
+                       carried=entity)
+
+    def _try_assigning_hauling_jobs(self, units):
+        """
+        Assign hauling jobs to a group of units all at once.
+
+        The units of each team are grouped by partition, and each group
+        is matched to the nearest entities it can reach which need
+        hauling to a stockpile it can reach (see _match_nearest).  Each
+        entity is then stored in the first such stockpile accepting it
+        which still has a free slot, so when there are fewer free slots
+        than entities, some units are left without a job.
+
+        Arguments:
+            units: the idle units which can haul
+        """
+        store = self._store
+        taken = set()
+
+        for group in _group_units(store, units, _team_group_key):
+            first = group[0]
+            part = first.partition
+
+            stocks = [stock for stock in first.team.stockpiles
+                      if part[stock.y][stock.x] and not stock.is_full()]
+            kinds = []
+            for stock in stocks:
+                kinds.extend(kind for kind in stock.accepted_kinds
+                             if kind not in kinds)
+            indexes = [first.team.get_unhauled_entities(kind, part)
+                       for kind in kinds]
+
+            for unit, entity in _match_nearest(store, group, indexes, None,
+                                               taken):
+                for stock in stocks:
+                    if entity.kind in stock.accepted_kinds \
+                       and not stock.is_full():
+                        self._assign_hauling_job(unit, entity, stock)
+                        break
 
     def _try_assigning_cleaning_job(self, unit):
         # Find a stockpile that has an unfitting item in it.
         found = False
         for stockpile in unit.team.stockpiles:
+            if stockpile.occupancy == 0:
+                continue
             if not unit_can_reach(unit, (stockpile.x, stockpile.y)):
                 continue
             for y in range(stockpile.y,
@@ -401,169 +739,223 @@ class UnitDispatchSystem(object):
             return
 
         # Get that item and put it elsewhere.
-        assign_tasks(unit, None,
-                     [('entity', entity)],
-                     [lambda abort, finish:
-                        Go(self._stage, unit,
-                               target=entity.location,
-                               delay=0,
-                               blocked_proc=abort,
-                               finished_proc=finish),
-                      lambda abort, finish:
-                        Take(self._stage, unit, entity,
-                                 not_found_proc=abort,
-                                 finished_proc=
-                                   do_both(
-                                     finish,
-                                     assign_dump_job_func(
-                                       self._stage, unit, entity,
-                                       lambda loc:
-                                         not self._stage.entity_at(loc)
-                                         and not unit.team.is_reserved('location', loc)
-                                         and not stockpile.containsloc(loc))))])
-
-    def _try_assigning_scaffolding_job(self, unit):
-        jobs = unit.team.get_unreserved_designations('scaffold')
-
-        for job in jobs:
-            dependent = None
-            for des in unit.team.designations:
-                if des['kind'] == 'build':
-                    if job in des['scaffold_jobs']:
-                        dependent = des
-                        break
-            if not unit_can_reach(unit, dependent['location']):
-                continue
-
-            entity, _ = job['resource'](unit)
-
-            assign_dump_job = \
-              assign_dump_job_func(
-                self._stage, unit, entity,
-                lambda loc:
-                  not self._stage.entity_at(loc)
-                  and not unit.team.is_reserved('location', loc))
-
-            if entity:
-                assign_tasks(
-                  unit, job,
-                  [('entity', entity),
-                   ('designation', job)],
-                  [lambda abort, finish:
-                     Go(stage=self._stage,
-                            unit=unit,
-                            target=entity.location,
-                            delay=0,
-                            blocked_proc=abort,
-                            finished_proc=finish),
-                   lambda abort, finish:
-                     Take(stage=self._stage,
-                              unit=unit,
-                              entity=entity,
-                              not_found_proc=abort,
-                              finished_proc=finish),
-                   lambda abort, finish:
-                     Go(
-                       stage=self._stage,
-                       unit=unit,
-                       target=dependent['location'],
-                       delay=0,
-                       blocked_proc=
-                         do_both(abort,
-                                 assign_dump_job),
-                       finished_proc=finish),
-                   lambda abort, finish:
-                     Contribute(
-                       entity=entity,
-                       job=dependent,
-                       finished_proc=finish)]
-                )
-                break
+        assign_program(self._stage, unit, None,
+                       [('entity', entity)],
+                       [('go', entity.location, 0, ABORT),
+                        ('take', entity)],
+                       carried=entity,
+                       avoided_stockpile=stockpile,
+                       dump_after=True)
+
+    def _try_assigning_scaffolding_jobs(self, units):
+        """
+        Assign scaffolding jobs to a group of units all at once.
 
-    def _try_assigning_building_job(self, unit):
-        jobs = unit.team.get_unreserved_designations('build')
+        The units of each team are grouped by partition.  Each group is
+        first matched to the scaffolding jobs whose sites it can reach
+        and whose resource it can find, and then the units given a job
+        needing each kind of resource are matched to the nearest
+        entities of that kind (see _match_nearest).  A unit for which
+        no entity is left does not take its job.
 
-        for job in jobs:
-            if not unit_can_reach(unit, job['location']):
-                continue
+        Arguments:
+            units: the idle units which can haul
+        """
+        store = self._store
+        taken = set()
 
-            scaffolds_done = True
-            for scaffold_job in job['scaffold_jobs']:
-                if not scaffold_job['done']:
-                    scaffolds_done = False
-                    break
+        for group in _group_units(store, units, _team_group_key):
+            first = group[0]
+            part, team = first.partition, first.team
+            accept = partial(_is_takeable, part, team)
 
-            if not scaffolds_done:
+            jobs = team.designations.open_jobs_within('scaffold', part)
+            if not jobs:
                 continue
 
-            assign_tasks(
-              unit, job,
-              [('designation', job)],
-              [lambda abort, finish:
-                 GoBeside(
-                   stage=self._stage,
-                   unit=unit,
-                   target=job['location'],
-                   delay=0,
-                   blocked_proc=abort,
-                   finished_proc=finish),
-               lambda _unused_abort, finish:
-                 Build(stage=self._stage,
-                       unit=unit,
-                       target=job['location'],
-                       finished_proc=finish)]
-            )
-            break
-
-    def update(self):
-        """
-        Give jobs to all units that need them.
-
-        Only run this once every turn (not every frame).
+            # Only consider jobs needing a resource which is available.
+            available = {}
+
+            def has_resource(job):
+                kind = job['resource_kind']
+                if kind not in available:
+                    available[kind] = bool(
+                      self._stage.get_entities_of_kind(kind)
+                        .nearest(job['location'], 1, accept))
+                return available[kind]
+
+            # Then find resources for the units given jobs.
+            units_by_kind = {}
+            for unit, job in _match_nearest(store, group, [jobs],
+                                            has_resource, taken):
+                units_by_kind.setdefault(job['resource_kind'], []) \
+                             .append((unit, job))
+
+            for kind, unit_jobs in units_by_kind.items():
+                jobs_by_unit = {id(unit): job for unit, job in unit_jobs}
+                resources = [self._stage.get_entities_of_kind(kind)]
+
+                for unit, entity in _match_nearest(
+                                      store,
+                                      [unit for unit, _ in unit_jobs],
+                                      resources, accept, taken):
+                    job = jobs_by_unit[id(unit)]
+                    dependent = job['parent']
+
+                    assign_program(self._stage, unit, job,
+                                   [('entity', entity),
+                                    ('designation', job)],
+                                   [('go', entity.location, 0, ABORT),
+                                    ('take', entity),
+                                    ('go', dependent['location'], 0,
+                                     DUMP),
+                                    ('contribute', entity, dependent)],
+                                   carried=entity)
+
+    def _try_assigning_building_jobs(self, units):
         """
-        def _forget_task(unit):
-            unit.task = None
-
-        for unit in self._units:
-            if not unit.task:
-                # First priority: eating
-                if 'eating' in unit.components:
-                    self._try_assigning_eating_job(unit)
+        Assign building jobs to a group of units all at once.
 
-                # Second priority: building
-                if not unit.task and 'building' in unit.components:
-                    self._try_assigning_building_job(unit)
+        The units of each team are grouped by partition, and each group
+        is matched to the open building jobs it can reach (see
+        _match_nearest).
 
-                # Third priority: scaffolding
-                if not unit.task and 'hauling' in unit.components:
-                    self._try_assigning_scaffolding_job(unit)
+        Arguments:
+            units: the idle units which can build
+        """
+        store = self._store
+        taken = set()
 
-                # Fourth priority: mining
-                if not unit.task and 'mining' in unit.components:
-                    self._try_assigning_mining_job(unit)
+        for group in _group_units(store, units, _team_group_key):
+            first = group[0]
+            jobs = first.team.designations.open_jobs_within(
+                     'build', first.partition)
 
-                # Fifth priority: hauling and cleaning
-                if not unit.task and 'hauling' in unit.components:
-                    self._try_assigning_hauling_job(unit)
-                    if not unit.task:
-                        self._try_assigning_cleaning_job(unit)
+            for unit, job in _match_nearest(store, group, [jobs], None, taken):
+                assign_program(self._stage, unit, job,
+                               [('designation', job)],
+                               [('go_beside', job['location'], 0),
+                                ('build', job['location'])])
 
-                # Bottom priority: thumb-twiddling
-                if not unit.task:
-                    self._try_assigning_idling_job(unit)
+    def update(self):
+        """
+        Give jobs to all units that need them.
 
-            if unit.task:
-                unit.task.enact()
+        Jobs are given out by priority.  The jobs of each kind (except
+        cleaning) are matched to all idle units wanting them at once,
+        after every idle unit has had its chance at the jobs with
+        higher priority.
 
-            unit.hunger += 1
+        Only run this once every turn (not every frame).
+        """
+        self._store.remember_positions()
+        self._handle_timers()
+
+        # Look up the job givers once, timing them if profiling.
+        try_eating = self._try_assigning_eating_jobs
+        try_building = self._try_assigning_building_jobs
+        try_scaffolding = self._try_assigning_scaffolding_jobs
+        try_mining = self._try_assigning_mining_jobs
+        try_hauling = self._try_assigning_hauling_jobs
+        try_cleaning = self._try_assigning_cleaning_job
+        try_idling = self._try_assigning_idling_job
+        enact = TaskProgram.enact
+
+        profiler = self._stage.profiler
+        if profiler.enabled:
+            try_eating = profiler.timed('assign eating', try_eating)
+            try_building = profiler.timed('assign building', try_building)
+            try_scaffolding = profiler.timed('assign scaffolding',
+                                             try_scaffolding)
+            try_mining = profiler.timed('assign mining', try_mining)
+            try_hauling = profiler.timed('assign hauling', try_hauling)
+            try_cleaning = profiler.timed('assign cleaning', try_cleaning)
+            try_idling = profiler.timed('assign idling', try_idling)
+            enact = partial(_enact_timed, profiler)
+
+        active_units = list(self._active.values())
+
+        # Read the columns of the units directly, as going through the
+        # properties of every unit adds up.
+        store = self._store
+        turn = store.turn
+        tasks = store.task
+        components = store.components
+        hunger_zero_turns = store.hunger_zero_turn
+        hunger_thresholds = store.hunger_threshold
+
+        idle_units = [unit for unit in active_units
+                      if not tasks[unit.index]]
+        seeking_units = [unit for unit in idle_units
+                         if id(unit) not in self._asleep]
+
+        def wanting(component):
+            return [unit for unit in seeking_units
+                    if not tasks[unit.index]
+                       and components[unit.index] & component]
+
+        # First priority: eating
+        try_eating([unit for unit in wanting(EATING)
+                    if turn - hunger_zero_turns[unit.index]
+                       >= hunger_thresholds[unit.index]])
+
+        # Second priority: building
+        try_building(wanting(BUILDING))
+
+        # Third priority: scaffolding
+        try_scaffolding(wanting(HAULING))
+
+        # Fourth priority: mining
+        try_mining(wanting(MINING))
+
+        # Fifth priority: hauling, then cleaning
+        try_hauling(wanting(HAULING))
+
+        for unit in seeking_units:
+            index = unit.index
+            if not tasks[index] and components[index] & HAULING:
+                try_cleaning(unit)
+
+            # If there was no work, wait for something to change.
+            if not tasks[index]:
+                self._sleep(unit)
+
+        for unit in idle_units:
+            # Bottom priority: thumb-twiddling
+            if not tasks[unit.index]:
+                try_idling(unit)
+
+        for unit in active_units:
+            index = unit.index
+            task = tasks[index]
+            if task:
+                turns = enact(task)
+
+                # Set the unit aside if its task is not due for a while.
+                if turns and tasks[index] is task:
+                    self._park(unit, turns)
+
+        store.advance()
 
 
 class UnitDrawSystem(object):
     """
     A UnitDrawSystem draws units onto the screen.
+
+    Units outside the camera's view are culled by going through the
+    positions in the stage's UnitStore, so only visible units are
+    touched.  Units which moved a step during the last turn are drawn
+    between their previous and current positions, so that they move
+    smoothly no matter how many frames are drawn per turn.
+
+    Arguments:
+        stage: the stage whose units are drawn
     """
-    def __init__(self):
-        self._units = []
+    def __init__(self, stage):
+        self._store = stage.units
+
+        # The units to draw: {id(unit): unit}
+        self._units = {}
 
     def add(self, unit):
         """
@@ -572,19 +964,39 @@ class UnitDrawSystem(object):
         Arguments:
             unit: the unit
         """
-        self._units.append(unit)
+        self._units[id(unit)] = unit
 
-    def update(self, screen, tileset, camera):
+    def update(self, screen, tileset, camera, alpha=1.0):
         """
         Draws all units onto the screen.
 
         Arguments:
             screen: the screen to draw onto
-            tileset: the tileset to use for drawing
+            tileset: the Tileset to use for drawing
             camera: the camera to project from
+            alpha: how far the game is into the next turn, from 0
+                   (draw units where they were) to 1 (draw units
+                   where they are)
         """
-        for unit in self._units:
-            screen.blit(tileset,
-                        camera.transform_game_to_screen(
-                            (unit.x, unit.y), scalar=16),
-                        unit.clip)
+        store = self._store
+        xs, ys = store.x, store.y
+        prev_xs, prev_ys = store.prev_x, store.prev_y
+        size, offset_x, offset_y = camera.get_tile_grid()
+        batch = SpriteBatch(tileset)
+
+        for unit in store.find_units_in_rect(camera.find_view()):
+            if id(unit) in self._units:
+                index = unit.index
+                x, y = xs[index], ys[index]
+                prev_x, prev_y = prev_xs[index], prev_ys[index]
+
+                # Only interpolate single steps, not, e.g., teleports.
+                if abs(x - prev_x) <= 1 and abs(y - prev_y) <= 1:
+                    x = prev_x + (x - prev_x) * alpha
+                    y = prev_y + (y - prev_y) * alpha
+
+                batch.add((round(x * size) + offset_x,
+                           round(y * size) + offset_y),
+                          unit.clip)
+
+        batch.draw(screen)
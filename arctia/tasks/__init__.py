@@ -7,4 +7,5 @@ from .go_beside import GoBeside
 from .go_to_any_matching_spot import GoToAnyMatchingSpot
 from .mine import Mine
 from .take import Take
+from .teleport import Teleport
 from .wait import Wait
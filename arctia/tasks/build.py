@@ -5,14 +5,25 @@ class Build(object):
         unit:          the unit (e.g., Penguin) whose task this
         target:        the target position as a pair of (x, y) coordinates
         finished_proc: the procedure to run if the task is finished
+        state:         the state to resume from (see get_state), or None
     """
-    def __init__(self, stage, unit, target, finished_proc):
+    def __init__(self, stage, unit, target, finished_proc, state=None):
         self.stage = stage
         self.unit = unit
         self.target = target
-        self.work_left = 10
+        self.work_left = stage.work_amounts['build'] \
+                         if state is None else state
         self.finished_proc = finished_proc
 
+    def get_state(self):
+        """
+        Return the progress of this task as plain data.
+
+        Returns: a value which can be passed as the state argument to
+                 resume the task
+        """
+        return self.work_left
+
     def _assert_unit_is_within_range(self):
         x, y = self.unit.x, self.unit.y
         tx, ty = self.target
@@ -28,9 +39,8 @@ class Build(object):
             self.work_left -= 1
 
         # Prolong the task if a mob is in the way.
-        for mob in self.stage.mobs:
-            if (mob.x, mob.y) == self.target:
-                return
+        if self.stage.mobs_at(self.target):
+            return
 
         # Prolong the task if an entity is in the way.
         if self.stage.entity_at(self.target):
@@ -1,9 +1,14 @@
 class Contribute(object):
-    def __init__(self, entity, job, finished_proc):
+    def __init__(self, entity, job, finished_proc, state=None):
         self.entity = entity
         self.job = job
         self.finished_proc = finished_proc
 
+    def get_state(self):
+        # Contributing is done in one turn, so there is no progress
+        # to keep.
+        return None
+
     def enact(self):
         self.job['collected_goods'].append(self.entity)
         self.finished_proc()
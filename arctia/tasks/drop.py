@@ -7,13 +7,18 @@ class Drop(object):
         2. Otherwise, the unit drops the item, and
            finished_proc is called.
     """
-    def __init__(self, stage, entity, unit, blocked_proc, finished_proc):
+    def __init__(self, stage, entity, unit, blocked_proc, finished_proc,
+                 state=None):
         self._stage = stage
         self._entity = entity
         self._unit = unit
         self._blocked_proc = blocked_proc
         self._finished_proc = finished_proc
 
+    def get_state(self):
+        # Dropping is done in one turn, so there is no progress to keep.
+        return None
+
     def enact(self):
         unit = self._unit
 
@@ -1,7 +1,7 @@
 class Eat(object):
     def __init__(self, stage, unit, entity,
-                 interrupted_proc, finished_proc):
-        self._work_left = 10
+                 interrupted_proc, finished_proc, state=None):
+        self._work_left = stage.work_amounts['eat']
         self._stage = stage
         self._unit = unit
         self._entity = entity
@@ -9,6 +9,12 @@ class Eat(object):
         self._finished_proc = finished_proc
         self._finished = False
 
+        if state is not None:
+            self._work_left, self._finished = state
+
+    def get_state(self):
+        return self._work_left, self._finished
+
     def enact(self):
         assert not self._finished, \
                'task enacted after it was finished'
@@ -33,6 +39,7 @@ class Eat(object):
         if self._work_left == 0:
             self._unit.hunger = max(0, self._unit.hunger - self._unit.hunger_diet[self._entity.kind])
             self._stage.delete_entity(self._entity)
+            self._stage.events.publish('eaten')
             self._finished_proc()
             self._finished = True
             return
@@ -12,12 +12,12 @@ class Go(object):
         delay:         the number of turns to delay between steps
         blocked_proc:  the procedure to run if the path is broken
         finished_proc: the procedure to run if the task is finished
+        state:         the state to resume from (see get_state), or None
     """
     def __init__(self, stage, unit, target, delay=0,
-                 blocked_proc=None, finished_proc=None):
+                 blocked_proc=None, finished_proc=None, state=None):
         self._unit = unit
         self._delay = delay
-        self._timer = 0
         self._target = target
         self._target_is_solid = \
           tile_is_solid(stage.get_tile_at(target[0], target[1]))
@@ -26,17 +26,50 @@ class Go(object):
         self._stage = stage
         self._finished = False
 
+        # The index of the next step in the path.  The path is never
+        # copied as it is walked; only the index moves on.
+        self._path_index = 0
+
+        if state is not None:
+            self._path, self._finished = state
+            return
+
         assert self._target_is_reachable(), \
                'destination tile is unreachable'
 
         # Find the path to the destination.
         self._path = astar(stage, (unit.x, unit.y), target)
 
+    def get_state(self):
+        """
+        Return the progress of this task as plain data.
+
+        Returns: a value which can be passed as the state argument to
+                 resume the task
+        """
+        path = self._path
+        if path is not None:
+            path = path[self._path_index:]
+        return path, self._finished
+
     def _target_is_reachable(self):
         tx, ty = self._target
         return self._unit.partition[ty][tx]
 
+    def _is_at_goal(self):
+        if (self._unit.x, self._unit.y) == self._target:
+            return True
+        return self._target_is_solid \
+               and len(self._path) - self._path_index == 1
+
     def enact(self):
+        """
+        Enact the task, i.e., make the unit carry it out.
+
+        Returns: the number of turns until the task needs to be
+                 enacted again, or None if it should be enacted
+                 again next turn
+        """
         assert not self._finished, \
                'task enacted after it was finished'
 
@@ -59,28 +92,40 @@ class Go(object):
         x, y = unit.x, unit.y
         path = self._path
 
-        if self._target_is_solid and len(path) == 1:
+        # If the unit's partition was stale, there may be no path
+        # at all, which also counts as a block.
+        if path is None:
+            self._finished = True
+            self._blocked_proc()
+            return
+
+        index = self._path_index
+        if self._target_is_solid and len(path) - index == 1:
             # The target is solid and we've reached it,
             # so finish the task.
             self._finished = True
             self._finished_proc()
             return
 
-        if self._timer == 0:
-            dx, dy = (self._path[0][0] - x, self._path[0][1] - y)
-            assert -1 <= dx <= 1
-            assert -1 <= dy <= 1
-
-            if not tile_is_solid(self._stage.get_tile_at(x + dx, y + dy)):
-                # Step toward the target.
-                unit.x += dx
-                unit.y += dy
-                self._path = path[1:]
-            else:
-                # The path was blocked, so calculate a new path.
-                self._path = astar(self._stage,
-                                   (unit.x, unit.y),
-                                   self._target)
-        if self._delay > 0:
-            self._timer = (self._timer + 1) % (self._delay + 1)
+        next_x, next_y = path[index]
+        dx, dy = next_x - x, next_y - y
+        assert -1 <= dx <= 1
+        assert -1 <= dy <= 1
+
+        if not tile_is_solid(self._stage.get_tile_at(x + dx, y + dy)):
+            # Step toward the target.
+            self._stage.move_mob(unit, (x + dx, y + dy))
+            self._path_index = index + 1
+        else:
+            # The path was blocked, so calculate a new path.
+            self._path = astar(self._stage,
+                               (unit.x, unit.y),
+                               self._target)
+            self._path_index = 0
 
+        # Wait before taking the next step, unless the target has
+        # been reached.
+        if self._delay > 0 and self._path \
+           and self._path_index < len(self._path) \
+           and not self._is_at_goal():
+            return self._delay + 1
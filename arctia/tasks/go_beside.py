@@ -1,4 +1,4 @@
-from arctia.common import tile_is_solid, unit_can_reach
+from arctia.common import tile_is_solid, unit_can_reach, OFFSETS_BY_MASK
 from arctia.search import astar
 
 class GoBeside(object):
@@ -12,46 +12,72 @@ class GoBeside(object):
         delay:         the number of turns to delay between steps
         blocked_proc:  the procedure to run if the path is broken
         finished_proc: the procedure to run if the task is finished
+        state:         the state to resume from (see get_state), or None
     """
     def __init__(self, stage, unit, target, delay=0,
-                 blocked_proc=None, finished_proc=None):
+                 blocked_proc=None, finished_proc=None, state=None):
         self._unit = unit
         self._delay = delay
-        self._timer = 0
         self._target = target
         self._blocked_proc = blocked_proc
         self._finished_proc = finished_proc
         self._stage = stage
         self._finished = False
 
+        # The index of the next step in the path.
+        self._path_index = 0
+
+        if state is not None:
+            self._path, self._finished = state
+            return
+
         assert unit_can_reach(unit, target), \
                'destination tile is unreachable'
 
         # Find the path to the destination.
         self._path = astar(stage, (unit.x, unit.y), target)
 
+    def get_state(self):
+        """
+        Return the progress of this task as plain data.
+
+        Returns: a value which can be passed as the state argument to
+                 resume the task
+        """
+        path = self._path
+        if path is not None:
+            path = path[self._path_index:]
+        return path, self._finished
+
+    def _is_at_goal(self):
+        return len(self._path) - self._path_index == 1
+
     def enact(self):
+        """
+        Enact the task, i.e., make the unit carry it out.
+
+        Returns: the number of turns until the task needs to be
+                 enacted again, or None if it should be enacted
+                 again next turn
+        """
         assert not self._finished, \
                'task enacted after it was finished'
 
         # If the unit is already on the tile it needs to go beside,
         # then step off the tile.
         if (self._unit.x, self._unit.y) == self._target:
-            for dx in [-1, 0, 1]:
-                for dy in [-1, 0, 1]:
-                    if (dx, dy) == (0, 0):
-                        continue
-                    if not tile_is_solid(
-                             self._stage.get_tile_at(
-                               self._unit.x + dx,
-                               self._unit.y + dy)):
-                        self._unit.x += dx
-                        self._unit.y += dy
-                        self._finished = True
-                        self._finished_proc()
-                        return
-            # It is impossible to step off the tile, so just
+            mask = self._stage.walkable_masks[self._unit.y][self._unit.x]
+
+            # If it is impossible to step off the tile, just
             # prolong the task.
+            if not mask:
+                return
+
+            dx, dy = OFFSETS_BY_MASK[mask][0]
+            self._stage.move_mob(self._unit,
+                                 (self._unit.x + dx, self._unit.y + dy))
+            self._finished = True
+            self._finished_proc()
             return
 
         # bug - if we are after an object and the object becomes
@@ -66,25 +92,38 @@ class GoBeside(object):
         x, y = unit.x, unit.y
         path = self._path
 
-        if len(path) == 1:
+        # If the unit's partition was stale, there may be no path
+        # at all, which also counts as a block.
+        if path is None:
+            self._finished = True
+            self._blocked_proc()
+            return
+
+        index = self._path_index
+        if len(path) - index == 1:
             self._finished = True
             self._finished_proc()
             return
 
-        if self._timer == 0:
-            dx, dy = (self._path[0][0] - x, self._path[0][1] - y)
-            assert -1 <= dx <= 1
-            assert -1 <= dy <= 1
-
-            if not tile_is_solid(self._stage.get_tile_at(x + dx, y + dy)):
-                # Step toward the target.
-                unit.x += dx
-                unit.y += dy
-                self._path = path[1:]
-            else:
-                # The path was blocked, so calculate a new path.
-                self._path = astar(self._stage,
-                                   (unit.x, unit.y),
-                                   self._target)
-        if self._delay > 0:
-            self._timer = (self._timer + 1) % (self._delay + 1)
+        next_x, next_y = path[index]
+        dx, dy = next_x - x, next_y - y
+        assert -1 <= dx <= 1
+        assert -1 <= dy <= 1
+
+        if not tile_is_solid(self._stage.get_tile_at(x + dx, y + dy)):
+            # Step toward the target.
+            self._stage.move_mob(unit, (x + dx, y + dy))
+            self._path_index = index + 1
+        else:
+            # The path was blocked, so calculate a new path.
+            self._path = astar(self._stage,
+                               (unit.x, unit.y),
+                               self._target)
+            self._path_index = 0
+
+        # Wait before taking the next step, unless the target has
+        # been reached.
+        if self._delay > 0 and self._path \
+           and self._path_index < len(self._path) \
+           and not self._is_at_goal():
+            return self._delay + 1
@@ -1,3 +1,6 @@
+from arctia.common import tile_is_solid
+from arctia.search import astar, find_path_to_matching
+
 class GoToAnyMatchingSpot(object):
     """
     Go to the nearest spot that matches some condition.
@@ -12,16 +15,39 @@ class GoToAnyMatchingSpot(object):
         condition_func: the function returning whether the spot is okay
         impossible_proc: the procedure to run if there is no empty spot
         finished_proc: the procedure to run if the task is finished
+        state:         the state to resume from (see get_state), or None
     """
     def __init__(self, stage, unit, condition_func,
-                 impossible_proc, finished_proc):
+                 impossible_proc, finished_proc, state=None):
         self._unit = unit
         self._condition_func = condition_func
         self._impossible_proc = impossible_proc
         self._finished_proc = finished_proc
         self._stage = stage
+
+        # The index of the next step in the path.
+        self._path_index = 0
+
+        if state is not None:
+            self._path, self._target, self._target_is_solid = state
+            return
+
+        self._target = None
+        self._target_is_solid = False
         self._recalculate()
 
+    def get_state(self):
+        """
+        Return the progress of this task as plain data.
+
+        Returns: a value which can be passed as the state argument to
+                 resume the task
+        """
+        path = self._path
+        if path is not None:
+            path = path[self._path_index:]
+        return path, self._target, self._target_is_solid
+
     def _recalculate(self):
         stage = self._stage
         unit = self._unit
@@ -29,6 +55,7 @@ class GoToAnyMatchingSpot(object):
         self._path = find_path_to_matching(stage,
                                            (unit.x, unit.y),
                                            self._condition_func)
+        self._path_index = 0
 
         # If the unit has no path, run the impossible proc and quit.
         if self._path is None:
@@ -65,31 +92,33 @@ class GoToAnyMatchingSpot(object):
         unit = self._unit
         x, y = unit.x, unit.y
         path = self._path
+        index = self._path_index
 
-        if len(path) == 0:
+        if len(path) == index:
             # bug - will checking this here cause penguins to
             #       delay for a turn, since the move happened
             #       on the last turn?
             # We have reached the goal, so finish the task.
             self._finished_proc()
             return
-        elif self._target_is_solid and len(path) == 1:
+        elif self._target_is_solid and len(path) - index == 1:
             # The target is solid and we've reached it,
             # so finish the task.
             self._finished_proc()
             return
 
-        dx, dy = (self._path[0][0] - x, self._path[0][1] - y)
+        next_x, next_y = path[index]
+        dx, dy = next_x - x, next_y - y
         assert -1 <= dx <= 1
         assert -1 <= dy <= 1
 
         if not tile_is_solid(self._stage.get_tile_at(x + dx, y + dy)):
             # Step toward the target.
-            unit.x += dx
-            unit.y += dy
-            self._path = path[1:]
+            self._stage.move_mob(unit, (x + dx, y + dy))
+            self._path_index = index + 1
         else:
             # The path was blocked, so calculate a new path.
             self._path = astar(self._stage,
                                (unit.x, unit.y),
                                self._target)
+            self._path_index = 0
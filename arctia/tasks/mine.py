@@ -1,4 +1,4 @@
-import random
+from ..kinds import ROCK
 
 class Mine(object):
     """
@@ -7,15 +7,26 @@ class Mine(object):
         unit:          the unit (e.g., Penguin) whose task this
         target:        the target position as a pair of x-y coordinates
         finished_proc: the procedure to run if the task is finished
+        state:         the state to resume from (see get_state), or None
     """
-    def __init__(self, stage, unit, target, finished_proc):
+    def __init__(self, stage, unit, target, finished_proc, state=None):
         self._stage = stage
         self._unit = unit
         self._target = target
-        self._work_left = 10
+        self._work_left = stage.work_amounts['mine'] \
+                          if state is None else state
         self._assert_unit_is_within_range()
         self._finished_proc = finished_proc
 
+    def get_state(self):
+        """
+        Return the progress of this task as plain data.
+
+        Returns: a value which can be passed as the state argument to
+                 resume the task
+        """
+        return self._work_left
+
     def _assert_unit_is_within_range(self):
         x, y = self._unit.x, self._unit.y
         tx, ty = self._target
@@ -33,8 +44,8 @@ class Mine(object):
             self._stage.set_tile_at(tx, ty, 18)
 
             # 50% chance of rock appearing
-            if random.randint(0, 1) == 0:
-                self._stage.create_entity('rock', (tx, ty))
+            if self._stage.random.randint(0, 1) == 0:
+                self._stage.create_entity(ROCK, (tx, ty))
 
             # Finish the mining task
             self._finished_proc()
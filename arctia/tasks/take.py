@@ -1,19 +1,22 @@
 class Take(object):
     def __init__(self, stage, unit, entity,
-                 not_found_proc, finished_proc):
+                 not_found_proc, finished_proc, state=None):
         self._stage = stage
         self._unit = unit
         self._entity = entity
         self._finished_proc = finished_proc
         self._not_found_proc = not_found_proc
 
+    def get_state(self):
+        # Taking is done in one turn, so there is no progress to keep.
+        return None
+
     def enact(self):
         if not self._entity.location \
            or self._entity.location != (self._unit.x, self._unit.y):
             self._not_found_proc()
             return
 
-        self._entity.location = None
         self._stage.delete_entity(self._entity)
         self._finished_proc()
         return
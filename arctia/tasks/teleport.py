@@ -0,0 +1,34 @@
+from arctia.common import tile_is_solid
+
+class Teleport(object):
+    """
+    A Teleport puts a unit on a tile without walking there.
+
+    This stands in for walking when nobody is around to watch, e.g.,
+    for wildlife wandering far from the player's units.  If the tile
+    has become solid, the unit stays where it is.
+
+    Arguments:
+        stage:         the Stage containing the unit
+        unit:          the unit (e.g., Bug) whose task this
+        target:        the target position as a pair of x-y coordinates
+        finished_proc: the procedure to run if the task is finished
+        state:         the state to resume from (see get_state), or None
+    """
+    def __init__(self, stage, unit, target, finished_proc, state=None):
+        self._stage = stage
+        self._unit = unit
+        self._target = target
+        self._finished_proc = finished_proc
+
+    def get_state(self):
+        # Teleporting is done in one turn, so there is no progress
+        # to keep.
+        return None
+
+    def enact(self):
+        tx, ty = self._target
+        if not tile_is_solid(self._stage.get_tile_at(tx, ty)):
+            self._stage.move_mob(self._unit, self._target)
+
+        self._finished_proc()
@@ -3,28 +3,49 @@ class Wait(object):
     A TaskWait represents waiting without moving for some span of time.
     
     Arguments:
-        duration:      the amount of turns to wait
+        duration:      the amount of turns to wait, where waiting for
+                       0 turns is the same as waiting for 1
         finished_proc: the procedure to run after this task is done
+        state:         the state to resume from (see get_state), or None
     """
-    def __init__(self, duration, finished_proc):
-        assert duration >= 0, 'duration must be >= 0, not ' + duration
+    def __init__(self, duration, finished_proc, state=None):
+        assert duration >= 0, 'duration must be >= 0, not %r' % (duration,)
 
         self._duration = duration
         self._timer = 0
         self._finished_proc = finished_proc
         self._finished = False
-        pass
+
+        if state is not None:
+            self._timer, self._finished = state
+
+    def get_state(self):
+        """
+        Return the progress of this task as plain data.
+
+        Returns: a value which can be passed as the state argument to
+                 resume the task
+        """
+        return self._timer, self._finished
 
     def enact(self):
         """
         Enact the task, i.e., make the unit carry it out.
+
+        Returns: the number of turns until the task needs to be
+                 enacted again, since nothing happens in between
         """
         assert not self._finished, \
                'task enacted after it was finished'
 
         self._timer += 1
 
-        if self._timer == self._duration:
+        if self._timer >= self._duration:
             self._finished = True
             self._finished_proc()
             return
+
+        # Skip ahead to the last turn of waiting.
+        skipped = self._duration - self._timer
+        self._timer += skipped - 1
+        return skipped
@@ -1,36 +1,267 @@
 """
 The team module provides a class (Team) for coordinating units.
 """
+from .chunks import ChunkIndex
+from .jobboard import JobBoard, OPEN, RESERVED
+
+def _locations_in(stock):
+    for y in range(stock.y, stock.y + stock.height):
+        for x in range(stock.x, stock.x + stock.width):
+            yield x, y
+
+def _reservation_key(kind, obj):
+    # Locations are plain (x, y) tuples, so equal locations must share
+    # a reservation.  Everything else is reserved by identity.
+    if kind == 'location':
+        return obj
+    return id(obj)
+
 class Team(object):
     """
     A Team allows units to obey designations and make reservations.
+
+    Reservations are kept in hash tables keyed by object identity
+    (or by value, for locations), and each reservation records the
+    unit which holds it.  Reservations of the kind 'designation' are
+    kept by the team's JobBoard, where reserving a designation
+    claims it.
+
+    A Team indexes its stockpiles by the locations they cover, so
+    finding the stockpile at a location is O(1).  Given a stage, a Team
+    also keeps track of which entities need hauling, i.e., which
+    entities are neither reserved nor stored in a stockpile accepting
+    them, and tells its stockpiles about entity changes.  The entities
+    needing hauling are also indexed by the partitions units are in,
+    so finding one a unit can reach looks at neither the entities it
+    cannot reach nor the far-away ones it can.  A Team
+    without a stage hears of no entity changes, so it can only make
+    reservations and cannot have stockpiles.
+
+    Arguments:
+        stage: the Stage the team plays on, or None
     """
-    def __init__(self):
-        self.designations = []
+    def __init__(self, stage=None):
+        self._events = stage.events if stage else None
+        self.designations = JobBoard(self._events)
+
+        # The reservations of each kind: {kind: {key: (obj, owner)}}
         self.reservations = {
-            'entity': [],
-            'location': [],
-            'mine': [],
-            'designation': []
+            'entity': {},
+            'location': {},
+            # Designations are reserved on the job board instead.
+            'designation': None
         }
+
+        # The reservations held by each owner:
+        # {id(owner): {(kind, key): obj}}
+        self._held = {}
+
         self.stockpiles = []
 
+        # The stockpile covering each location: {(x, y): stockpile}
+        self._stockpile_at = {}
+
+        # The entities needing hauling and their locations by kind:
+        # {kind: {id(entity): (entity, location)}}
+        self._unhauled = {}
+
+        # The entities needing hauling within each partition asked
+        # about, by kind, which are made when first asked for and
+        # dropped whenever partitions change:
+        # {id(partition): (partition, {kind: ChunkIndex})}
+        self._unhauled_within = {}
+
+        self._stage = stage
+        if stage:
+            for entity in stage.get_entities():
+                self._update_unhauled(entity)
+            stage.register_entity_change_listener(self)
+            stage.events.subscribe('reachability',
+                                   self._forget_unhauled_within)
+
+    def _entity_is_stockpiled(self, entity):
+        stock = self._stockpile_at.get(entity.location)
+        return stock is not None and entity.kind in stock.accepted_kinds
+
+    def _update_unhauled(self, entity):
+        """
+        Add an entity to the unhauled entities if it needs hauling,
+        otherwise remove it.
+        """
+        if not self._stage:
+            return
+
+        kind = entity.kind
+        if kind not in self._unhauled:
+            self._unhauled[kind] = {}
+        unhauled = self._unhauled[kind]
+
+        location = entity.location
+        needs_hauling = location is not None \
+                        and not self.is_reserved('entity', entity) \
+                        and not self._entity_is_stockpiled(entity)
+        was_unhauled = id(entity) in unhauled
+
+        if needs_hauling and not was_unhauled:
+            unhauled[id(entity)] = entity, location
+            x, y = location
+            for partition, indexes in self._unhauled_within.values():
+                if partition[y][x]:
+                    if kind not in indexes:
+                        indexes[kind] = ChunkIndex()
+                    indexes[kind].add(entity, location)
+        elif was_unhauled and not needs_hauling:
+            _, old_location = unhauled.pop(id(entity))
+            for _, indexes in self._unhauled_within.values():
+                if kind in indexes:
+                    indexes[kind].discard(entity, old_location)
+
+    def _forget_unhauled_within(self, _unused_event):
+        self._unhauled_within = {}
+
+    def get_unhauled_entities(self, kind, partition):
+        """
+        Return the entities of a kind which need hauling and are within
+        a partition.
+
+        Arguments:
+            kind: the kind of entity
+            partition: the partition of a unit (see the partition
+                       module)
+
+        Returns: a ChunkIndex of the entities, which must not be
+                 changed
+        """
+        view = self._unhauled_within.get(id(partition))
+
+        if view is None:
+            indexes = {}
+            for unhauled_kind, unhauled in self._unhauled.items():
+                index = indexes[unhauled_kind] = ChunkIndex()
+                for entity, (x, y) in unhauled.values():
+                    if partition[y][x]:
+                        index.add(entity, (x, y))
+
+            # Keeping the partition keeps its id from being reused.
+            view = self._unhauled_within[id(partition)] = \
+              partition, indexes
+
+        indexes = view[1]
+        if kind not in indexes:
+            indexes[kind] = ChunkIndex()
+        return indexes[kind]
+
+    def entity_added(self, entity, loc):
+        """
+        Notify the Team that an entity was added to the stage.
+
+        Arguments:
+            entity: the entity
+            loc: the (x, y) coordinates of the entity
+        """
+        stock = self._stockpile_at.get(loc)
+        if stock:
+            stock.entity_added(entity, loc)
+
+        self._update_unhauled(entity)
+
+    def entity_removed(self, entity, loc):
+        """
+        Notify the Team that an entity was removed from the stage.
+
+        Arguments:
+            entity: the entity
+            loc: the (x, y) coordinates the entity was at
+        """
+        stock = self._stockpile_at.get(loc)
+        if stock:
+            stock.entity_removed(entity, loc)
+            self._publish('stockpile')
+
+        self._update_unhauled(entity)
+
+    def find_unhauled_entity(self, kinds, partition, near):
+        """
+        Find the nearest entity which needs hauling within a partition.
+
+        An entity needs hauling if it is on the stage, is not reserved,
+        and is not in a stockpile which accepts its kind.
+
+        Arguments:
+            kinds: the kinds of entity to look for
+            partition: the partition of the unit which would haul it
+            near: the (x, y) coordinates to look around
+
+        Returns: the nearest entity of one of the kinds, or None
+        """
+        best = None
+
+        for kind in kinds:
+            found = self.get_unhauled_entities(kind, partition) \
+                        .nearest(near, 1)
+            if found and (best is None or found[0][0] < best[0]):
+                best = found[0]
+
+        return best[1] if best else None
+
+    def get_hauling_order(self):
+        """
+        Return the entities needing hauling in the order they are found.
+
+        Returns: a list of (kind, entities) pairs
+        """
+        return [(kind, [entity for entity, _ in unhauled.values()])
+                for kind, unhauled in self._unhauled.items()]
+
+    def set_hauling_order(self, order):
+        """
+        Restore the order in which entities needing hauling are found,
+        e.g., when loading a saved game.
+
+        Arguments:
+            order: a list of (kind, entities) pairs from
+                   get_hauling_order, which must list exactly the
+                   entities needing hauling
+        """
+        self._unhauled = {kind: {id(entity): (entity, entity.location)
+                                 for entity in entities}
+                          for kind, entities in order}
+        self._unhauled_within = {}
+
     def _assert_is_legal_kind(self, kind):
         assert kind in self.reservations, \
                'illegal reservation kind: %s' % (kind,)
 
-    def reserve(self, kind, obj):
+    def reserve(self, kind, obj, owner=None):
         """
         Make a reservation of a given kind on an object.
 
         Arguments:
             kind: the kind of reservation
             obj: the object
+            owner: the unit holding the reservation, or None
         """
         self._assert_is_legal_kind(kind)
         assert not self.is_reserved(kind, obj), \
                'tried to reserve already-reserved %s' % (kind,)
-        self.reservations[kind].append(obj)
+
+        key = _reservation_key(kind, obj)
+        if kind == 'designation':
+            self.designations.claim(obj, owner)
+        else:
+            self.reservations[kind][key] = obj, owner
+
+        if kind == 'location':
+            stock = self._stockpile_at.get(obj)
+            if stock:
+                stock.location_reserved(obj)
+        elif kind == 'entity':
+            self._update_unhauled(obj)
+
+        owner_key = id(owner)
+        if owner_key not in self._held:
+            self._held[owner_key] = {}
+        self._held[owner_key][kind, key] = obj
 
     def relinquish(self, kind, obj):
         """
@@ -43,7 +274,51 @@ class Team(object):
         self._assert_is_legal_kind(kind)
         assert self.is_reserved(kind, obj), \
                'tried to relinquish already-unreserved %s' % (kind,)
-        self.reservations[kind].remove(obj)
+
+        key = _reservation_key(kind, obj)
+        if kind == 'designation':
+            owner = self.designations.owner(obj)
+            self.designations.release(obj)
+        else:
+            _, owner = self.reservations[kind].pop(key)
+
+        held = self._held[id(owner)]
+        del held[kind, key]
+        if not held:
+            del self._held[id(owner)]
+
+        self._reservation_deleted(kind, obj)
+
+    def _reservation_deleted(self, kind, obj):
+        if kind == 'location':
+            stock = self._stockpile_at.get(obj)
+            if stock:
+                stock.location_relinquished(obj)
+                self._publish('stockpile')
+        elif kind == 'entity':
+            self._update_unhauled(obj)
+            self._publish('entity')
+
+    def _publish(self, event):
+        if self._events:
+            self._events.publish(event)
+
+    def relinquish_all(self, owner):
+        """
+        Delete every reservation held by an owner.
+
+        Arguments:
+            owner: the unit whose reservations should be deleted
+        """
+        held = self._held.pop(id(owner), {})
+
+        for (kind, key), obj in held.items():
+            if kind == 'designation':
+                self.designations.release(obj)
+            else:
+                del self.reservations[kind][key]
+
+            self._reservation_deleted(kind, obj)
 
     def is_reserved(self, kind, obj):
         """
@@ -56,20 +331,166 @@ class Team(object):
         Returns: whether the entity is reserved
         """
         self._assert_is_legal_kind(kind)
-        return obj in self.reservations[kind]
+        if kind == 'designation':
+            return self.designations.status(obj) == RESERVED
+        return _reservation_key(kind, obj) in self.reservations[kind]
+
+    def get_reservation_owner(self, kind, obj):
+        """
+        Return the unit holding a reservation on an object.
+
+        Arguments:
+            kind: the kind of reservation
+            obj: the object
+
+        Returns: the owner of the reservation, or None if the object
+                 is not reserved or its owner is unknown
+        """
+        self._assert_is_legal_kind(kind)
+        if kind == 'designation':
+            return self.designations.owner(obj)
+        reservation = \
+          self.reservations[kind].get(_reservation_key(kind, obj))
+        return reservation[1] if reservation else None
+
+    def get_reservations_held_by(self, owner):
+        """
+        Return the reservations held by an owner.
+
+        This is meant for debugging, e.g., to see what a stuck unit
+        is holding on to.
+
+        Arguments:
+            owner: the unit
+
+        Returns: a list of (kind, obj) tuples
+        """
+        return [(kind, obj)
+                for (kind, _), obj in self._held.get(id(owner), {}).items()]
+
+    def describe_reservations(self):
+        """
+        Return every reservation of this team along with its owner.
+
+        This is meant for debugging.
+
+        Returns: a list of (owner, kind, obj) tuples
+        """
+        result = []
+
+        for kind, table in self.reservations.items():
+            if kind == 'designation':
+                for job in self.designations:
+                    if self.designations.status(job) == RESERVED:
+                        result.append((self.designations.owner(job),
+                                       kind, job))
+            else:
+                for obj, owner in table.values():
+                    result.append((owner, kind, obj))
+
+        return result
+
+    def add_stockpile(self, stock):
+        """
+        Add a stockpile to this team.
+
+        The stockpile must not overlap any other stockpile of the team,
+        and the team must have a stage.
+
+        Arguments:
+            stock: the Stockpile
+        """
+        assert self._stage, 'a team without a stage cannot have stockpiles'
+        assert not self.find_stockpiles_overlapping(
+                     (stock.x, stock.y, stock.width, stock.height)), \
+               'stockpile overlaps another stockpile'
+
+        self.stockpiles.append(stock)
+
+        for loc in _locations_in(stock):
+            self._stockpile_at[loc] = stock
+            if self.is_reserved('location', loc):
+                stock.location_reserved(loc)
+
+        self._update_unhauled_in(stock)
+        self._publish('stockpile')
+
+    def remove_stockpile(self, stock):
+        """
+        Remove a stockpile from this team.
+
+        Arguments:
+            stock: the Stockpile
+        """
+        self.stockpiles.remove(stock)
+
+        for loc in _locations_in(stock):
+            del self._stockpile_at[loc]
+
+        # The entities in the stockpile may need hauling again.
+        self._update_unhauled_in(stock)
+        self._publish('stockpile')
+        self._publish('entity')
+
+    def _update_unhauled_in(self, stock):
+        if not self._stage:
+            return
+
+        for loc in _locations_in(stock):
+            entity = self._stage.entity_at(loc)
+            if entity:
+                self._update_unhauled(entity)
+
+    def get_stockpile_at(self, loc):
+        """
+        Return the stockpile covering a location.
+
+        Arguments:
+            loc: a pair of (x, y) coordinates
+
+        Returns: the Stockpile covering the location, or None
+        """
+        return self._stockpile_at.get(loc)
+
+    def find_stockpiles_overlapping(self, rect):
+        """
+        Return the stockpiles overlapping a rectangle.
+
+        This looks at either every location in the rectangle or every
+        stockpile, whichever is fewer.
+
+        Arguments:
+            rect: a rectangle given as (x, y, width, height)
+
+        Returns: a list of the overlapping stockpiles
+        """
+        left, top, width, height = rect
+        right, bottom = left + width, top + height
+
+        if width * height > len(self.stockpiles):
+            return [stock for stock in self.stockpiles
+                    if stock.x < right and left < stock.x + stock.width
+                       and stock.y < bottom and top < stock.y + stock.height]
+
+        found = {}
+        for y in range(top, bottom):
+            for x in range(left, right):
+                stock = self._stockpile_at.get((x, y))
+                if stock:
+                    found[id(stock)] = stock
+        return list(found.values())
 
     def get_unreserved_designations(self, kind):
         """
-        Return a list of all unreserved designations of a certain kind.
+        Iterate over all open designations of a certain kind.
+
+        The designations must not be reserved while iterating, so stop
+        iterating as soon as one of them is taken.
 
         Args:
             kind (string): The kind of designation.
 
         Returns:
-            A list of all unreserved designations of the given kind.
+            An iterator over all open designations of the given kind.
         """
-        return list(filter(lambda d:
-                             d['kind'] == kind
-                             and not self.is_reserved('designation', d),
-                           self.designations))
-
+        return self.designations.jobs(kind, OPEN)
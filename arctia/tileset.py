@@ -0,0 +1,140 @@
+"""
+The tileset module provides a class (Tileset) for drawing scaled tiles.
+"""
+import pygame
+
+from .config import TILE_SIZE
+
+class Tileset(object):
+    """
+    A Tileset is a tileset image scaled once to a zoom level.
+
+    Scaling the tileset up front lets tiles be blitted straight onto a
+    screen of any zoom, instead of scaling the whole screen every
+    frame.  Clips are given in the unscaled image, e.g., (160, 0, 16,
+    16), and scaled along with it.
+
+    Arguments:
+        image: the unscaled tileset image
+        zoom: how many times to scale the image
+    """
+    def __init__(self, image, zoom=1):
+        self.zoom = zoom
+
+        if zoom == 1:
+            self.image = image
+        else:
+            width, height = image.get_size()
+            self.image = pygame.transform.scale(
+                           image, (round(width * zoom),
+                                   round(height * zoom)))
+
+        # Blitting is fastest from the pixel format of the display.
+        if pygame.display.get_surface() is not None:
+            self.image = self.image.convert_alpha()
+
+        # The scaled clips by their unscaled clips.
+        self._clips = {}
+
+        # The scaled clip of every tile by its ID, for the tiles of
+        # TILE_SIZE laid out in rows of the image.
+        columns = image.get_width() // TILE_SIZE
+        rows = image.get_height() // TILE_SIZE
+        self.tile_clips = [self.scale_clip(((tid % columns) * TILE_SIZE,
+                                            (tid // columns) * TILE_SIZE,
+                                            TILE_SIZE, TILE_SIZE))
+                           for tid in range(columns * rows)]
+
+    def scale_clip(self, clip):
+        """
+        Return a clip of the unscaled image scaled to this tileset.
+
+        Arguments:
+            clip: the clip as (x, y, width, height)
+
+        Returns: the scaled clip
+        """
+        scaled = self._clips.get(clip)
+        if scaled is None:
+            zoom = self.zoom
+            scaled = self._clips[clip] = \
+              tuple(round(value * zoom) for value in clip)
+        return scaled
+
+    def blit(self, screen, position, clip):
+        """
+        Draw part of the tileset onto a screen.
+
+        Arguments:
+            screen: the screen to draw on
+            position: the (x, y) screen coordinates to draw at
+            clip: the part of the unscaled image to draw, as (x, y,
+                  width, height)
+        """
+        screen.blit(self.image, position, self.scale_clip(clip))
+
+class SpriteBatch(object):
+    """
+    A SpriteBatch gathers sprites of a Tileset to draw them at once.
+
+    Drawing a batch hands all its sprites to Surface.blits in one call,
+    which costs far less than a call to Surface.blit for every sprite
+    when many sprites are drawn, e.g., every tile in view.
+
+    Arguments:
+        tileset: the Tileset the sprites are taken from
+    """
+    def __init__(self, tileset):
+        self._tileset = tileset
+        self._image = tileset.image
+        self._tile_clips = tileset.tile_clips
+        self._sprites = []
+
+    def __len__(self):
+        return len(self._sprites)
+
+    def add(self, position, clip):
+        """
+        Add part of the tileset to the batch.
+
+        Arguments:
+            position: the (x, y) screen coordinates to draw at
+            clip: the part of the unscaled image to draw, as (x, y,
+                  width, height)
+        """
+        self._sprites.append((self._image, position,
+                              self._tileset.scale_clip(clip)))
+
+    def add_tile(self, position, tid):
+        """
+        Add a tile of the tileset to the batch.
+
+        Arguments:
+            position: the (x, y) screen coordinates to draw at
+            tid: the ID of the tile, counting along the rows of the
+                 tileset
+        """
+        self._sprites.append((self._image, position, self._tile_clips[tid]))
+
+    def draw(self, screen):
+        """
+        Draw every sprite of the batch, in the order they were added,
+        and empty the batch.
+
+        Arguments:
+            screen: the screen to draw on
+        """
+        screen.blits(self._sprites, False)
+        self._sprites = []
+
+def make_tilesets(image, zooms):
+    """
+    Scale a tileset image to each of several zoom levels.
+
+    Arguments:
+        image: the unscaled tileset image
+        zooms: the zoom levels
+
+    Returns: a dict of zoom levels and their Tilesets
+    """
+    return {zoom: Tileset(image, zoom) for zoom in zooms}
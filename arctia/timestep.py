@@ -0,0 +1,60 @@
+"""
+The timestep module provides a class (FixedTimestep) for pacing turns.
+"""
+
+class FixedTimestep(object):
+    """
+    A FixedTimestep decides when to play turns, independently of frames.
+
+    Real time is added to an accumulator every frame, and a turn is due
+    whenever a full turn's worth of time has accumulated.  If too much
+    time accumulates (because frames or turns were slow), the backlog
+    is capped so that no more than max_turns turns are due at once.
+
+    Between turns, alpha tells how far the game is into the next turn,
+    which is useful for drawing units between their positions.
+
+    The speed of the game is a factor on the time added, so, e.g., at a
+    speed of 2, turns are due twice as often, and at 0, never.
+
+    Arguments:
+        turns_per_second: how many turns to play per second
+        max_turns: the most turns which may be due at once
+    """
+    def __init__(self, turns_per_second, max_turns):
+        self.turn_length = 1.0 / turns_per_second
+        self.max_turns = max_turns
+        self.speed = 1
+
+        # The time (in seconds) not yet spent on turns.
+        self._accumulator = 0.0
+
+    def add_time(self, seconds):
+        """
+        Add elapsed real time.
+
+        Arguments:
+            seconds: the time elapsed since time was last added
+        """
+        self._accumulator = min(self._accumulator + seconds * self.speed,
+                                self.max_turns * self.turn_length)
+
+    def take_turn(self):
+        """
+        Take a due turn if there is one.
+
+        Returns: True if a turn was due and should be played now,
+                 otherwise False
+        """
+        if self._accumulator < self.turn_length:
+            return False
+
+        self._accumulator -= self.turn_length
+        return True
+
+    @property
+    def alpha(self):
+        """
+        How far the game is into the next turn, from 0 to 1.
+        """
+        return min(self._accumulator / self.turn_length, 1.0)
@@ -1,7 +1,7 @@
-from functools import partial
-from ..config import MENU_WIDTH
+from ..config import MENU_REAL_WIDTH
 from ..transform import translate
-from ..common import tile_is_solid, unit_can_reach
+from ..common import tile_is_solid
+from ..kinds import ROCK
 
 
 tooltip = 'Build Wall'
@@ -10,15 +10,7 @@ active_icon_clip = (208, 32, 16, 16)
 
 
 def start_on_tile(pos, stage, player_team):
-    designations = \
-      player_team.designations
-
-    already_exists = False
-    for designation in designations:
-        loc = designation['location']
-        if loc == pos:
-            already_exists = True
-            break
+    already_exists = bool(player_team.designations.jobs_at(pos))
 
     if not already_exists \
        and not tile_is_solid(stage.get_tile_at(*pos)):
@@ -28,35 +20,28 @@ def start_on_tile(pos, stage, player_team):
                 'kind': 'scaffold',
                 'hidden': True,
                 'location': pos,
-                'resource':
-                  lambda unit:
-                    stage.find_entity(
-                      partial(
-                        lambda unit, entity, _unused_x, _unused_y:
-                          unit_can_reach(unit, entity.location) \
-                          and not unit.team.is_reserved('entity',
-                                                        entity) \
-                          and entity.kind == 'rock',
-                        unit)),
+                'resource_kind': ROCK,
                 'done': False
             })
         build_job = {
             'kind': 'build',
             'location': pos,
-            'scaffold_jobs': scaffold_jobs,
+            'pending_dependencies': len(scaffold_jobs),
             'collected_goods': [],
             'done': False
         }
+        for scaffold_job in scaffold_jobs:
+            scaffold_job['parent'] = build_job
         player_team.designations.extend(scaffold_jobs)
-        player_team.designations.append(build_job)
+        player_team.designations.add(build_job)
 
 def stop_on_tile(pos, stage, player_team):
     pass
 
 def draw(screen, camera, tileset, mouse_pos):
     # Draw the selection box under the cursor.
-    if mouse_pos[0] > MENU_WIDTH:
+    if mouse_pos[0] > MENU_REAL_WIDTH:
         selection = camera.transform_screen_to_tile(mouse_pos)
-        screen.blit(tileset,
-                    camera.transform_tile_to_screen(selection),
-                    (128, 0, 16, 16))
+        tileset.blit(screen,
+                     camera.transform_tile_to_screen(selection),
+                     (128, 0, 16, 16))
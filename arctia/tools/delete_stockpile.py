@@ -1,4 +1,4 @@
-from ..config import MENU_WIDTH
+from ..config import MENU_REAL_WIDTH
 from ..transform import translate
 
 
@@ -11,11 +11,9 @@ _block_origin = None
 
 def start_on_tile(pos, stage, player_team):
     # Delete the chosen stockpile
-    for stock in player_team.stockpiles:
-        if stock.x <= pos[0] < stock.x + stock.width \
-           and stock.y <= pos[1] < stock.y + stock.height:
-            player_team.stockpiles.remove(stock)
-            break
+    stock = player_team.get_stockpile_at(pos)
+    if stock:
+        player_team.remove_stockpile(stock)
 
 def stop_on_tile(pos, stage, player_team):
     pass
@@ -24,8 +22,8 @@ def draw(screen, camera, tileset, mouse_pos):
     global _block_origin
 
     # Draw the selection box under the cursor.
-    if mouse_pos[0] > MENU_WIDTH:
+    if mouse_pos[0] > MENU_REAL_WIDTH:
         selection = camera.transform_screen_to_tile(mouse_pos)
-        screen.blit(tileset,
-                    camera.transform_tile_to_screen(selection),
-                    (128, 0, 16, 16))
+        tileset.blit(screen,
+                     camera.transform_tile_to_screen(selection),
+                     (128, 0, 16, 16))
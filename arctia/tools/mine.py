@@ -1,4 +1,4 @@
-from ..config import MENU_WIDTH
+from ..config import MENU_REAL_WIDTH
 from ..transform import translate
 
 
@@ -42,15 +42,10 @@ def stop_on_tile(pos, stage, player_team):
                 designations = \
                   player_team.designations
 
-                already_exists = False
-                for designation in designations:
-                    loc = designation['location']
-                    if loc == (x, y):
-                        already_exists = True
-                        break
+                already_exists = bool(designations.jobs_at((x, y)))
 
                 if not already_exists:
-                    designations.append({
+                    designations.add({
                         'kind': 'mine',
                         'location': (x, y),
                         'done': False
@@ -60,11 +55,11 @@ def draw(screen, camera, tileset, mouse_pos):
     global _block_origin
 
     # Draw the selection box under the cursor.
-    if not _block_origin and mouse_pos[0] > MENU_WIDTH:
+    if not _block_origin and mouse_pos[0] > MENU_REAL_WIDTH:
         selection = camera.transform_screen_to_tile(mouse_pos)
-        screen.blit(tileset,
-                    camera.transform_tile_to_screen(selection),
-                    (128, 0, 16, 16))
+        tileset.blit(screen,
+                     camera.transform_tile_to_screen(selection),
+                     (128, 0, 16, 16))
 
     # Draw the designation rectangle if we are drawing a region.
     if _block_origin:
@@ -76,22 +71,24 @@ def draw(screen, camera, tileset, mouse_pos):
         top = min((ty, oy))
         bottom = max((ty, oy))
 
+        half = camera.tile_size // 2
+
         top_left_coords     = camera.transform_tile_to_screen(
-                                (left, top)),
+                                (left, top))
         top_right_coords    = translate(
                                 camera.transform_tile_to_screen(
                                   (right, top)),
-                                (8, 0))
+                                (half, 0))
         bottom_left_coords  = translate(
                                 camera.transform_tile_to_screen(
                                   (left, bottom)),
-                                (0, 8))
+                                (0, half))
         bottom_right_coords = translate(
                                 camera.transform_tile_to_screen(
                                   (right, bottom)),
-                                (8, 8))
+                                (half, half))
 
-        screen.blit(tileset, top_left_coords, (128, 0, 8, 8))
-        screen.blit(tileset, bottom_left_coords, (128, 8, 8, 8))
-        screen.blit(tileset, top_right_coords, (136, 0, 8, 8))
-        screen.blit(tileset, bottom_right_coords, (136, 8, 8, 8))
+        tileset.blit(screen, top_left_coords, (128, 0, 8, 8))
+        tileset.blit(screen, bottom_left_coords, (128, 8, 8, 8))
+        tileset.blit(screen, top_right_coords, (136, 0, 8, 8))
+        tileset.blit(screen, bottom_right_coords, (136, 8, 8, 8))
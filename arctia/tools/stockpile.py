@@ -1,8 +1,8 @@
-from ..config import MENU_WIDTH
+from ..config import MENU_REAL_WIDTH
 from ..common import tile_is_solid
+from ..kinds import FISH
 from ..transform import translate
 from ..stockpile import Stockpile
-from pygame import Rect
 
 
 tooltip = 'Create Stockpile'
@@ -31,25 +31,16 @@ def stop_on_tile(pos, stage, player_team):
     top = min((ty, oy))
     bottom = max((ty, oy))
 
-    conflicts = False
-
     # Check if this conflicts with existing stockpiles.
-    for stock in player_team.stockpiles:
-        sx, sy = stock.x, stock.y
-        sw, sh = stock.width, stock.height
-        if not (sx > right \
-                or sy > bottom \
-                or sx + sw <= left \
-                or sy + sh <= top):
-            conflicts = True
-            break
+    conflicts = bool(player_team.find_stockpiles_overlapping(
+                       (left, top, right - left + 1, bottom - top + 1)))
 
     # Also check if there are no designations on the stockpile.
-    rect = Rect(left, top, right - left + 1, bottom - top + 1)
-    for designation in player_team.designations:
-        if not designation['done'] \
-           and rect.collidepoint(designation['location']):
-            conflicts = True
+    for y in range(top, bottom + 1):
+        for x in range(left, right + 1):
+            for designation in player_team.designations.jobs_at((x, y)):
+                if not designation['done']:
+                    conflicts = True
 
     all_walkable = True
     for y in range(top, bottom + 1):
@@ -74,18 +65,18 @@ def stop_on_tile(pos, stage, player_team):
                           (left, top,
                            right - left + 1,
                            bottom - top + 1),
-                           ['fish'])
-        player_team.stockpiles.append(stock)
+                           [FISH])
+        player_team.add_stockpile(stock)
 
 def draw(screen, camera, tileset, mouse_pos):
     global _block_origin
 
     # Draw the selection box under the cursor.
-    if not _block_origin and mouse_pos[0] > MENU_WIDTH:
+    if not _block_origin and mouse_pos[0] > MENU_REAL_WIDTH:
         selection = camera.transform_screen_to_tile(mouse_pos)
-        screen.blit(tileset,
-                    camera.transform_tile_to_screen(selection),
-                    (128, 0, 16, 16))
+        tileset.blit(screen,
+                     camera.transform_tile_to_screen(selection),
+                     (128, 0, 16, 16))
 
     # Draw the designation rectangle if we are drawing a region.
     if _block_origin:
@@ -97,22 +88,24 @@ def draw(screen, camera, tileset, mouse_pos):
         top = min((ty, oy))
         bottom = max((ty, oy))
 
+        half = camera.tile_size // 2
+
         top_left_coords     = camera.transform_tile_to_screen(
-                                (left, top)),
+                                (left, top))
         top_right_coords    = translate(
                                 camera.transform_tile_to_screen(
                                   (right, top)),
-                                (8, 0))
+                                (half, 0))
         bottom_left_coords  = translate(
                                 camera.transform_tile_to_screen(
                                   (left, bottom)),
-                                (0, 8))
+                                (0, half))
         bottom_right_coords = translate(
                                 camera.transform_tile_to_screen(
                                   (right, bottom)),
-                                (8, 8))
+                                (half, half))
 
-        screen.blit(tileset, top_left_coords, (128, 0, 8, 8))
-        screen.blit(tileset, bottom_left_coords, (128, 8, 8, 8))
-        screen.blit(tileset, top_right_coords, (136, 0, 8, 8))
-        screen.blit(tileset, bottom_right_coords, (136, 8, 8, 8))
+        tileset.blit(screen, top_left_coords, (128, 0, 8, 8))
+        tileset.blit(screen, bottom_left_coords, (128, 8, 8, 8))
+        tileset.blit(screen, top_right_coords, (136, 0, 8, 8))
+        tileset.blit(screen, bottom_right_coords, (136, 8, 8, 8))
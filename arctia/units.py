@@ -0,0 +1,332 @@
+"""
+The units module provides a store (UnitStore) holding the data of units.
+"""
+from array import array
+from .kinds import make_diet
+
+# The components a unit can have, as bit flags.
+EATING = 1
+WANDERING = 2
+BROODING = 4
+MINING = 8
+HAULING = 16
+BUILDING = 32
+
+# The diet of units which eat nothing.
+NO_DIET = make_diet({})
+
+class UnitStore(object):
+    """
+    A UnitStore keeps the data of many units in parallel columns.
+
+    Each unit has an index, and each column holds one field of every
+    unit, e.g., x[i] is the x coordinate of the unit with index i.
+    Numeric fields are kept in compact arrays, so systems can go
+    through a whole column (e.g., all positions when culling units for
+    drawing) without touching a Python object per unit.
+
+    The store also keeps the game clock.  Units get one point hungrier
+    every turn, so instead of a hunger, each unit has the turn at which
+    its hunger was zero, and advancing the clock makes every unit
+    hungrier at once.
+
+    The positions of units at the start of the current turn are kept
+    in prev_x and prev_y, so units can be drawn between turns.
+
+    The store also keeps a spatial hash of the units on each tile, so
+    finding the units at a point, within a rectangle or within a radius
+    never looks at every unit.  Units must be moved with move (which
+    setting the x or y of a Unit does) to keep it up to date.
+
+    Units themselves are Unit objects, which are views into the store.
+    Reading a field through a Unit costs a property call, so systems
+    going through many units read the columns by index instead.
+    """
+    def __init__(self):
+        # The number of the current turn.
+        self.turn = 0
+
+        self.x = array('l')
+        self.y = array('l')
+        self.prev_x = array('l')
+        self.prev_y = array('l')
+        self.hunger_zero_turn = array('l')
+        self.hunger_threshold = array('l')
+        self.movement_delay = array('l')
+        self.wandering_delay = array('l')
+        self.brooding_duration = array('l')
+        self.components = array('l')
+        self.team = []
+        self.task = []
+
+        # The Unit viewing each index.
+        self.units = []
+
+        # The units on each occupied tile: {(x, y): [unit, ...]}
+        self._occupants = {}
+
+    def __len__(self):
+        return len(self.units)
+
+    def add(self, unit, x, y):
+        """
+        Add a unit to the store, giving every field a default value.
+
+        Arguments:
+            unit: the Unit which will view the new index
+            x: the x coordinate of the unit
+            y: the y coordinate of the unit
+
+        Returns: the index of the unit
+        """
+        self.x.append(x)
+        self.y.append(y)
+        self.prev_x.append(x)
+        self.prev_y.append(y)
+        self.hunger_zero_turn.append(self.turn)
+        self.hunger_threshold.append(0)
+        self.movement_delay.append(0)
+        self.wandering_delay.append(0)
+        self.brooding_duration.append(0)
+        self.components.append(0)
+        self.team.append(None)
+        self.task.append(None)
+        self.units.append(unit)
+        self._occupy(unit, x, y)
+
+        return len(self.units) - 1
+
+    def _occupy(self, unit, x, y):
+        occupants = self._occupants.get((x, y))
+        if occupants is None:
+            self._occupants[x, y] = [unit]
+        else:
+            occupants.append(unit)
+
+    def _vacate(self, unit, x, y):
+        occupants = self._occupants[x, y]
+        occupants.remove(unit)
+        if not occupants:
+            del self._occupants[x, y]
+
+    def move(self, unit, x, y):
+        """
+        Move a unit to a tile.
+
+        Arguments:
+            unit: the Unit
+            x: the new x coordinate of the unit
+            y: the new y coordinate of the unit
+        """
+        index = unit.index
+        old_x, old_y = self.x[index], self.y[index]
+        if (old_x, old_y) == (x, y):
+            return
+
+        self._vacate(unit, old_x, old_y)
+        self.x[index] = x
+        self.y[index] = y
+        self._occupy(unit, x, y)
+
+    def reindex(self):
+        """
+        Rebuild the spatial hash from the x and y columns, e.g., after
+        the columns were loaded from a saved game.
+        """
+        self._occupants = {}
+        for unit, x, y in zip(self.units, self.x, self.y):
+            self._occupy(unit, x, y)
+
+    def units_at(self, x, y):
+        """
+        Return the units on a tile.
+
+        Arguments:
+            x: the x coordinate of the tile
+            y: the y coordinate of the tile
+
+        Returns: a list of the units on the tile, which is empty if
+                 there are none
+        """
+        return list(self._occupants.get((x, y), ()))
+
+    def remember_positions(self):
+        """
+        Remember the current positions of all units as their previous
+        positions.  Call this at the start of every turn.
+        """
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
+
+    def advance(self):
+        """
+        Advance the clock by one turn.
+        """
+        self.turn += 1
+
+    def find_units_in_rect(self, rect):
+        """
+        Return the units within a rectangle.
+
+        Arguments:
+            rect: a rectangle given as (x, y, width, height)
+
+        Returns: a list of the units in the rectangle, in index order
+        """
+        left, top, width, height = rect
+        right, bottom = left + width, top + height
+
+        # Look at either every tile in the rectangle or every occupied
+        # tile, whichever is fewer.
+        occupants = self._occupants
+        found = []
+        if width * height < len(occupants):
+            for y in range(top, bottom):
+                for x in range(left, right):
+                    units = occupants.get((x, y))
+                    if units:
+                        found.extend(units)
+        else:
+            for (x, y), units in occupants.items():
+                if left <= x < right and top <= y < bottom:
+                    found.extend(units)
+
+        found.sort(key=_index_of)
+        return found
+
+    def find_units_in_radius(self, center, radius):
+        """
+        Return the units within a distance of a tile.
+
+        Arguments:
+            center: the (x, y) coordinates of the tile
+            radius: the distance, in tiles
+
+        Returns: a list of the units whose distance from the tile is
+                 at most the radius, in index order
+        """
+        center_x, center_y = center
+        limit = radius * radius
+        store_x, store_y = self.x, self.y
+
+        return [unit for unit in self.find_units_in_rect(
+                                   (center_x - radius, center_y - radius,
+                                    2 * radius + 1, 2 * radius + 1))
+                if (store_x[unit.index] - center_x) ** 2
+                   + (store_y[unit.index] - center_y) ** 2 <= limit]
+
+def _index_of(unit):
+    return unit.index
+
+class Unit(object):
+    """
+    A Unit is a mob in the game, e.g., a Penguin.
+
+    A Unit views its own index of a UnitStore, so its fields live in
+    the store's columns.  Fields which are not in any column (e.g.,
+    the partition) are kept on the Unit itself.
+
+    Arguments:
+        store: the UnitStore to keep the unit's data in
+        x: the x coordinate of the unit
+        y: the y coordinate of the unit
+    """
+    __slots__ = ('_store', 'index', 'partition', 'hunger_diet', 'clip',
+                 'program')
+
+    def __init__(self, store, x, y):
+        self._store = store
+        self.index = store.add(self, x, y)
+        self.partition = None
+        self.hunger_diet = NO_DIET
+        self.clip = None
+
+        # The TaskProgram reused for the unit's jobs, once it has one.
+        self.program = None
+
+    # Each field is read from its column directly rather than looked up
+    # by name, since fields are read all the time.  Hot loops should
+    # still go through the columns themselves (see UnitStore).
+    @property
+    def hunger_threshold(self):
+        return self._store.hunger_threshold[self.index]
+
+    @hunger_threshold.setter
+    def hunger_threshold(self, value):
+        self._store.hunger_threshold[self.index] = value
+
+    @property
+    def movement_delay(self):
+        return self._store.movement_delay[self.index]
+
+    @movement_delay.setter
+    def movement_delay(self, value):
+        self._store.movement_delay[self.index] = value
+
+    @property
+    def wandering_delay(self):
+        return self._store.wandering_delay[self.index]
+
+    @wandering_delay.setter
+    def wandering_delay(self, value):
+        self._store.wandering_delay[self.index] = value
+
+    @property
+    def brooding_duration(self):
+        return self._store.brooding_duration[self.index]
+
+    @brooding_duration.setter
+    def brooding_duration(self, value):
+        self._store.brooding_duration[self.index] = value
+
+    @property
+    def components(self):
+        return self._store.components[self.index]
+
+    @components.setter
+    def components(self, value):
+        self._store.components[self.index] = value
+
+    @property
+    def team(self):
+        return self._store.team[self.index]
+
+    @team.setter
+    def team(self, value):
+        self._store.team[self.index] = value
+
+    @property
+    def task(self):
+        return self._store.task[self.index]
+
+    @task.setter
+    def task(self, value):
+        self._store.task[self.index] = value
+
+    # Moving a unit goes through the store to keep its spatial hash
+    # up to date.
+    @property
+    def x(self):
+        return self._store.x[self.index]
+
+    @x.setter
+    def x(self, value):
+        self._store.move(self, value, self.y)
+
+    @property
+    def y(self):
+        return self._store.y[self.index]
+
+    @y.setter
+    def y(self, value):
+        self._store.move(self, self.x, value)
+
+    @property
+    def hunger(self):
+        store = self._store
+        return store.turn - store.hunger_zero_turn[self.index]
+
+    @hunger.setter
+    def hunger(self, value):
+        store = self._store
+        store.hunger_zero_turn[self.index] = store.turn - value
@@ -11,7 +11,9 @@ setup(
     tests_require=['nose==1.3.7'] + requirements,
     entry_points={
         'console_scripts': [
-            'arctia = arctia:main'
+            'arctia = arctia:main',
+            'arctia-replay = arctia.replay:main',
+            'arctia-batch = arctia.batch:main'
         ]
     },
     test_suite = 'nose.collector'
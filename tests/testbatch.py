@@ -0,0 +1,51 @@
+import io
+import json
+
+from arctia.batch import make_runs, parse_param, parse_seeds, \
+                         simulate, run_batch
+from arctia.stage import StageMap
+
+def test_parse_command_line():
+    assert parse_param('movement_delay=0,2') == ('movement_delay', [0, 2])
+    assert parse_seeds('1,5-7') == [1, 5, 6, 7]
+
+def test_make_runs_covers_grid():
+    runs = make_runs({'mining_work': [5, 10], 'movement_delay': [0]},
+                     [1, 2])
+    assert runs == [({'mining_work': 5, 'movement_delay': 0}, 1),
+                    ({'mining_work': 5, 'movement_delay': 0}, 2),
+                    ({'mining_work': 10, 'movement_delay': 0}, 1),
+                    ({'mining_work': 10, 'movement_delay': 0}, 2)]
+
+def test_simulate_is_deterministic():
+    stage_map = StageMap('maps/tuxville.tmx')
+    actions = [(0, 'start', 'mine', (30, 60)),
+               (0, 'stop', 'mine', (55, 85))]
+
+    first = simulate(stage_map, {'mining_work': 3}, 7, 200, actions)
+    second = simulate(stage_map, {'mining_work': 3}, 7, 200, actions)
+
+    assert first['tiles_mined'] > 0
+    assert 0.0 <= first['idle_ratio'] <= 1.0
+    del first['turns_per_second'], second['turns_per_second']
+    assert first == second
+
+def test_run_batch_writes_every_result():
+    stage_map = StageMap('maps/tuxville.tmx')
+    runs = make_runs({'eating_work': [1, 20]}, [1, 2])
+    results_file = io.StringIO()
+
+    assert run_batch(stage_map, runs, 20, results_file, processes=2) == 4
+
+    results = [json.loads(line)
+               for line in results_file.getvalue().splitlines()]
+    assert sorted((result['params']['eating_work'], result['seed'])
+                  for result in results) == [(1, 1), (1, 2), (20, 1), (20, 2)]
+
+def test_simulate_reports_timings_when_profiled():
+    stage_map = StageMap('maps/tuxville.tmx')
+
+    metrics = simulate(stage_map, {}, 1, 10, profile=True)
+
+    assert metrics['timings']['dispatch']['count'] == 10
+    assert 'timings' not in simulate(stage_map, {}, 1, 10)
@@ -26,3 +26,12 @@ def test_bfont_measure():
     bfont = BitmapFont(chars, font_img)
     result = bfont.measure('BACAB\nAB')
     assert(bfont.measure('BACAB\nAB') == (35, 24))
+
+def test_bfont_scale():
+    pygame.init()
+    bfont = BitmapFont('ABC', load_image('gfx/fawnt.png'))
+    scaled = bfont.scale(2)
+
+    assert scaled.cells[1] == (18, 0, 14, 24)
+    assert scaled.measure('BACAB\nAB') == (70, 48)
+    assert bfont.cells[1] == (9, 0, 7, 12)
@@ -1,4 +1,5 @@
 import os
+from arctia.kinds import FISH
 from arctia.stage import Stage
 from arctia.search import find_path_to_matching
 
@@ -23,7 +24,7 @@ def test_breadth_blocked_in():
 
 def test_breadth_on_object():
     def _point_is_fish(point):
-        return stage.entity_at(point).kind == 'fish'
+        return stage.entity_at(point).kind == FISH
 
     stage = Stage('maps/test-valley.tmx')
     path = find_path_to_matching(stage, (5, 12), _point_is_fish)
@@ -0,0 +1,29 @@
+from arctia.camera import Camera
+from arctia.config import MENU_REAL_WIDTH
+
+def test_camera_transforms_at_zoom():
+    camera = Camera(32, 16, zoom=3)
+
+    assert camera.tile_size == 48
+    assert camera.transform_tile_to_screen((2, 1)) == (MENU_REAL_WIDTH, 0)
+    assert camera.transform_screen_to_tile((MENU_REAL_WIDTH + 47, 47)) \
+           == (2, 1)
+    assert camera.transform_screen_to_tile((MENU_REAL_WIDTH + 48, 0)) \
+           == (3, 1)
+
+def test_camera_zoom_keeps_anchor():
+    camera = Camera(100, 100, zoom=2)
+    anchor = (MENU_REAL_WIDTH + 80, 60)
+    before = camera.transform_screen_to_game(anchor)
+
+    camera.set_zoom(0.5, anchor)
+
+    assert camera.transform_screen_to_game(anchor) == before
+    assert camera.find_view()[2] > Camera(100, 100, zoom=2).find_view()[2]
+
+def test_camera_tile_grid_matches_transform():
+    camera = Camera(37, -5, zoom=0.5)
+    size, offset_x, offset_y = camera.get_tile_grid()
+
+    assert (3 * size + offset_x, 4 * size + offset_y) \
+           == camera.transform_tile_to_screen((3, 4))
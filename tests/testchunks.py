@@ -0,0 +1,52 @@
+import random
+from arctia.chunks import ChunkIndex
+
+class _Thing(object):
+    def __init__(self, location):
+        self.location = location
+
+def _distance(a, b):
+    return max(abs(a[0] - b[0]), abs(a[1] - b[1]))
+
+def test_chunk_index_add_and_discard():
+    index = ChunkIndex(4)
+    thing1 = _Thing((1, 1))
+    thing2 = _Thing((9, 9))
+    index.add(thing1, thing1.location)
+    index.add(thing2, thing2.location)
+    assert len(index) == 2
+
+    index.discard(thing1, thing1.location)
+    index.discard(thing1, thing1.location)
+    assert len(index) == 1
+    assert list(index) == [thing2]
+
+def test_chunk_index_nearest_matches_brute_force():
+    rng = random.Random(3)
+    index = ChunkIndex(4)
+    things = []
+    for _ in range(200):
+        thing = _Thing((rng.randrange(100), rng.randrange(100)))
+        things.append(thing)
+        index.add(thing, thing.location)
+
+    for _ in range(20):
+        center = rng.randrange(100), rng.randrange(100)
+        expected = sorted(things,
+                          key=lambda t: (_distance(t.location, center),
+                                         t.location[1], t.location[0]))
+        found = index.nearest(center, 5)
+        assert [thing for _, thing in found] == expected[:5]
+        assert [distance for distance, _ in found] == \
+               [_distance(t.location, center) for t in expected[:5]]
+
+def test_chunk_index_nearest_accepts():
+    index = ChunkIndex(4)
+    near = _Thing((0, 0))
+    far = _Thing((50, 50))
+    index.add(near, near.location)
+    index.add(far, far.location)
+
+    found = index.nearest((1, 1), 1, accept=lambda thing: thing is far)
+    assert found == [(49, far)]
+    assert index.nearest((1, 1), 0) == []
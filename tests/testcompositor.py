@@ -0,0 +1,28 @@
+import pygame
+from arctia.compositor import Compositor, Layer
+
+def _make_counting_layer(calls, name, get_key=None):
+    def draw(surface):
+        calls.append(name)
+        surface.fill((255, 0, 0), (0, 0, 1, 1))
+    return Layer(draw, get_key)
+
+def test_cached_layer_is_drawn_only_when_out_of_date():
+    screen = pygame.Surface((4, 4))
+    calls = []
+    key = [0]
+    compositor = Compositor()
+    compositor.add('cached',
+                   _make_counting_layer(calls, 'cached', lambda: key[0]))
+    compositor.add('live', _make_counting_layer(calls, 'live'))
+
+    compositor.draw(screen)
+    compositor.draw(screen)
+    assert calls == ['cached', 'live', 'live']
+    assert screen.get_at((0, 0)) == (255, 0, 0, 255)
+
+    key[0] = 1
+    compositor.draw(screen)
+    compositor.layers['cached'].mark_dirty()
+    compositor.draw(screen)
+    assert calls.count('cached') == 3
@@ -0,0 +1,129 @@
+from arctia.entity import Entity
+from arctia.kinds import FISH
+from arctia.mobs import Bug, Penguin
+from arctia.stage import Stage, make_blank_stage
+from arctia.stockpile import Stockpile
+from arctia.systems import UnitDispatchSystem, PartitionUpdateSystem
+from arctia.team import Team
+from arctia.units import EATING, WANDERING
+
+def _make_world():
+    stage = Stage('maps/test-valley.tmx')
+    team = Team(stage)
+    penguin = Penguin(stage, team, 10, 6)
+    stage.mobs = [penguin]
+    dispatch = UnitDispatchSystem(stage)
+    dispatch.add(penguin)
+    partitions = PartitionUpdateSystem(stage, stage.mobs)
+    return stage, team, penguin, dispatch, partitions
+
+def test_idle_unit_sleeps_until_designation():
+    stage, team, penguin, dispatch, partitions = _make_world()
+
+    dispatch.update()
+    assert dispatch.is_asleep(penguin)
+
+    team.designations.add({'kind': 'mine', 'location': (7, 2),
+                           'done': False})
+    assert not dispatch.is_asleep(penguin)
+
+def test_sleeping_unit_wakes_when_hungry():
+    stage, team, penguin, dispatch, partitions = _make_world()
+    penguin.hunger = penguin.hunger_threshold - 2
+
+    dispatch.update()
+    assert dispatch.is_asleep(penguin)
+    dispatch.update()
+    assert dispatch.is_asleep(penguin)
+    dispatch.update()
+    assert not dispatch.is_asleep(penguin)
+
+def test_far_wildlife_skips_walking():
+    stage = make_blank_stage(100, 100)
+    team = Team(stage)
+    penguin = Penguin(stage, team, 5, 5)
+    near = Bug(stage, 10, 10)
+    far = Bug(stage, 90, 90)
+    for bug in (near, far):
+        bug.components = EATING | WANDERING
+    stage.mobs = [penguin, near, far]
+    dispatch = UnitDispatchSystem(stage)
+    for unit in stage.mobs:
+        dispatch.add(unit)
+    PartitionUpdateSystem(stage, stage.mobs).update()
+
+    dispatch.update()
+
+    assert [step[0] for step in near.program.steps] == ['go']
+    assert [step[0] for step in far.program.steps] == ['wait', 'teleport']
+
+def _make_blank_world(positions):
+    stage = make_blank_stage(20, 20)
+    team = Team(stage)
+    penguins = [Penguin(stage, team, x, y) for x, y in positions]
+    stage.mobs = penguins
+    dispatch = UnitDispatchSystem(stage)
+    for penguin in penguins:
+        dispatch.add(penguin)
+    PartitionUpdateSystem(stage, stage.mobs).update()
+    return stage, team, penguins, dispatch
+
+def test_haulers_are_matched_to_nearest_entities():
+    stage, team, penguins, dispatch = \
+      _make_blank_world([(1, 1), (18, 18)])
+    far = Entity(FISH, (16, 16))
+    near = Entity(FISH, (3, 3))
+    stage.add_entity(far, far.location)
+    stage.add_entity(near, near.location)
+    team.add_stockpile(Stockpile(stage, (9, 9, 2, 2), [FISH]))
+
+    dispatch.update()
+
+    assert penguins[0].program.carried is near
+    assert penguins[1].program.carried is far
+
+def test_large_groups_get_distinct_jobs():
+    positions = [(x, 0) for x in range(20)]
+    stage, team, penguins, dispatch = _make_blank_world(positions)
+    jobs = [{'kind': 'build', 'location': (x, 10), 'done': False}
+            for x in range(20)]
+    team.designations.extend(jobs)
+
+    dispatch.update()
+
+    assert sorted(id(penguin.program.designation) for penguin in penguins) \
+           == sorted(id(job) for job in jobs)
+
+def test_sleeping_unit_keeps_one_hunger_timer():
+    stage, team, penguin, dispatch, partitions = _make_world()
+
+    # Every 'entity' event wakes the hauler, which goes back to sleep
+    # once it is done idling.
+    for _ in range(150):
+        dispatch.update()
+        stage.events.publish('entity')
+
+    hunger_timers = [item for _, item in dispatch.get_state()['timers']
+                     if item == (penguin, 'hunger')]
+    assert len(hunger_timers) == 1
+
+def test_removing_stockpile_wakes_haulers():
+    stage, team, penguins, dispatch = _make_blank_world([(1, 1)])
+    fish = Entity(FISH, (9, 9))
+    stage.add_entity(fish, fish.location)
+    old = Stockpile(stage, (9, 9, 2, 2), [FISH])
+    team.add_stockpile(old)
+    team.add_stockpile(Stockpile(stage, (15, 15, 2, 2), [FISH]))
+
+    # The fish is already stored, so the hauler has nothing to do.
+    dispatch.update()
+    assert dispatch.is_asleep(penguins[0])
+
+    # Once it is done idling, the hauler takes the fish elsewhere.
+    team.remove_stockpile(old)
+    for _ in range(50):
+        dispatch.update()
+        if team.is_reserved('entity', fish):
+            break
+
+    assert team.is_reserved('entity', fish)
@@ -0,0 +1,140 @@
+from arctia.events import EventBus
+from arctia.jobboard import JobBoard, WAITING, OPEN, RESERVED, DONE
+
+def _make_job(kind, location):
+    return {'kind': kind, 'location': location, 'done': False}
+
+def test_jobboard_open_jobs_by_kind():
+    board = JobBoard()
+    mine1 = _make_job('mine', (0, 0))
+    mine2 = _make_job('mine', (1, 0))
+    build = _make_job('build', (2, 0))
+    board.extend([mine1, build, mine2])
+
+    assert list(board.jobs('mine')) == [mine1, mine2]
+    assert list(board.jobs('build')) == [build]
+    assert board.count('mine') == 2
+
+def test_jobboard_claim_and_release():
+    board = JobBoard()
+    job = _make_job('mine', (0, 0))
+    owner = object()
+    board.add(job)
+
+    board.claim(job, owner)
+    assert board.status(job) == RESERVED
+    assert board.owner(job) is owner
+    assert board.jobs_owned_by(owner) == [job]
+    assert list(board.jobs('mine')) == []
+
+    board.release(job)
+    assert board.status(job) == OPEN
+    assert board.owner(job) is None
+    assert board.jobs_owned_by(owner) == []
+    assert list(board.jobs('mine')) == [job]
+
+def test_jobboard_complete_and_compact():
+    board = JobBoard()
+    job1 = _make_job('mine', (0, 0))
+    job2 = _make_job('mine', (0, 1))
+    board.extend([job1, job2])
+
+    board.claim(job1)
+    board.complete(job1)
+    assert job1['done']
+    assert board.status(job1) == DONE
+    assert board.jobs_at((0, 0)) == [job1]
+
+    board.compact()
+    assert list(board) == [job2]
+    assert board.jobs_at((0, 0)) == []
+    assert board.count('mine', DONE) == 0
+
+def test_jobboard_parent_waits_for_dependencies():
+    board = JobBoard()
+    build = _make_job('build', (0, 0))
+    build['pending_dependencies'] = 2
+    scaffold1 = _make_job('scaffold', (0, 0))
+    scaffold2 = _make_job('scaffold', (0, 0))
+    scaffold1['parent'] = scaffold2['parent'] = build
+    board.extend([scaffold1, scaffold2, build])
+
+    assert board.status(build) == WAITING
+    assert list(board.jobs('build')) == []
+
+    board.complete(scaffold1)
+    assert board.status(build) == WAITING
+
+    board.complete(scaffold2)
+    assert board.status(build) == OPEN
+    assert list(board.jobs('build')) == [build]
+
+def test_jobboard_revision_follows_jobs():
+    board = JobBoard()
+    job = _make_job('mine', (0, 0))
+
+    board.add(job)
+    revision = board.revision
+    board.claim(job)
+    board.compact()
+    assert board.revision == revision
+
+    board.complete(job)
+    board.compact()
+    assert board.revision > revision
+
+def test_jobboard_released_job_keeps_posting_order():
+    board = JobBoard()
+    jobs = [_make_job('mine', (x, 0)) for x in range(3)]
+    board.extend(jobs)
+
+    board.claim(jobs[0])
+    board.claim(jobs[1])
+    board.release(jobs[1])
+    board.release(jobs[0])
+    assert list(board.jobs('mine')) == jobs
+
+def test_jobboard_open_jobs_within_partition():
+    events = EventBus()
+    board = JobBoard(events)
+    # Only the left half of a 4x1 stage can be reached.
+    part = [[True, True, False, False]]
+    near = _make_job('mine', (0, 0))
+    far = _make_job('mine', (3, 0))
+    board.extend([near, far])
+
+    def found():
+        return [job for _, job in
+                board.open_jobs_within('mine', part).nearest((0, 0), 10)]
+
+    assert found() == [near]
+
+    board.claim(near)
+    assert found() == []
+    board.release(near)
+    assert found() == [near]
+
+    late = _make_job('mine', (1, 0))
+    board.add(late)
+    assert found() == [near, late]
+    board.complete(near)
+    assert found() == [late]
+
+    # Partitions are replaced when they change.
+    events.publish('reachability')
+    assert found() == [late]
+
+def test_jobboard_jobs_at_one_location_keep_posting_order():
+    board = JobBoard()
+    part = [[True]]
+    first = _make_job('scaffold', (0, 0))
+    second = _make_job('scaffold', (0, 0))
+    board.extend([first, second])
+    index = board.open_jobs_within('scaffold', part)
+    assert [job for _, job in index.nearest((0, 0), 2)] == [first, second]
+
+    board.claim(first)
+    board.release(first)
+
+    index = board.open_jobs_within('scaffold', part)
+    assert [job for _, job in index.nearest((0, 0), 2)] == [first, second]
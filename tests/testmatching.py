@@ -0,0 +1,63 @@
+import math
+import random
+from itertools import permutations
+from arctia.matching import min_cost_assignment, greedy_assignment, \
+                            greedy_sparse_assignment
+
+def _total(costs, pairs):
+    return sum(costs[r][c] for r, c in pairs)
+
+def _assert_is_assignment(costs, pairs):
+    rows = [r for r, _ in pairs]
+    cols = [c for _, c in pairs]
+    assert len(set(rows)) == len(rows)
+    assert len(set(cols)) == len(cols)
+    for r, c in pairs:
+        assert costs[r][c] != math.inf
+
+def _brute_force(costs):
+    num_rows, num_cols = len(costs), len(costs[0])
+    best = None
+    for perm in permutations(range(num_cols), num_rows):
+        total = sum(costs[r][c] for r, c in enumerate(perm))
+        if best is None or total < best:
+            best = total
+    return best
+
+def test_min_cost_assignment_simple():
+    costs = [[4, 1, 3],
+             [2, 0, 5],
+             [3, 2, 2]]
+    pairs = min_cost_assignment(costs)
+    _assert_is_assignment(costs, pairs)
+    assert len(pairs) == 3
+    assert _total(costs, pairs) == 5
+
+def test_min_cost_assignment_matches_brute_force():
+    rng = random.Random(0)
+    for num_rows, num_cols in [(2, 5), (4, 4), (5, 3)]:
+        for _ in range(10):
+            costs = [[rng.randint(0, 20) for _ in range(num_cols)]
+                     for _ in range(num_rows)]
+            pairs = min_cost_assignment(costs)
+            _assert_is_assignment(costs, pairs)
+            assert len(pairs) == min(num_rows, num_cols)
+            if num_rows <= num_cols:
+                assert _total(costs, pairs) == _brute_force(costs)
+
+def test_min_cost_assignment_skips_forbidden_pairs():
+    costs = [[math.inf, math.inf],
+             [3, math.inf]]
+    pairs = min_cost_assignment(costs)
+    assert pairs == [(1, 0)]
+
+def test_greedy_assignment():
+    costs = [[1, 2],
+             [1, math.inf]]
+    pairs = greedy_assignment(costs)
+    _assert_is_assignment(costs, pairs)
+    assert len(pairs) == 1
+
+def test_greedy_sparse_assignment():
+    triples = [(3, 'a', 'x'), (1, 'b', 'x'), (2, 'a', 'y'), (5, 'b', 'y')]
+    assert greedy_sparse_assignment(triples) == [('b', 'x'), ('a', 'y')]
@@ -1,6 +1,7 @@
 import os
 from arctia.stage import Stage
 from arctia.partition import partition
+from arctia.systems import PartitionUpdateSystem
 
 def test_partition_size():
     stage = Stage('maps/test-valley.tmx')
@@ -61,3 +62,41 @@ def test_big_map_has_trues():
     stage = Stage('maps/tuxville.tmx')
     result = partition(stage, (26, 59))
     _assert_has_trues(result)
+
+class _Mob(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.partition = None
+
+def test_partition_update_is_deferred():
+    stage = Stage('maps/test-valley.tmx')
+    mob1 = _Mob(3, 11)
+    mob2 = _Mob(10, 6)
+    system = PartitionUpdateSystem(stage, [mob1, mob2])
+    assert not mob1.partition[12][8]
+
+    # Open the wall between the two regions.
+    stage.set_tile_at(6, 12, 1)
+    assert system.is_dirty()
+    assert not mob1.partition[12][8]
+
+    system.update()
+    assert not system.is_dirty()
+    assert mob1.partition[12][8]
+    assert mob1.partition is mob2.partition
+
+def test_partition_update_skips_untouched_partitions():
+    stage = Stage('maps/test-valley.tmx')
+    mob1 = _Mob(3, 11)
+    mob2 = _Mob(10, 6)
+    system = PartitionUpdateSystem(stage, [mob1, mob2])
+    part1 = mob1.partition
+    part2 = mob2.partition
+
+    stage.set_tile_at(3, 13, 2)
+    stage.set_tile_at(3, 14, 2)
+    system.update()
+
+    assert mob1.partition is not part1
+    assert mob2.partition is part2
@@ -0,0 +1,28 @@
+from arctia.profiler import Profiler
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+
+    profiler.stop('input', profiler.start())
+
+    assert profiler.names == []
+
+def test_profiler_summarizes_recent_timings():
+    profiler = Profiler(samples=4)
+    for seconds in (9.0, 1.0, 2.0, 3.0, 4.0):
+        profiler.record('dispatch', seconds)
+
+    assert profiler.percentile('dispatch', 0.5) == 3.0
+    assert profiler.histogram('dispatch', [1.5, 2.5, 3.5]) == [1, 1, 2]
+
+    summary = profiler.summary()['dispatch']
+    assert summary['count'] == 5
+    assert summary['max'] == 9.0
+    assert summary['p99'] == 4.0
+
+def test_timed_function_is_recorded():
+    profiler = Profiler()
+    double = profiler.timed('double', lambda x: x * 2)
+
+    assert double(4) == 8
+    assert profiler.names == ['double']
@@ -0,0 +1,44 @@
+from arctia.mobs import Penguin
+from arctia.program import assign_program, ABORT
+from arctia.stage import Stage
+from arctia.systems import PartitionUpdateSystem
+from arctia.tasks import Wait
+from arctia.team import Team
+
+def _make_world():
+    stage = Stage('maps/test-valley.tmx')
+    team = Team(stage)
+    penguin = Penguin(stage, team, 10, 6)
+    stage.mobs = [penguin]
+    PartitionUpdateSystem(stage, stage.mobs)
+    return stage, penguin
+
+def test_program_is_reused_for_new_jobs():
+    stage, penguin = _make_world()
+
+    first = assign_program(stage, penguin, None, [], [('wait', 1)])
+    first.enact()
+    assert penguin.task is None
+
+    second = assign_program(stage, penguin, None, [], [('wait', 1)])
+    assert second is first
+    assert penguin.task is second
+
+def test_go_state_is_remaining_path():
+    stage, penguin = _make_world()
+    program = assign_program(stage, penguin, None, [],
+                             [('go', (12, 10), 0, ABORT)])
+
+    path, finished = program.get_state()
+    program.enact()
+    program.enact()
+
+    assert program.get_state() == (path[2:], finished)
+    assert (penguin.x, penguin.y) == path[1]
+
+def test_wait_for_no_turns():
+    finished = []
+    wait = Wait(0, lambda: finished.append(True))
+
+    assert wait.enact() is None
+    assert finished == [True]
@@ -0,0 +1,54 @@
+import contextlib
+import io
+import os
+import tempfile
+
+from arctia import tools
+from arctia.game import Game
+from arctia.replay import Recorder, Log, replay, main
+
+def _play_recorded_game(path, seed, turns):
+    recorder = Recorder(path, 'maps/tuxville.tmx', seed)
+    game = Game('maps/tuxville.tmx', seed, recorder)
+
+    start_x, start_y = game.mobs[0].x, game.mobs[0].y
+    for turn in range(turns):
+        if turn == 5:
+            game.use_tool('start', tools.mine, (start_x - 6, start_y - 6))
+            game.use_tool('stop', tools.mine, (start_x + 6, start_y + 6))
+        game.play_turn()
+
+    recorder.close(game.turn)
+    return game
+
+def _describe(game):
+    return [(unit.x, unit.y, unit.hunger) for unit in game.mobs], \
+           sorted((entity.kind, entity.location)
+                  for entity in game.stage.get_entities())
+
+def test_replay_reproduces_game():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'game.log')
+        game = _play_recorded_game(path, 1234, 200)
+        log = Log(path)
+    assert log.seed == 1234
+    assert log.end_turn == 200
+    assert [action[:3] for action in log.actions] == \
+           [(5, 'start', 'mine'), (5, 'stop', 'mine')]
+
+    replayed, timings = replay(log)
+    assert len(timings) == 200
+    assert _describe(replayed) == _describe(game)
+
+def test_main_replays_log():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'game.log')
+        _play_recorded_game(path, 1234, 20)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main([path, '--turns', '10', '--profile'])
+
+    lines = output.getvalue().splitlines()
+    assert lines[0].startswith('turns 10 ')
+    assert any(line.startswith('assign ') for line in lines[1:])
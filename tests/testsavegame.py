@@ -0,0 +1,63 @@
+import os
+import pickle
+import tempfile
+
+from arctia import tools
+from arctia.game import Game
+from arctia.savegame import save_game, load_game, snapshot_game
+
+def _play(game, turns):
+    start_x, start_y = 47, 75
+    for _ in range(turns):
+        if game.turn == 5:
+            game.use_tool('start', tools.mine, (start_x - 6, start_y - 6))
+            game.use_tool('stop', tools.mine, (start_x + 6, start_y + 6))
+        elif game.turn == 40:
+            game.use_tool('start', tools.stockpile,
+                          (start_x + 2, start_y + 2))
+            game.use_tool('stop', tools.stockpile,
+                          (start_x + 4, start_y + 4))
+        elif game.turn == 60:
+            game.use_tool('start', tools.build_wall,
+                          (start_x - 3, start_y + 3))
+            game.use_tool('stop', tools.build_wall,
+                          (start_x - 1, start_y + 3))
+        game.play_turn()
+
+def test_load_restores_snapshot():
+    game = Game('maps/tuxville.tmx', 7)
+    _play(game, 100)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'game.sav')
+        save_game(game, path)
+        loaded = load_game(path)
+
+    assert loaded.turn == game.turn
+    assert snapshot_game(loaded) == snapshot_game(game)
+
+def test_loaded_game_plays_on_identically():
+    game = Game('maps/tuxville.tmx', 7)
+    _play(game, 100)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'game.sav')
+        save_game(game, path)
+        loaded = load_game(path)
+
+    _play(game, 200)
+    _play(loaded, 200)
+    assert snapshot_game(loaded) == snapshot_game(game)
+
+def test_load_refuses_code():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'evil.sav')
+        with open(path, 'wb') as f:
+            f.write(b'arctia-save 2\n' + pickle.dumps(print))
+
+        try:
+            load_game(path)
+        except pickle.UnpicklingError:
+            pass
+        else:
+            assert False, 'a saved game holding code was loaded'
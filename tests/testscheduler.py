@@ -0,0 +1,13 @@
+from arctia.scheduler import Scheduler
+
+def test_scheduler_pops_due_items_in_order():
+    scheduler = Scheduler()
+    scheduler.schedule(5, 'c')
+    scheduler.schedule(2, 'a')
+    scheduler.schedule(2, 'b')
+
+    assert scheduler.pop_due(1) == []
+    assert scheduler.pop_due(4) == ['a', 'b']
+    assert len(scheduler) == 1
+    assert scheduler.pop_due(10) == ['c']
+    assert len(scheduler) == 0
@@ -0,0 +1,56 @@
+from arctia.stage import Stage, make_blank_stage
+from arctia.common import tile_is_solid, NEIGHBOR_OFFSETS
+from arctia.entity import Entity
+from arctia.kinds import FISH
+
+def _expected_masks(stage, x, y):
+    walkable = 0
+    solid = 0
+    for i, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+        tid = stage.get_tile_at(x + dx, y + dy)
+        if tid is None:
+            continue
+        if tile_is_solid(tid):
+            solid |= 1 << i
+        else:
+            walkable |= 1 << i
+    return walkable, solid
+
+def _assert_masks_are_correct(stage):
+    for y in range(stage.height):
+        for x in range(stage.width):
+            assert (stage.walkable_masks[y][x], stage.solid_masks[y][x]) \
+                   == _expected_masks(stage, x, y)
+
+def test_stage_neighbor_masks():
+    stage = Stage('maps/test-valley.tmx')
+    _assert_masks_are_correct(stage)
+
+    # Corners have only three neighbors.
+    assert bin(stage.walkable_masks[0][0]
+               | stage.solid_masks[0][0]).count('1') == 3
+
+def test_stage_neighbor_masks_follow_tile_changes():
+    stage = Stage('maps/test-valley.tmx')
+
+    stage.set_tile_at(10, 6, 2)
+    stage.set_tile_at(0, 0, 1)
+    stage.set_tile_at(0, 0, 3)
+    _assert_masks_are_correct(stage)
+
+    stage.set_tile_at(10, 6, 1)
+    _assert_masks_are_correct(stage)
+
+def test_stage_deletes_entities():
+    stage = make_blank_stage(10, 10)
+    entities = [Entity(FISH, (x, 0)) for x in range(5)]
+    for entity in entities:
+        stage.add_entity(entity, entity.location)
+
+    for entity in (entities[1], entities[4], entities[0]):
+        stage.delete_entity(entity)
+        assert entity.location is None
+
+    assert sorted(id(entity) for entity in stage.get_entities()) \
+           == sorted(id(entity) for entity in (entities[2], entities[3]))
+    assert len(stage.get_entities_of_kind(FISH)) == 2
@@ -0,0 +1,46 @@
+from arctia.kinds import FISH
+from arctia.stage import Stage
+from arctia.stockpile import Stockpile
+from arctia.team import Team
+
+def _make_stockpile():
+    # The area from (8, 9) to (11, 11) of the valley is open ground.
+    stage = Stage('maps/test-valley.tmx')
+    team = Team(stage)
+    stock = Stockpile(stage, (8, 9, 4, 3), [FISH])
+    team.add_stockpile(stock)
+    return stage, team, stock
+
+def test_stockpile_tracks_entities():
+    stage, team, stock = _make_stockpile()
+    assert stock.occupancy == 0
+
+    stage.create_entity(FISH, (9, 10))
+    assert stock.occupancy == 1
+    assert stock.find_free_slot(near=(9, 10)) != (9, 10)
+
+    stage.delete_entity(stage.entity_at((9, 10)))
+    assert stock.occupancy == 0
+    assert stock.find_free_slot(near=(9, 10)) == (9, 10)
+
+def test_stockpile_tracks_reservations():
+    stage, team, stock = _make_stockpile()
+    team.reserve('location', (8, 9))
+    assert stock.find_free_slot() != (8, 9)
+
+    team.relinquish('location', (8, 9))
+    assert stock.find_free_slot() == (8, 9)
+
+def test_stockpile_finds_nearest_free_slot():
+    stage, team, stock = _make_stockpile()
+    assert stock.find_free_slot(near=(0, 0)) == (8, 9)
+    assert stock.find_free_slot(near=(20, 20)) == (11, 11)
+
+def test_stockpile_is_full():
+    stage, team, stock = _make_stockpile()
+    for y in range(9, 12):
+        for x in range(8, 12):
+            assert not stock.is_full()
+            team.reserve('location', (x, y))
+    assert stock.is_full()
+    assert stock.find_free_slot() is None
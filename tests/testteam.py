@@ -0,0 +1,136 @@
+from arctia.entity import Entity
+from arctia.kinds import ROCK, FISH
+from arctia.partition import partition
+from arctia.stage import Stage, make_blank_stage
+from arctia.stockpile import Stockpile
+from arctia.team import Team
+
+class _Thing(object):
+    pass
+
+def test_reservations_are_by_identity():
+    team = Team()
+    thing1 = _Thing()
+    thing2 = _Thing()
+
+    team.reserve('entity', thing1)
+    assert team.is_reserved('entity', thing1)
+    assert not team.is_reserved('entity', thing2)
+
+def test_location_reservations_are_by_value():
+    team = Team()
+    team.reserve('location', (3, 4))
+    assert team.is_reserved('location', (3, 4))
+    team.relinquish('location', (3, 4))
+    assert not team.is_reserved('location', (3, 4))
+
+def test_reservation_owners():
+    team = Team()
+    unit = _Thing()
+    thing = _Thing()
+
+    team.reserve('entity', thing, unit)
+    team.reserve('location', (1, 1), unit)
+
+    assert team.get_reservation_owner('entity', thing) is unit
+    assert set(team.get_reservations_held_by(unit)) \
+           == set([('entity', thing), ('location', (1, 1))])
+    assert len(team.describe_reservations()) == 2
+
+def test_relinquish_all():
+    team = Team()
+    unit1 = _Thing()
+    unit2 = _Thing()
+    thing1 = _Thing()
+    thing2 = _Thing()
+    job = {'kind': 'mine', 'location': (0, 0), 'done': False}
+    team.designations.add(job)
+
+    team.reserve('entity', thing1, unit1)
+    team.reserve('designation', job, unit1)
+    team.reserve('entity', thing2, unit2)
+
+    team.relinquish_all(unit1)
+    assert not team.is_reserved('entity', thing1)
+    assert not team.is_reserved('designation', job)
+    assert team.is_reserved('entity', thing2)
+    assert team.get_reservations_held_by(unit1) == []
+    assert list(team.get_unreserved_designations('mine')) == [job]
+
+def test_unhauled_entities():
+    stage = Stage('maps/test-valley.tmx')
+    team = Team(stage)
+    fish = stage.entity_at((5, 12))
+    part = partition(stage, (5, 12))
+
+    def _unhauled_fish():
+        return list(team.get_unhauled_entities(FISH, part))
+
+    assert fish in _unhauled_fish()
+
+    team.reserve('entity', fish)
+    assert fish not in _unhauled_fish()
+    team.relinquish('entity', fish)
+    assert fish in _unhauled_fish()
+
+    stock = Stockpile(stage, (4, 11, 2, 2), [FISH])
+    team.add_stockpile(stock)
+    assert fish not in _unhauled_fish()
+    team.remove_stockpile(stock)
+    assert fish in _unhauled_fish()
+
+    stage.delete_entity(fish)
+    assert fish not in _unhauled_fish()
+    assert team.find_unhauled_entity([ROCK], partition(stage, (11, 2)),
+                                     (0, 0)) is not None
+
+def test_unhauled_entities_by_partition():
+    stage = make_blank_stage(10, 10)
+    team = Team(stage)
+    near = Entity(FISH, (2, 2))
+    far = Entity(FISH, (8, 8))
+    stage.add_entity(near, near.location)
+    stage.add_entity(far, far.location)
+
+    part = partition(stage, (0, 0))
+    assert team.find_unhauled_entity([FISH], part, (9, 9)) is far
+
+    # Walling off the far fish leaves only the near one reachable.
+    walled = [row[:] for row in part]
+    walled[8][8] = False
+    assert team.find_unhauled_entity([FISH], walled, (9, 9)) is near
+
+    stage.delete_entity(near)
+    assert team.find_unhauled_entity([FISH], walled, (9, 9)) is None
+    assert team.find_unhauled_entity([FISH], part, (0, 0)) is far
+
+def test_stockpile_index():
+    stage = Stage('maps/test-valley.tmx')
+    team = Team(stage)
+    stock1 = Stockpile(stage, (8, 9, 2, 2), [FISH])
+    stock2 = Stockpile(stage, (10, 9, 2, 2), [FISH])
+    team.add_stockpile(stock1)
+    team.add_stockpile(stock2)
+
+    assert team.get_stockpile_at((9, 10)) is stock1
+    assert team.get_stockpile_at((10, 9)) is stock2
+    assert team.get_stockpile_at((12, 9)) is None
+
+    assert team.find_stockpiles_overlapping((9, 10, 1, 1)) == [stock1]
+    assert len(team.find_stockpiles_overlapping((0, 0, 20, 20))) == 2
+    assert team.find_stockpiles_overlapping((12, 9, 3, 3)) == []
+
+    team.remove_stockpile(stock1)
+    assert team.get_stockpile_at((9, 10)) is None
+    assert team.find_stockpiles_overlapping((0, 0, 20, 20)) == [stock2]
+
+def test_team_without_stage_has_no_stockpiles():
+    stage = Stage('maps/test-valley.tmx')
+    team = Team()
+
+    try:
+        team.add_stockpile(Stockpile(stage, (8, 9, 2, 2), [FISH]))
+    except AssertionError:
+        pass
+    else:
+        assert False, 'a team without a stage accepted a stockpile'
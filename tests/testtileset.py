@@ -0,0 +1,31 @@
+import pygame
+from arctia.tileset import Tileset, SpriteBatch
+
+def test_tileset_scales_image_and_clips():
+    image = pygame.Surface((32, 16))
+    image.fill((255, 0, 0), (16, 0, 16, 16))
+    tileset = Tileset(image, 0.5)
+    screen = pygame.Surface((8, 8))
+
+    tileset.blit(screen, (0, 0), (16, 0, 16, 16))
+
+    assert tileset.image.get_size() == (16, 8)
+    assert tileset.scale_clip((16, 0, 16, 16)) == (8, 0, 8, 8)
+    assert screen.get_at((7, 7)) == (255, 0, 0, 255)
+
+def test_sprite_batch_draws_in_order():
+    image = pygame.Surface((32, 16))
+    image.fill((255, 0, 0), (0, 0, 16, 16))
+    image.fill((0, 0, 255), (16, 0, 16, 16))
+    batch = SpriteBatch(Tileset(image))
+    screen = pygame.Surface((32, 16))
+
+    batch.add_tile((0, 0), 1)
+    batch.add((16, 0), (0, 0, 16, 16))
+    batch.add_tile((16, 0), 1)
+    assert len(batch) == 3
+    batch.draw(screen)
+
+    assert len(batch) == 0
+    assert screen.get_at((0, 0)) == (0, 0, 255, 255)
+    assert screen.get_at((16, 0)) == (0, 0, 255, 255)
@@ -0,0 +1,36 @@
+from arctia.timestep import FixedTimestep
+
+def _count_turns(timestep):
+    turns = 0
+    while timestep.take_turn():
+        turns += 1
+    return turns
+
+def test_timestep_plays_turns_at_fixed_rate():
+    timestep = FixedTimestep(turns_per_second=4, max_turns=10)
+
+    timestep.add_time(0.1)
+    assert _count_turns(timestep) == 0
+    assert abs(timestep.alpha - 0.4) < 1e-9
+
+    timestep.add_time(0.2)
+    assert _count_turns(timestep) == 1
+    assert abs(timestep.alpha - 0.2) < 1e-9
+
+def test_timestep_caps_catch_up():
+    timestep = FixedTimestep(turns_per_second=4, max_turns=3)
+
+    timestep.add_time(10.0)
+    assert _count_turns(timestep) == 3
+    assert timestep.alpha == 0.0
+
+def test_timestep_speed():
+    timestep = FixedTimestep(turns_per_second=4, max_turns=10)
+
+    timestep.speed = 2
+    timestep.add_time(0.5)
+    assert _count_turns(timestep) == 4
+
+    timestep.speed = 0
+    timestep.add_time(0.5)
+    assert _count_turns(timestep) == 0
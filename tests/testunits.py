@@ -0,0 +1,55 @@
+from arctia.units import UnitStore, Unit, EATING, MINING
+
+def test_unit_fields_live_in_store():
+    store = UnitStore()
+    unit1 = Unit(store, 1, 2)
+    unit2 = Unit(store, 3, 4)
+
+    unit2.x += 1
+    unit1.components = EATING | MINING
+
+    assert list(store.x) == [1, 4]
+    assert list(store.y) == [2, 4]
+    assert store.components[unit1.index] & MINING
+    assert not store.components[unit2.index] & MINING
+
+def test_unit_hunger_follows_clock():
+    store = UnitStore()
+    unit = Unit(store, 0, 0)
+
+    for _ in range(5):
+        store.advance()
+    assert unit.hunger == 5
+
+    unit.hunger = 1
+    store.advance()
+    assert unit.hunger == 2
+
+def test_unit_store_finds_units_in_rect():
+    store = UnitStore()
+    units = [Unit(store, x, x) for x in range(10)]
+
+    assert store.find_units_in_rect((2, 3, 4, 4)) == units[3:6]
+
+def test_unit_store_tracks_units_on_tiles():
+    store = UnitStore()
+    unit1 = Unit(store, 1, 1)
+    unit2 = Unit(store, 1, 1)
+
+    assert store.units_at(1, 1) == [unit1, unit2]
+
+    store.move(unit1, 2, 1)
+    unit2.y = 3
+
+    assert store.units_at(1, 1) == []
+    assert store.units_at(2, 1) == [unit1]
+    assert store.units_at(1, 3) == [unit2]
+    assert store.find_units_in_rect((0, 0, 100, 100)) == [unit1, unit2]
+
+def test_unit_store_finds_units_in_radius():
+    store = UnitStore()
+    near = Unit(store, 12, 10)
+    Unit(store, 12, 12)
+    diagonal = Unit(store, 11, 9)
+
+    assert store.find_units_in_radius((10, 10), 2) == [near, diagonal]